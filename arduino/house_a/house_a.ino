@@ -36,6 +36,14 @@ String device_id = "H001";
 String req = "read";
 bool updateBalance = false;
 
+// Binary serial protocol (mirrors estate-backend/src/homes/protocol.py)
+#define PROTO_VERSION 1
+#define FRAME_SYNC 0xA5
+#define FRAME_STATUS 0x01
+#define FRAME_COMMAND 0x81
+#define FRAME_SIZE 9
+bool binaryMode = false;
+
 // Timers
 unsigned long lastCurrentUpdate = 0;
 const unsigned long currentInterval = 1000;
@@ -122,6 +130,11 @@ void acceptSerialInput() {
   if (Serial.available()) {
     lastSerialInputTime = millis();
 
+    if (Serial.peek() == FRAME_SYNC) {
+      readBinaryCommand();
+      return;
+    }
+
     String input = Serial.readStringUntil('\n');
     input.trim();
 
@@ -131,32 +144,66 @@ void acceptSerialInput() {
         float receivedBalance = input.substring(0, commaIndex).toFloat();
         int receivedInstruction = input.substring(commaIndex + 1).toInt();
 
-        accountBalance = receivedBalance;
-
-        switch (receivedInstruction) {
-          case 1:
-            connectionStatus = true;
-            break;
-          case 0:
-            connectionStatus = false;
-            break;
-          case 2:
-            ledState = !ledState;
-            digitalWrite(LED_PIN, ledState ? HIGH : LOW);
-            EEPROM.update(0, ledState);
-            break;
-          case 3:
-            updateBalance = false;           
-            break;
+        // "<balance>,<instruction>,B" asks us to switch to binary frames
+        if (input.endsWith(",B")) {
+          binaryMode = true;
         }
-
+        applyInstruction(receivedBalance, receivedInstruction);
       }
     }
   } else if (millis() - lastSerialInputTime > 10000) {
     connectionStatus = false;
+    binaryMode = false;  // Handshake again in JSON after losing the hub
   }
 }
 
+void applyInstruction(float receivedBalance, int receivedInstruction) {
+  accountBalance = receivedBalance;
+
+  switch (receivedInstruction) {
+    case 1:
+      connectionStatus = true;
+      break;
+    case 0:
+      connectionStatus = false;
+      break;
+    case 2:
+      ledState = !ledState;
+      digitalWrite(LED_PIN, ledState ? HIGH : LOW);
+      EEPROM.update(0, ledState);
+      break;
+    case 3:
+      updateBalance = false;           
+      break;
+  }
+}
+
+uint16_t crc16(const uint8_t *data, size_t len) {
+  // CRC-16/CCITT-FALSE
+  uint16_t crc = 0xFFFF;
+  for (size_t i = 0; i < len; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (uint8_t bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : (crc << 1);
+    }
+  }
+  return crc;
+}
+
+void readBinaryCommand() {
+  // SYNC | 0x81 | balance int32 | instruction uint8 | CRC16, little-endian
+  uint8_t frame[FRAME_SIZE];
+  if (Serial.readBytes(frame, FRAME_SIZE) != FRAME_SIZE) return;
+  if (frame[1] != FRAME_COMMAND) return;
+
+  uint16_t crc = frame[7] | ((uint16_t)frame[8] << 8);
+  if (crc != crc16(frame + 1, 6)) return;
+
+  int32_t balance;
+  memcpy(&balance, frame + 2, sizeof(balance));
+  applyInstruction((float)balance, frame[6]);
+}
+
 void updatePower() {
   if (millis() - lastCurrentUpdate >= currentInterval) {
     lastCurrentUpdate = millis();
@@ -220,7 +267,9 @@ void updatePower() {
 
 
 void sendSerialOutput() {
-  if (connectionStatus) {
+  if (connectionStatus && binaryMode) {
+    sendBinaryStatus();
+  } else if (connectionStatus) {
     String message = "{";
     message += "\"current\":" + String(current, 2) + ",";
     message += "\"voltage\":" + String(batteryVoltage, 2) + ",";
@@ -229,10 +278,28 @@ void sendSerialOutput() {
     message += "}";
     Serial.println(message);
   } else {
-    Serial.println("{\"device_id\":\"" + device_id + "\"}");
+    Serial.println("{\"device_id\":\"" + device_id + "\",\"proto\":" + String(PROTO_VERSION) + "}");
   }
 }
 
+void sendBinaryStatus() {
+  // SYNC | 0x01 | current int16 cA | voltage uint16 cV | flags | CRC16, little-endian
+  uint8_t frame[FRAME_SIZE];
+  int16_t centiAmps = (int16_t)constrain(round(current * 100), -32768, 32767);
+  uint16_t centiVolts = (uint16_t)constrain(round(batteryVoltage * 100), 0, 65535);
+
+  frame[0] = FRAME_SYNC;
+  frame[1] = FRAME_STATUS;
+  memcpy(frame + 2, &centiAmps, sizeof(centiAmps));
+  memcpy(frame + 4, &centiVolts, sizeof(centiVolts));
+  frame[6] = (updateBalance ? 0x01 : 0x00) | (ledState ? 0x02 : 0x00);
+
+  uint16_t crc = crc16(frame + 1, 6);
+  frame[7] = crc & 0xFF;
+  frame[8] = crc >> 8;
+  Serial.write(frame, FRAME_SIZE);
+}
+
 void displayLcd() {
   bool shouldUpdate = false;
 
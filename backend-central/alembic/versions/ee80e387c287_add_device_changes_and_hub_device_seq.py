@@ -0,0 +1,42 @@
+"""Add device_changes and hubs.device_seq for delta device sync
+
+Revision ID: ee80e387c287
+Revises: 7d70c13569b5
+Create Date: 2026-10-18 08:10:12.418203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ee80e387c287'
+down_revision: Union[str, None] = '7d70c13569b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('hubs', sa.Column('device_seq', sa.Integer(), nullable=False, server_default="0"))
+    op.create_table('device_changes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('estate', sa.String(length=100), nullable=False),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('device_pk', sa.Integer(), nullable=False),
+    sa.Column('op', sa.String(length=10), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_device_changes_id'), 'device_changes', ['id'], unique=False)
+    op.create_index('ix_device_changes_estate_seq', 'device_changes', ['estate', 'seq'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_device_changes_estate_seq', table_name='device_changes')
+    op.drop_index(op.f('ix_device_changes_id'), table_name='device_changes')
+    op.drop_table('device_changes')
+    op.drop_column('hubs', 'device_seq')
@@ -40,6 +40,7 @@ class Settings:
     MQTT_PASSWORD = os.getenv("MQTT_PASSWORD")
     MQTT_PUBLISH_TOPIC = os.getenv("MQTT_PUBLISH_TOPIC")
     MQTT_SUBSCRIBE_TOPIC = os.getenv("MQTT_SUBSCRIBE_TOPIC")
+    MQTT_CODEC = os.getenv("MQTT_CODEC", "json")  # json, msgpack or cbor, for hubs advertising it
 
     # Server config
     PORT = int(os.getenv("PORT", 8000))
@@ -50,6 +51,17 @@ class Settings:
     SCT_CONTRACT_ADDRESS = os.getenv("SCT_CONTRACT_ADDRESS")
     STRK_CONTRACT_ADDRESS = os.getenv("STRK_CONTRACT_ADDRESS")
     STARKNET_RPC_URL = os.getenv("STARKNET_RPC_URL")
+    STARKNET_RPC_BATCH_SIZE = int(os.getenv("STARKNET_RPC_BATCH_SIZE", 50))  # starknet_call requests per JSON-RPC batch
+    STARKNET_RPC_CONCURRENCY = int(os.getenv("STARKNET_RPC_CONCURRENCY", 4))  # batches in flight
+    # Extra signing accounts as "address:private_key,...", the contract methods they may call,
+    # the STRK a signer must hold to be used, and how often signer balances are re-read.
+    # None by default: `transfer` pays out trade escrow, which only the owner account holds,
+    # so allow it only for relayers funded with the escrowed SCT
+    STARKNET_RELAYERS = [entry for entry in os.getenv("STARKNET_RELAYERS", "").split(",") if entry]
+    STARKNET_RELAYER_METHODS = [method for method in os.getenv("STARKNET_RELAYER_METHODS", "").split(",") if method]
+    STARKNET_RELAYER_MIN_FEE = float(os.getenv("STARKNET_RELAYER_MIN_FEE", 1.0))
+    STARKNET_RELAYER_REFRESH = float(os.getenv("STARKNET_RELAYER_REFRESH", 60))
+    BALANCE_CACHE_TTL = int(os.getenv("BALANCE_CACHE_TTL", 60))  # seconds a cached balance is served
 
     # Africas Talking
     SMS_USERNAME=os.getenv("SMS_USERNAME")
@@ -4,6 +4,7 @@ from .devices import Device
 from .hubs import Hub
 from .token_purchase import TokenPurchase
 from .trades import TradeRequest
+from .device_changes import DeviceChange
 
 # Optionally, export them all as a list or __all__
 __all__ = [
@@ -13,6 +14,7 @@ __all__ = [
     "Hub",
     "TokenPurchase",
     "TradeRequest",
+    "DeviceChange",
 ]
 
 
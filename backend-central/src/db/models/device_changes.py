@@ -0,0 +1,56 @@
+# /src/db/models/device_changes.py
+# SQLAlchemy models and database helper functions
+
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, DateTime, Index, update
+from sqlalchemy.orm import Session
+
+from src.db.database import Base
+from .hubs import Hub
+
+# ============================
+# Models
+# ============================
+class DeviceChange(Base):
+    """
+    Per-hub log of changes to the devices a hub mirrors, read by the hubs'
+    delta sync (`/hubs/sync_devices?since=<seq>`). `seq` comes from
+    `Hub.device_seq`, which is incremented under the hub row's lock in the
+    same transaction as the change, so sequence order is commit order.
+    `op` is "upsert", or "delete" when the device left the hub's estate.
+    """
+    __tablename__ = "device_changes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    estate = Column(String(100), nullable=False)
+    seq = Column(Integer, nullable=False)
+    device_pk = Column(Integer, nullable=False)  # devices.id; no FK so deletions stay visible
+    op = Column(String(10), nullable=False, default="upsert")
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (Index("ix_device_changes_estate_seq", "estate", "seq", unique=True),)
+
+    @classmethod
+    def record(cls, db: Session, estate: str, device_pk: int, op: str = "upsert"):
+        """Appends a change to the caller's transaction; the caller commits."""
+        if not estate:
+            return
+        seq = db.execute(
+            update(Hub)
+            .where(Hub.name == estate)
+            .values(device_seq=Hub.device_seq + 1)
+            .returning(Hub.device_seq)
+        ).scalar()
+        if seq is not None:
+            db.add(cls(estate=estate, seq=seq, device_pk=device_pk, op=op))
+
+    @classmethod
+    def since(cls, db: Session, estate: str, seq: int) -> dict:
+        """Latest op per device changed after `seq`, as {device pk: op}."""
+        rows = (
+            db.query(cls.device_pk, cls.op)
+            .filter(cls.estate == estate, cls.seq > seq)
+            .order_by(cls.seq)
+        )
+        return {device_pk: op for device_pk, op in rows}
@@ -3,9 +3,11 @@
 
 from datetime import datetime
 from sqlalchemy import Column, Integer, String, ForeignKey, Date, JSON
-from sqlalchemy.orm import relationship, Session
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import relationship, Session, joinedload
 
 from src.db.database import Base
+from .device_changes import DeviceChange
 # ============================
 # Models
 # ============================
@@ -61,6 +63,36 @@ class Device(Base):
 
 
 
+    @classmethod
+    def find_for_hub(cls, db: Session, estate: str, device_ids: list[str], with_user: bool = False) -> dict:
+        """
+        Devices of one hub by device_id, in a single query on the unique
+        device_id index; ids that are unknown or belong to another hub are absent.
+        """
+        query = db.query(cls).filter(cls.estate == estate, cls.device_id.in_(set(device_ids)))
+        if with_user:
+            from src.db.models.users import User
+            query = query.options(joinedload(cls.user).joinedload(User.profile))
+        return {device.device_id: device for device in query}
+
+    @classmethod
+    def for_hub(cls, db: Session, estate: str, ids: list[int] = None) -> list["Device"]:
+        """A hub's devices (optionally only `ids`) with owner and profile loaded, for `to_hub_dict`."""
+        from src.db.models.users import User
+        query = db.query(cls).filter(cls.estate == estate).options(joinedload(cls.user).joinedload(User.profile))
+        if ids is not None:
+            if not ids:
+                return []
+            query = query.filter(cls.id.in_(ids))
+        return query.all()
+
+    @classmethod
+    def set_status(cls, db: Session, devices: list["Device"], status: str):
+        """Sets the status of many devices in one transaction."""
+        for device in devices:
+            device.status = status
+        db.commit()
+
     @classmethod
     def create(cls, db: Session, device_data: dict):
         device = cls(
@@ -73,6 +105,8 @@ class Device(Base):
             user_id=device_data.get("user_id")
         )
         db.add(device)
+        db.flush()
+        DeviceChange.record(db, device.estate, device.id)
         db.commit()
         db.refresh(device)
         return device
@@ -84,9 +118,15 @@ class Device(Base):
             if not device:
                 raise ValueError("Device not found for the user.")
 
+            previous_estate = device.estate
             for key, value in update_data.items():
                 setattr(device, key, value)
 
+            # Fields mirrored by the hubs (see to_hub_dict) are logged for their delta sync
+            if device.estate != previous_estate:
+                DeviceChange.record(db, previous_estate, device.id, op="delete")
+            if device.estate != previous_estate or {"device_id", "connection_type", "user_id"} & update_data.keys():
+                DeviceChange.record(db, device.estate, device.id)
             db.commit()
             db.refresh(device)
             return device
@@ -21,6 +21,7 @@ class Hub(Base):
     api_key = Column(String(64), unique=True, nullable=False, index=True)
     registered_at = Column(DateTime, default=datetime.utcnow)
     status = Column(Integer, default=0, nullable=False)  # 0: inactive, 1: active
+    device_seq = Column(Integer, default=0, server_default="0", nullable=False)  # Last DeviceChange.seq
 
     devices = relationship("Device", back_populates="hub")
 
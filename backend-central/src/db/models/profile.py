@@ -8,6 +8,7 @@ from sqlalchemy.orm import relationship, Session
 
 from src.db.database import Base
 from .users import User  # Needed for type check in create method
+from .device_changes import DeviceChange
 
 # ============================
 # Models
@@ -67,10 +68,15 @@ class Profile(Base):
         if not profile:
             raise ValueError("Profile not found")
 
+        previous_address = profile.account_address
         for key, value in update_data.items():
             if hasattr(profile, key) and value is not None:
                 setattr(profile, key, value)
 
+        if profile.account_address != previous_address:
+            # Hubs mirror each device's owner address
+            for device in profile.user.devices:
+                DeviceChange.record(db, device.estate, device.id)
         db.commit()
         db.refresh(profile)
         return profile
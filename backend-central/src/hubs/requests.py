@@ -1,5 +1,5 @@
 # src/hubs/requests.py
-from pydantic import BaseModel, constr
+from pydantic import BaseModel, conlist, constr
 
  
 class HubCreateRequest(BaseModel):
@@ -27,3 +27,15 @@ class TokenConsumptionRequest(BaseModel):
         # Allow extra fields that aren't explicitly listed in the model
         # for cases where the request includes additional data
         extra = "forbid"
+
+class DeviceBatchRequest(BaseModel):
+    device_ids: conlist(constr(min_length=1, max_length=50), min_length=1, max_length=1000)
+
+    class Config:
+        extra = "forbid"
+
+class TokenConsumptionBatchRequest(BaseModel):
+    consumptions: conlist(TokenConsumptionRequest, min_length=1, max_length=1000)
+
+    class Config:
+        extra = "forbid"
@@ -1,15 +1,20 @@
 # src/hubs/routes.py
 from src.db.models.hubs import Hub
+from src.db.models.devices import Device
+from src.db.models.device_changes import DeviceChange
 from src.db.database import get_db
 from fastapi import APIRouter, Depends, status, Query
 from sqlalchemy.orm import Session
-from src.hubs.requests import HubCreateRequest, DeviceRequest, TokenConsumptionRequest
+from src.hubs.requests import (
+    HubCreateRequest, DeviceRequest, TokenConsumptionRequest, DeviceBatchRequest, TokenConsumptionBatchRequest
+)
 from src.utils.exception_handlers import DBExceptionHandler   
-from src.schemas.responses import ListDictResponse, DictResponse, MessageResponse
+from src.schemas.responses import DictResponse, MessageResponse, BatchResponse, DeviceSyncResponse
 from src.utils.logging import logger 
 from src.utils.auth import auth_service  # ✅ Singleton AuthService
 from src.auth.responses import TokenResponse
 from src.utils.notifications import notification_manager 
+from src.utils.starknet.balances import balance_cache
 
 router = APIRouter()
 db_exception_handler = DBExceptionHandler()
@@ -42,16 +47,35 @@ def connect_hub(api_key: str = Query(..., description="API key of the hub"), db:
 
     return TokenResponse(access_token=access_token, token_type="bearer")
 
-@router.get("/sync_devices", response_model=ListDictResponse)
-def hub_devices(name: str = Depends(auth_service.get_username), db: Session = Depends(get_db)):
+@router.get("/sync_devices", response_model=DeviceSyncResponse)
+def hub_devices(
+    since: int = Query(0, ge=0, description="Last change sequence the hub applied; 0 for a full snapshot"),
+    name: str = Depends(auth_service.get_username),
+    db: Session = Depends(get_db),
+):
     hub = Hub.find(db, name=name)
     db_exception_handler.check_auth(
         condition=hub is not None,
         message="Hub not found"
     )
-    devices_list = [device.to_hub_dict() for device in hub.devices]
-    logger.info(f"{hub.name} Hub synchronization of {len(devices_list)} devices requested")
-    return ListDictResponse(data=devices_list)
+    # Read the sequence before the devices: anything committed in between is
+    # sent now and again next time, which the hub's upsert tolerates
+    seq = hub.device_seq
+    full = since == 0 or since > seq
+    if full:
+        devices = Device.for_hub(db, hub.name)
+        deleted = []
+    else:
+        changes = DeviceChange.since(db, hub.name, since)
+        devices = Device.for_hub(db, hub.name, ids=[pk for pk, op in changes.items() if op == "upsert"])
+        found = {device.id for device in devices}
+        deleted = [pk for pk in changes if pk not in found]
+    devices_list = [device.to_hub_dict() for device in devices]
+    logger.info(
+        f"{hub.name} Hub synchronization since {since}: {len(devices_list)} devices, "
+        f"{len(deleted)} removed, now at {seq}{' (full)' if full else ''}"
+    )
+    return DeviceSyncResponse(data=devices_list, deleted=deleted, seq=seq, full=full)
 
 @router.post("/shutdown", response_model=MessageResponse)
 def shutdown_hub(name: str = Depends(auth_service.get_username), db: Session = Depends(get_db)):
@@ -74,14 +98,13 @@ def activate_device(req: DeviceRequest, name: str = Depends(auth_service.get_use
         condition=hub is not None,
         message="Hub not found"
     )
-    device_list = hub.devices
     device_id = req.dict().get("device_id")
     db_exception_handler.check_auth(
         condition=device_id is not None,
         message="Device not specified"
     )
     logger.info(f"{hub.name} Hub requested activation of {device_id}")
-    device = next((d for d in device_list if d.device_id == device_id), None)
+    device = Device.find_for_hub(db, hub.name, [device_id]).get(device_id)
     db_exception_handler.check_auth(
         condition=device is not None,
         message="Device not found"
@@ -100,14 +123,13 @@ def deactivate_device(req: DeviceRequest, name: str = Depends(auth_service.get_u
         condition=hub is not None,
         message="Hub not found"
     )
-    device_list = hub.devices
     device_id = req.dict().get("device_id")
     db_exception_handler.check_auth(
         condition=device_id is not None,
         message="Device not specified"
     )
     logger.info(f"{hub.name} Hub requested deactivation of {device_id}")
-    device = next((d for d in device_list if d.device_id == device_id), None)
+    device = Device.find_for_hub(db, hub.name, [device_id]).get(device_id)
     db_exception_handler.check_auth(
         condition=device is not None,
         message="Device not found"
@@ -125,21 +147,86 @@ def token_consumption(req: TokenConsumptionRequest, name: str = Depends(auth_ser
         condition=hub is not None,
         message="Hub not found"
     )
-    device_list = hub.devices
     device_id = req.dict().get("device_id")
     db_exception_handler.check_auth(
         condition=device_id is not None,
         message="Device not specified"
     )
     logger.info(f"{hub.name} Hub requested notification of {device_id} for consume 1 SCT")
-    device = next((d for d in device_list if d.device_id == device_id), None)
+    device = Device.find_for_hub(db, hub.name, [device_id]).get(device_id)
     db_exception_handler.check_auth(
         condition=device is not None,
         message="Device not found"
     )
     user = device.user
+    if user.profile:
+        balance_cache.set_sct(user.profile.account_address, req.balance)
     notification_manager.notify_token_consumption(req.dict(), user)
     message = f"Successfully notified [{user.username}] - [{device_id}] of token consumption"
     logger.info(message)
     return MessageResponse(message=message)
 
+
+def set_devices_status(req: DeviceBatchRequest, name: str, db: Session, device_status: str) -> BatchResponse:
+    hub = Hub.find(db, name=name)
+    db_exception_handler.check_auth(
+        condition=hub is not None,
+        message="Hub not found"
+    )
+    logger.info(f"{hub.name} Hub requested {device_status} status for {len(req.device_ids)} devices")
+    devices = Device.find_for_hub(db, hub.name, req.device_ids)
+    db_exception_handler.handle(lambda: Device.set_status(db, list(devices.values()), device_status))
+    results = [
+        {"device_id": device_id, "ok": True, "message": f"{hub.name} Hub successfully made {device_id} {device_status}"}
+        if device_id in devices else
+        {"device_id": device_id, "ok": False, "error": "Device not found"}
+        for device_id in req.device_ids
+    ]
+    message = f"{hub.name} Hub made {len(devices)} of {len(req.device_ids)} devices {device_status}"
+    logger.info(message)
+    return BatchResponse(message=message, results=results)
+
+
+@router.post("/activate_devices", response_model=BatchResponse)
+def activate_devices(req: DeviceBatchRequest, name: str = Depends(auth_service.get_username), db: Session = Depends(get_db)):
+    return set_devices_status(req, name, db, "active")
+
+
+@router.post("/deactivate_devices", response_model=BatchResponse)
+def deactivate_devices(req: DeviceBatchRequest, name: str = Depends(auth_service.get_username), db: Session = Depends(get_db)):
+    return set_devices_status(req, name, db, "inactive")
+
+
+@router.post("/token_consumptions", response_model=BatchResponse)
+def token_consumptions(req: TokenConsumptionBatchRequest, name: str = Depends(auth_service.get_username), db: Session = Depends(get_db)):
+    hub = Hub.find(db, name=name)
+    db_exception_handler.check_auth(
+        condition=hub is not None,
+        message="Hub not found"
+    )
+    logger.info(f"{hub.name} Hub requested notification of {len(req.consumptions)} token consumptions")
+    devices = Device.find_for_hub(db, hub.name, [c.device_id for c in req.consumptions], with_user=True)
+    results = []
+    for consumption in req.consumptions:
+        device = devices.get(consumption.device_id)
+        if device is None:
+            results.append({"device_id": consumption.device_id, "ok": False, "error": "Device not found"})
+            continue
+        user = device.user
+        if user.profile:
+            balance_cache.set_sct(user.profile.account_address, consumption.balance)
+        try:
+            notification_manager.notify_token_consumption(consumption.dict(), user)
+        except Exception as e:
+            logger.error(f"Token consumption notification for {consumption.device_id} failed: {e}")
+            results.append({"device_id": consumption.device_id, "ok": False, "error": "Notification failed"})
+            continue
+        results.append({
+            "device_id": consumption.device_id,
+            "ok": True,
+            "message": f"Successfully notified [{user.username}] - [{consumption.device_id}] of token consumption",
+        })
+    notified = sum(result["ok"] for result in results)
+    message = f"{hub.name} Hub notified {notified} of {len(results)} token consumptions"
+    logger.info(message)
+    return BatchResponse(message=message, results=results)
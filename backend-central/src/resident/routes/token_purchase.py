@@ -11,6 +11,7 @@ from src.utils.exception_handlers import DBExceptionHandler   # Correct lowercas
 from src.utils.auth import auth_service
 from src.utils.logging import logger
 from src.utils.starknet import sct
+from src.utils.starknet.balances import balance_cache
 
 db_exception_handler = DBExceptionHandler()
 router = APIRouter()
@@ -66,6 +67,7 @@ async def add_strk(
         lambda: sct.buy_tokens(buyer_address=buyer_address, amount=purchase_req.amount_sct),
         error_message="Blockchain transaction failed"
     )
+    await balance_cache.invalidate(buyer_address)
     # 4) Prepare purchase data
     data = purchase_req.dict()
     data["sct_tx_hash"] = sct_tx_hash
@@ -162,6 +164,7 @@ async def initiate_stk_push(
         lambda: sct.buy_tokens(buyer_address=buyer_address, amount=purchase_req.get("amount_sct")),
         error_message="Blockchain transaction failed"
     )
+    await balance_cache.invalidate(buyer_address)
     # 4) Prepare purchase data
     data = purchase_req.copy()
     data["sct_tx_hash"] = sct_tx_hash
@@ -12,6 +12,7 @@ from src.utils.exception_handlers import DBExceptionHandler   # Correct lowercas
 from src.utils.auth import auth_service
 from src.utils.logging import logger
 from src.utils.starknet import sct
+from src.utils.starknet.balances import balance_cache
 from src.utils.notifications import notification_manager 
 
 db_exception_handler = DBExceptionHandler()
@@ -65,6 +66,9 @@ async def create_trade(
 
     # 4) Save to DB
     new_trade = TradeRequest.create(db, data)
+    # The trade's tokens left the user's account in their own transaction
+    if user.profile:
+        await balance_cache.invalidate(user.profile.account_address)
                        
     return DictResponse(data=new_trade.to_dict())
 
@@ -94,6 +98,8 @@ async def cancel_trade(
 
     # 4) Update status and tx_hash
     trade.cancel(db, request.tx_hash)
+    if user.profile:
+        await balance_cache.invalidate(user.profile.account_address)
     # 5) Return updated trade dict
     trade_dict = trade.to_dict()
     logger.info(f"Trade cancelled successfully for user: {user.username}")
@@ -151,6 +157,7 @@ async def accept_trade(
         # tx_hash = await sct.signTrade(buyer_address=buyer_address, amount=amount, trade_id=trade_id )
         tx_hash = await sct.transfer(buyer_address=buyer_address, amount=amount)
         trade.accept(db, tx_hash, trade_req.tx_hash, user.id)
+        await balance_cache.invalidate(buyer_address)
         message = f"Trade {trade.id} was Accepted by {user.username}"
         logger.info(message)
         notification_manager.notify_trade_accepted(trade)
@@ -11,7 +11,7 @@ from src.utils.auth import auth_service  # ✅ Singleton AuthService
 from src.utils.email import email_client  # ✅ Singleton AuthService
 from src.utils.exception_handlers import DBExceptionHandler
 from src.utils.logging import logger 
-from src.utils.starknet import stark, sct
+from src.utils.starknet.balances import balance_cache
 
 db_exception_handler = DBExceptionHandler()
 
@@ -111,8 +111,8 @@ async def get_details(username: str = Depends(auth_service.get_username), db: Se
         account_address = profile.account_address
 
         try:
-            strk_balance = await stark.balanceOf(account_address)
-            sct_balance = await sct.balanceOf(account_address)
+            balances = await balance_cache.get(account_address)
+            strk_balance, sct_balance = balances["strk"], balances["sct"]
         except Exception as e:
             logger.warning(f"Balance fetch failed for {username}: {e}")
         else:
@@ -14,3 +14,19 @@ class ListDictResponse(BaseModel):
     success: bool = True
     data: List[Dict[str, Any]]
 
+class BatchResponse(BaseModel):
+    """Per-item outcome of a batch request, in request order."""
+    success: bool = True
+    message: str
+    results: List[Dict[str, Any]]
+
+class DeviceSyncResponse(BaseModel):
+    """
+    Devices changed after the hub's checkpoint (all of them when `full`),
+    ids that left the hub, and the sequence to checkpoint next.
+    """
+    success: bool = True
+    data: List[Dict[str, Any]]
+    deleted: List[int] = []
+    seq: int
+    full: bool
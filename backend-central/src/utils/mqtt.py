@@ -1,9 +1,11 @@
 # /src/utils/mqtt.py
 
 import paho.mqtt.client as mqtt
+from paho.mqtt.client import CallbackAPIVersion
 import threading
-import json
 from src.config import settings 
+from src.utils.codec import CODECS_SUFFIX, CODECS_TOPIC, advertisement, for_content_type, get_codec, negotiate
+from src.utils.telemetry import FRAME_TOPIC, split_frame
 import asyncio
 mqtt_event_loop = None  # Global asyncio loop
 
@@ -13,31 +15,66 @@ mqtt_lock = threading.Lock()
 
 # Store listeners for topic-based callbacks
 topic_callbacks = {}
+# Estate telemetry frame topics, demultiplexed into the "{estate}/power/{id}" callbacks
+frame_topics = set()
+# Codec advertisement of each estate hub; commands use MQTT_CODEC only where the hub decodes it.
+# Received messages are decoded by their Content Type
+estate_codecs = {}
 
-def on_connect(client, userdata, flags, rc):
-    print(f"[MQTT] Connected with result code {rc}")
+def on_connect(client, userdata, flags, reason_code, properties):
+    print(f"[MQTT] Connected with result code {reason_code}")
+    client.publish(CODECS_TOPIC, advertisement(), qos=1, retain=True, properties=get_codec("json").properties())
+    client.subscribe(f"+/{CODECS_SUFFIX}", qos=1)
     # Subscribe to any topics that were registered before connection
-    for topic in topic_callbacks.keys():
+    for topic in list(topic_callbacks.keys()) + list(frame_topics):
         client.subscribe(topic)
         print(f"[MQTT] Subscribed to {topic}")
 
+def dispatch(callback, data):
+    # If it's a coroutine, run it in the asyncio event loop
+    if asyncio.iscoroutinefunction(callback):
+        if mqtt_event_loop is not None:
+            asyncio.run_coroutine_threadsafe(callback(data), mqtt_event_loop)
+        else:
+            print("[MQTT] No asyncio loop registered")
+    else:
+        callback(data)
+
+def on_frame(topic: str, frame):
+    """
+    Splits an estate telemetry frame into per-device readings for the registered power listeners.
+    """
+    estate = topic[:-len(FRAME_TOPIC) - 1]
+    try:
+        readings = split_frame(frame)
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        print(f"[MQTT] Invalid telemetry frame on {topic}: {e}")
+        return
+    for device_id, reading in readings:
+        callback = topic_callbacks.get(f"{estate}/power/{device_id}")
+        if callback:
+            dispatch(callback, reading)
+
 def on_message(client, userdata, msg):
+    estate, _, name = msg.topic.partition("/")
+    if name == CODECS_SUFFIX:
+        estate_codecs[estate] = msg.payload
+        return
+    codec = None
+    try:
+        codec = for_content_type(getattr(msg.properties, "ContentType", None))
+        data = codec.decode(msg.payload)
+    except Exception as e:
+        if codec is None or codec.name != "json":
+            print(f"[MQTT] Dropped message on {msg.topic}: {e}")
+            return
+        data = msg.payload.decode(errors="replace")  # Plain text from a JSON peer
+    if msg.topic in frame_topics:
+        on_frame(msg.topic, data)
+        return
     callback = topic_callbacks.get(msg.topic)
     if callback:
-        payload = msg.payload.decode()
-        try:
-            data = json.loads(payload)
-        except json.JSONDecodeError:
-            data = payload
-
-        # If it's a coroutine, run it in the asyncio event loop
-        if asyncio.iscoroutinefunction(callback):
-            if mqtt_event_loop is not None:
-                asyncio.run_coroutine_threadsafe(callback(data), mqtt_event_loop)
-            else:
-                print("[MQTT] No asyncio loop registered")
-        else:
-            callback(data)
+        dispatch(callback, data)
     else:
         print(f"[MQTT] No callback registered for topic {msg.topic}")
 
@@ -45,7 +82,7 @@ def init_mqtt():
     global mqtt_client
     with mqtt_lock:
         if mqtt_client is None:
-            client = mqtt.Client()
+            client = mqtt.Client(callback_api_version=CallbackAPIVersion.VERSION2, protocol=mqtt.MQTTv5)
             client.username_pw_set(settings.MQTT_USERNAME, settings.MQTT_PASSWORD)
             client.tls_set()
 
@@ -59,9 +96,9 @@ def init_mqtt():
 
 def publish_command(topic: str, payload: dict):
     client = init_mqtt()
-    message = json.dumps(payload)
-    client.publish(topic, message)
-    print(f"[MQTT] Published to {topic}: {message}")
+    codec = negotiate(settings.MQTT_CODEC, estate_codecs.get(topic.partition("/")[0]))
+    client.publish(topic, codec.encode(payload), properties=codec.properties())
+    print(f"[MQTT] Published to {topic} ({codec.name}): {payload}")
 
 def register_listener(topic: str, callback, loop=None):
     global mqtt_event_loop
@@ -72,4 +109,12 @@ def register_listener(topic: str, callback, loop=None):
     client.subscribe(topic)
     print(f"[MQTT] Listener registered for {topic}")
 
+    # A power listener is also fed from its estate's frames, whichever mode the hub uses
+    estate, separator, _ = topic.partition("/power/")
+    frame_topic = f"{estate}/{FRAME_TOPIC}"
+    if separator and frame_topic != topic and frame_topic not in frame_topics:
+        frame_topics.add(frame_topic)
+        client.subscribe(frame_topic)
+        print(f"[MQTT] Subscribed to telemetry frames on {frame_topic}")
+
 
@@ -0,0 +1,88 @@
+# src/utils/starknet/balances.py
+import asyncio
+from src.config import settings
+from src.utils.logging import logger
+from src.utils.redis import redis_client
+from . import stark, sct
+from .rpc_batch import rpc_batch_client
+
+TOKENS = {"strk": stark, "sct": sct}
+
+
+class BalanceCache:
+    """
+    STRK and SCT balances per account address, cached in Redis for `ttl`
+    seconds so that page views share one RPC round-trip instead of making
+    their own; a miss reads both balances in a single JSON-RPC batch.
+    Concurrent misses for the same address in a worker wait on a single fetch.
+
+    Entries are dropped when central itself moves tokens (purchases, trades)
+    and the SCT balance is overwritten with the one hubs report after a
+    consume, so a cached value never lags behind a change central knows of.
+
+    The Redis client is synchronous: the async methods run its calls in a
+    worker thread, so a slow or failing Redis never blocks the event loop.
+    `set_sct` is called from the sync hub routes, already off the loop.
+    """
+
+    def __init__(self, ttl: int = settings.BALANCE_CACHE_TTL):
+        self.client = redis_client.client
+        self.ttl = ttl
+        self._fetches = {}
+
+    def key(self, account_address: str) -> str:
+        return f"balances:{hex(int(account_address, 16))}"
+
+    async def get(self, account_address: str) -> dict:
+        """Returns {"strk": float, "sct": int} for the address, from Redis when cached."""
+        key = self.key(account_address)
+        try:
+            cached = await asyncio.to_thread(self.client.hgetall, key)
+        except Exception as e:
+            # The cache is an optimisation: without Redis, read from the node
+            logger.warning(f"Balance cache read failed for {account_address}: {e}")
+            cached = {}
+        if "strk" in cached and "sct" in cached:
+            return {"strk": float(cached["strk"]), "sct": int(cached["sct"])}
+        fetch = self._fetches.get(key)
+        if fetch is None:
+            fetch = asyncio.ensure_future(self._fetch(key, account_address, cached))
+            self._fetches[key] = fetch
+            fetch.add_done_callback(lambda _: self._fetches.pop(key, None))
+        return await asyncio.shield(fetch)
+
+    async def _fetch(self, key: str, account_address: str, cached: dict) -> dict:
+        # A hub-reported SCT balance may already be cached; only fetch what is missing
+        missing = [name for name in TOKENS if name not in cached]
+        results = await rpc_batch_client.call_many([TOKENS[name].balance_call(account_address) for name in missing])
+        balances = {"strk": float(cached.get("strk", 0)), "sct": int(cached.get("sct", 0))}
+        balances.update({name: TOKENS[name].decode_balance(result) for name, result in zip(missing, results)})
+        try:
+            await asyncio.to_thread(self._store, key, balances)
+        except Exception as e:
+            logger.warning(f"Balance cache write failed for {account_address}: {e}")
+        return balances
+
+    def _store(self, key: str, balances: dict):
+        pipe = self.client.pipeline()
+        pipe.hset(key, mapping=balances)
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def set_sct(self, account_address: str, balance: int):
+        """Stores the SCT balance a hub reported after consuming tokens."""
+        key = self.key(account_address)
+        try:
+            self._store(key, {"sct": balance})
+        except Exception as e:
+            logger.warning(f"Balance cache update failed for {account_address}: {e}")
+
+    async def invalidate(self, account_address: str):
+        """Drops the cached balances, e.g. after a token purchase or transfer."""
+        try:
+            await asyncio.to_thread(self.client.delete, self.key(account_address))
+        except Exception as e:
+            logger.warning(f"Balance cache invalidation failed for {account_address}: {e}")
+
+
+balance_cache = BalanceCache()
@@ -0,0 +1,163 @@
+# src/utils/starknet/nonces.py
+import asyncio
+import heapq
+from starknet_py.net.account.account import Account
+from starknet_py.net.client_errors import ClientError
+from src.utils.logging import logger
+
+
+# JSON-RPC INVALID_TRANSACTION_NONCE, and the node's names for it in error messages
+NONCE_ERROR_CODES = {52}
+NONCE_ERROR_NAMES = ("InvalidTransactionNonce", "Invalid transaction nonce")
+
+
+def is_nonce_error(error: Exception) -> bool:
+    """True if the node rejected a transaction for its nonce, following wrapped causes."""
+    while error is not None:
+        if isinstance(error, ClientError):
+            try:
+                if int(error.code) in NONCE_ERROR_CODES:
+                    return True
+            except (TypeError, ValueError):
+                pass
+            if any(name in f"{error.message} {error.data}" for name in NONCE_ERROR_NAMES):
+                return True
+        error = error.__cause__
+    return False
+
+
+class NonceManager:
+    """
+    Hands out sequential nonces for one signing account, so concurrent
+    submitters can each send a transaction without waiting for the previous
+    one to be accepted.
+
+    The first nonce comes from the node (pending block); later ones are
+    counted locally. A nonce whose transaction failed before it was sent goes
+    on a free list and is handed out again first. If transactions with higher
+    nonces are already in flight, the node holds them up until the gap is
+    used, so `filler(nonce)`, when given, sends a no-op with each such free
+    nonce straight away, retrying every `fill_retry` seconds. A submission rejected for
+    its nonce is retried with a fresh one up to `max_retries` times; the
+    counter is then resynced from the node, exactly when no other transaction
+    is in flight, otherwise only ever forward (e.g. past a transaction the
+    account sent from elsewhere).
+    """
+
+    def __init__(self, account: Account, max_retries: int = 2, filler=None, fill_retry: float = 5):
+        self.account = account
+        self.max_retries = max_retries
+        self.filler = filler  # async (nonce) -> sends a no-op transaction with that nonce
+        self.fill_retry = fill_retry
+        self._filling = None
+        self._next = None
+        self._free = []  # Heap of nonces returned unused
+        self._inflight = set()  # Allocated, until their transaction is settled
+        self._lock = asyncio.Lock()
+        self.allocated = 0
+        self.reused = 0
+        self.filled = 0
+        self.resyncs = 0
+
+    async def allocate(self) -> int:
+        async with self._lock:
+            if self._free:
+                nonce = heapq.heappop(self._free)
+                self.reused += 1
+            else:
+                if self._next is None:
+                    self._next = await self.account.get_nonce(block_number="pending")
+                nonce = self._next
+                self._next += 1
+            self._inflight.add(nonce)
+            self.allocated += 1
+            return nonce
+
+    async def resync(self):
+        """
+        Restarts the count from the account's nonce in the pending block, or
+        only moves it forward while other transactions are in flight.
+        """
+        async with self._lock:
+            nonce = await self.account.get_nonce(block_number="pending")
+            if not self._inflight or self._next is None:
+                self._next = nonce
+                self._free.clear()
+            else:
+                self._next = max(self._next, nonce)
+                self._free = [free for free in self._free if free >= nonce]
+                heapq.heapify(self._free)
+            self.resyncs += 1
+
+    def _release(self, nonce: int, sent: bool):
+        self._inflight.discard(nonce)
+        if not sent:
+            heapq.heappush(self._free, nonce)
+            if self.filler is not None and (self._filling is None or self._filling.done()):
+                self._filling = asyncio.ensure_future(self._fill_gaps())
+
+    async def _fill_gaps(self):
+        """Uses up every free nonce below an in-flight one, which would otherwise stall it."""
+        while True:
+            async with self._lock:
+                if not self._free or not self._inflight or self._free[0] > max(self._inflight):
+                    return
+                nonce = heapq.heappop(self._free)
+                self._inflight.add(nonce)
+            try:
+                await self.filler(nonce)
+            except Exception as e:
+                self._inflight.discard(nonce)
+                if is_nonce_error(e):
+                    continue  # Already used on chain, nothing to fill
+                heapq.heappush(self._free, nonce)
+                logger.warning(f"[Nonces] - filling gap at nonce {nonce} failed, retrying in {self.fill_retry}s: {e}")
+                await asyncio.sleep(self.fill_retry)
+                continue
+            self._inflight.discard(nonce)
+            self.filled += 1
+            logger.info(f"[Nonces] - gap at nonce {nonce} filled with a no-op")
+
+    async def execute(self, send, wait=None):
+        """
+        Calls `send(nonce)`, a coroutine function that signs and sends one
+        transaction, with the next nonce, and returns its result. If given,
+        `await wait(result)` runs next, e.g. waiting for acceptance, and the
+        nonce counts as in flight until it returns; its errors are the caller's.
+        """
+        for attempt in range(self.max_retries + 1):
+            nonce = await self.allocate()
+            try:
+                result = await send(nonce)
+                break
+            except Exception as e:
+                if not is_nonce_error(e):
+                    self._release(nonce, sent=False)
+                    raise
+                # The nonce is used up or out of step with the node
+                self._release(nonce, sent=True)
+                try:
+                    await self.resync()
+                except Exception as resync_error:
+                    logger.warning(f"[Nonces] - resync failed: {resync_error}")
+                if attempt < self.max_retries:
+                    logger.warning(f"[Nonces] - nonce {nonce} rejected, retrying: {e}")
+                    continue
+                raise
+        try:
+            if wait is not None:
+                await wait(result)
+            return result
+        finally:
+            self._release(nonce, sent=True)
+
+    def stats(self) -> dict:
+        return {
+            "next": self._next,
+            "allocated": self.allocated,
+            "reused": self.reused,
+            "filled": self.filled,
+            "inflight": len(self._inflight),
+            "free": len(self._free),
+            "resyncs": self.resyncs,
+        }
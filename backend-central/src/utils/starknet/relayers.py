@@ -0,0 +1,178 @@
+# src/utils/starknet/relayers.py
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from starknet_py.contract import Contract, InvokeResult
+from starknet_py.hash.selector import get_selector_from_name
+from starknet_py.net.account.account import Account, KeyPair
+from starknet_py.net.client_models import Call
+from starknet_py.net.full_node_client import FullNodeClient
+from starknet_py.net.models.chains import StarknetChainId
+
+from src.utils.logging import logger
+from . import stark
+from .nonces import NonceManager
+from .rpc_batch import rpc_batch_client
+
+
+class Relayer:
+    """
+    One signing account: its SCT contract handle, nonce counter, the
+    contract methods it may call, and what the pool tracks about it.
+    """
+
+    def __init__(self, client: FullNodeClient, address: str, private_key, contract_address: str, abi, methods):
+        self.account = Account(
+            client=client,
+            address=address,
+            key_pair=KeyPair.from_private_key(key=private_key),
+            chain=StarknetChainId.SEPOLIA,
+        )
+        self.contract = Contract(address=contract_address, abi=abi, provider=self.account, cairo_version=1)
+        self.nonces = NonceManager(self.account, filler=self._fill_nonce)
+        self.methods = set(methods)
+        self.inflight = 0  # Transactions sent and not yet accepted
+        self.fee_balance = None  # STRK available for fees, None until read
+        self.sct_balance = None  # Own SCT, the source of `transfer`
+        self.sent = 0
+
+    async def _fill_nonce(self, nonce: int):
+        """Uses up `nonce` with a no-op: a `balanceOf` of this account, which changes nothing."""
+        call = self.contract.functions["balanceOf"].prepare_invoke_v3(self.account.address)
+        await self.account.execute_v3(calls=[call], nonce=nonce, auto_estimate=True)
+
+    @property
+    def address(self) -> str:
+        return hex(self.account.address)
+
+    def to_dict(self) -> dict:
+        return {
+            "address": self.address,
+            "methods": sorted(self.methods),
+            "inflight": self.inflight,
+            "fee_balance": self.fee_balance,
+            "sct_balance": self.sct_balance,
+            "sent": self.sent,
+            "nonce": self.nonces.stats()["next"],
+        }
+
+
+class RelayerPool:
+    """
+    Spreads contract invocations across several signing accounts.
+
+    Each invocation goes to the least-loaded relayer (fewest transactions
+    awaiting acceptance) among those allowed to call the method, holding
+    at least `min_fee_balance` STRK for fees and, for `transfer`, enough
+    SCT of their own. Fee and SCT balances of every relayer are read in
+    one JSON-RPC batch every `refresh_interval` seconds; in between, each
+    transaction's maximum fee and transferred SCT are deducted locally.
+    Every relayer signs with its own nonce counter, so a burst runs up to
+    one pipeline of in-flight transactions per account.
+    """
+
+    def __init__(self, relayers: list[Relayer], min_fee_balance: float = 1.0, refresh_interval: float = 60):
+        if not relayers:
+            raise ValueError("A relayer pool needs at least one account")
+        self.relayers = relayers
+        self.min_fee_balance = min_fee_balance
+        self.refresh_interval = refresh_interval
+        self._refreshed = 0.0
+        self._refresh_lock = asyncio.Lock()
+
+    # ---- Balances ----
+    async def refresh(self):
+        """Reads every relayer's STRK and SCT balance in one batch."""
+        calls = []
+        for relayer in self.relayers:
+            calls.append(stark.balance_call(relayer.address))
+            calls.append(Call(
+                to_addr=relayer.contract.address,
+                selector=get_selector_from_name("balanceOf"),
+                calldata=[relayer.account.address],
+            ))
+        results = await rpc_batch_client.call_many(calls, return_exceptions=True)
+        for index, relayer in enumerate(self.relayers):
+            fee, sct = results[2 * index], results[2 * index + 1]
+            if not isinstance(fee, Exception):
+                relayer.fee_balance = stark.decode_balance(fee)
+            if not isinstance(sct, Exception):
+                relayer.sct_balance = sct[0] + (sct[1] << 128)
+        self._refreshed = time.monotonic()
+
+    async def _maybe_refresh(self):
+        if time.monotonic() - self._refreshed < self.refresh_interval:
+            return
+        async with self._refresh_lock:
+            if time.monotonic() - self._refreshed < self.refresh_interval:
+                return
+            try:
+                await self.refresh()
+            except Exception as e:
+                # Keep the local tracking; try again on the next invocation
+                logger.warning(f"Relayer balance refresh failed: {e}")
+                self._refreshed = time.monotonic() - self.refresh_interval + 5
+
+    # ---- Selection ----
+    def _eligible(self, relayer: Relayer, method: str, sct_amount: int) -> bool:
+        if method not in relayer.methods:
+            return False
+        if relayer.fee_balance is not None and relayer.fee_balance < self.min_fee_balance:
+            return False
+        if sct_amount and relayer.sct_balance is not None and relayer.sct_balance < sct_amount:
+            return False
+        return True
+
+    def select(self, method: str, sct_amount: int = 0) -> Relayer:
+        candidates = [r for r in self.relayers if self._eligible(r, method, sct_amount)]
+        if not candidates:
+            raise RuntimeError(f"No relayer account can sign {method} (fee or SCT balance too low)")
+        return min(candidates, key=lambda r: (r.inflight, -(r.fee_balance or 0)))
+
+    @asynccontextmanager
+    async def signer(self, method: str, sct_amount: int = 0):
+        """Reserves the least-loaded eligible relayer for one transaction."""
+        await self._maybe_refresh()
+        relayer = self.select(method, sct_amount)
+        relayer.inflight += 1
+        if sct_amount and relayer.sct_balance is not None:
+            relayer.sct_balance -= sct_amount
+        try:
+            yield relayer
+        except Exception:
+            # The transfer may not have happened; re-read rather than guess
+            self._refreshed = 0.0
+            raise
+        finally:
+            relayer.inflight -= 1
+
+    # ---- Invocation ----
+    async def invoke(self, method: str, sct_amount: int = 0, **inputs) -> InvokeResult:
+        """
+        Calls `method` of the SCT contract from a pooled relayer and waits for
+        acceptance. `sct_amount` is the relayer's own SCT the call spends.
+        """
+        async with self.signer(method, sct_amount) as relayer:
+
+            async def accepted(invocation: InvokeResult):
+                relayer.sent += 1
+                if relayer.fee_balance is not None:
+                    relayer.fee_balance -= self._max_fee(invocation)
+                logger.info(f"{method} sent from relayer {relayer.address}: {hex(invocation.hash)}")
+                await invocation.wait_for_acceptance()
+
+            return await relayer.nonces.execute(
+                lambda nonce: relayer.contract.functions[method].invoke_v3(**inputs, nonce=nonce, auto_estimate=True),
+                wait=accepted,
+            )
+
+    @staticmethod
+    def _max_fee(invocation: InvokeResult) -> float:
+        bounds = invocation.invoke_transaction.resource_bounds
+        fri = sum(
+            b.max_amount * b.max_price_per_unit for b in (bounds.l1_gas, bounds.l1_data_gas, bounds.l2_gas)
+        )
+        return fri / 1e18
+
+    def stats(self) -> list[dict]:
+        return [relayer.to_dict() for relayer in self.relayers]
@@ -0,0 +1,131 @@
+# src/utils/starknet/rpc_batch.py
+import asyncio
+import aiohttp
+from starknet_py.net.client_models import Call
+from src.config import settings
+
+
+class RpcBatchError(ValueError):
+    """A `starknet_call` in a batch answered with a JSON-RPC error."""
+
+
+class RpcBatchClient:
+    """
+    Read-only contract calls packed into JSON-RPC batch payloads.
+
+    `call_many` splits the calls into batches of `batch_size` `starknet_call`
+    requests, each sent as a single HTTP POST, with at most `max_concurrency`
+    batches in flight. Hundreds of `balanceOf` reads thus cost a handful of
+    requests instead of one each. If the node does not accept batches, the
+    calls of a batch are sent one at a time. The client keeps one keep-alive
+    session, opened on first use on the caller's event loop.
+    """
+
+    def __init__(
+        self,
+        node_url: str = settings.STARKNET_RPC_URL,
+        batch_size: int = settings.STARKNET_RPC_BATCH_SIZE,
+        max_concurrency: int = settings.STARKNET_RPC_CONCURRENCY,
+        timeout: float = 30,
+    ):
+        self.node_url = node_url
+        self.batch_size = max(batch_size, 1)
+        self.max_concurrency = max(max_concurrency, 1)
+        self.timeout = timeout
+        self._http = None
+        self._loop = None
+        self.batches = 0
+        self.calls = 0
+
+    def _session(self) -> aiohttp.ClientSession:
+        # A session is bound to the loop it was opened on
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._http.closed or self._loop is not loop:
+            self._http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._loop = loop
+        return self._http
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+
+    @staticmethod
+    def _request(id: int, call: Call, block_number=None) -> dict:
+        block_id = "pending" if block_number is None else (
+            block_number if isinstance(block_number, str) else {"block_number": block_number}
+        )
+        return {
+            "jsonrpc": "2.0",
+            "id": id,
+            "method": "starknet_call",
+            "params": {
+                "request": {
+                    "contract_address": hex(call.to_addr),
+                    "entry_point_selector": hex(call.selector),
+                    "calldata": [hex(value) for value in call.calldata],
+                },
+                "block_id": block_id,
+            },
+        }
+
+    @staticmethod
+    def _result(response: dict):
+        if "error" in response:
+            error = response["error"]
+            raise RpcBatchError(f"{error.get('message')} ({error.get('code')}): {error.get('data')}")
+        return [int(value, 16) for value in response["result"]]
+
+    async def call_many(self, calls: list[Call], block_number=None, return_exceptions: bool = False) -> list:
+        """
+        Results of `calls` in order, as felt lists, optionally as of `block_number`.
+        A failed call raises, or is returned as its exception with `return_exceptions`.
+        """
+        if not calls:
+            return []
+        requests = [self._request(id, call, block_number) for id, call in enumerate(calls)]
+        session = self._session()
+        slots = asyncio.Semaphore(self.max_concurrency)
+        batches = [
+            self._send_batch(session, slots, requests[start:start + self.batch_size])
+            for start in range(0, len(requests), self.batch_size)
+        ]
+        answered = await asyncio.gather(*batches)
+        responses = {id: response for batch in answered for id, response in batch}
+        results = []
+        for id in range(len(calls)):
+            try:
+                response = responses.get(id)
+                if response is None:
+                    raise RpcBatchError(f"No response to call {id}")
+                results.append(self._result(response))
+            except RpcBatchError as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+
+    async def _send_batch(self, session: aiohttp.ClientSession, slots: asyncio.Semaphore, batch: list[dict]) -> list:
+        async with slots:
+            self.batches += 1
+            self.calls += len(batch)
+            async with session.post(self.node_url, json=batch) as response:
+                body = await response.json(content_type=None)
+            if isinstance(body, list):
+                return [(item.get("id"), item) for item in body]
+            # Batching unsupported (a single error object): one request per call
+            answered = []
+            for request in batch:
+                async with session.post(self.node_url, json=request) as response:
+                    answered.append((request["id"], await response.json(content_type=None)))
+            return answered
+
+    def stats(self) -> dict:
+        return {"batches": self.batches, "calls": self.calls}
+
+
+
+rpc_batch_client = RpcBatchClient()
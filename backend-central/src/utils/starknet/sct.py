@@ -4,9 +4,12 @@ from starknet_py.net.account.account import Account, KeyPair
 from starknet_py.net.full_node_client import FullNodeClient
 from starknet_py.net.models.chains import StarknetChainId
 from starknet_py.contract import Contract
+from starknet_py.hash.selector import get_selector_from_name
+from starknet_py.net.client_models import Call
 
 from src.config import settings
 from .abi import sct_abi
+from .relayers import Relayer, RelayerPool
 
 
 # Configure your StarkNet account
@@ -26,6 +29,19 @@ account = Account(
 contract_address = settings.SCT_CONTRACT_ADDRESS
 contract = Contract(address=contract_address, abi=sct_abi, provider=account, cairo_version=1)
 
+# Writes are signed by the main account (the contract owner, allowed every method)
+# or, for the methods STARKNET_RELAYER_METHODS lists, a configured relayer, whichever is least loaded
+relayer_pool = RelayerPool(
+    [Relayer(client, settings.STARKNET_ACCOUNT_ADDRESS, settings.STARKNET_PRIVATE_KEY, contract_address, sct_abi,
+             methods=("buy", "signTrade", "transfer"))]
+    + [
+        Relayer(client, address, private_key, contract_address, sct_abi, methods=settings.STARKNET_RELAYER_METHODS)
+        for address, private_key in (entry.split(":", 1) for entry in settings.STARKNET_RELAYERS)
+    ],
+    min_fee_balance=settings.STARKNET_RELAYER_MIN_FEE,
+    refresh_interval=settings.STARKNET_RELAYER_REFRESH,
+)
+
 
 async def buy_tokens(buyer_address: str, amount: int) -> str:
     """
@@ -35,15 +51,10 @@ async def buy_tokens(buyer_address: str, amount: int) -> str:
     buyer_int = int(buyer_address, 16)
 
     try:
-        invocation = await contract.functions["buy"].invoke_v3(
-            buyer=buyer_int,
-            amount=int(amount),
-            auto_estimate=True,
-        )
+        invocation = await relayer_pool.invoke("buy", buyer=buyer_int, amount=int(amount))
     except Exception as e:
         raise RuntimeError(f"Contract invocation failed: {e}")
 
-    await invocation.wait_for_acceptance()
     return hex(invocation.hash)
 
 
@@ -54,6 +65,21 @@ async def balanceOf(account_address: str) -> int:
     (saved,) = await contract.functions["balanceOf"].call(int(account_address, 16))
     return saved
 
+
+def balance_call(account_address: str) -> Call:
+    """
+    A raw `balanceOf` call, for reading many balances with `rpc_batch_client.call_many`.
+    """
+    return Call(to_addr=contract.address, selector=get_selector_from_name("balanceOf"), calldata=[int(account_address, 16)])
+
+
+def decode_balance(result: list[int]) -> int:
+    """
+    Decodes the u256 [low, high] returned by a `balance_call`.
+    """
+    return result[0] + (result[1] << 128)
+
+
 async def signTrade(buyer_address: str, trade_id: int, amount: int) -> str:
     """
     Buys tokens using the provided StarkNet address and amount.
@@ -66,13 +92,8 @@ async def signTrade(buyer_address: str, trade_id: int, amount: int) -> str:
     try:
         # Call the contract's 'buy' method
         # Assuming amount is a Decimal like Decimal("10.5")
-        invocation = await contract.functions["signTrade"].invoke_v3(
-            buyer=buyer_int,
-            trade_id=int(trade_id),
-            auto_estimate=True,
-        )
-        # Wait for transaction to be accepted
-        await invocation.wait_for_acceptance()
+        # Waits for the transaction to be accepted
+        invocation = await relayer_pool.invoke("signTrade", buyer=buyer_int, trade_id=int(trade_id))
 
         # # Pay Trade
         # invocation = await contract.functions["payTrade"].invoke_v3(
@@ -101,13 +122,11 @@ async def transfer(buyer_address: str, amount: int) -> str:
     try:
         # Call the contract's 'buy' method
         # Assuming amount is a Decimal like Decimal("10.5")
-        invocation = await contract.functions["transfer"].invoke_v3(
-            reciepient=buyer_int,   
-            amount=int(amount),
-            auto_estimate=True,
+        # Paid from the signer's own SCT: the owner's escrow, or a relayer's if
+        # STARKNET_RELAYER_METHODS allows it; waits for the transaction to be accepted
+        invocation = await relayer_pool.invoke(
+            "transfer", sct_amount=int(amount), reciepient=buyer_int, amount=int(amount)
         )
-        # Wait for transaction to be accepted
-        await invocation.wait_for_acceptance()
         
         return hex(invocation.hash)
 
@@ -4,6 +4,8 @@ from starknet_py.net.account.account import Account, KeyPair
 from starknet_py.net.full_node_client import FullNodeClient
 from starknet_py.net.models.chains import StarknetChainId
 from starknet_py.contract import Contract
+from starknet_py.hash.selector import get_selector_from_name
+from starknet_py.net.client_models import Call
 
 from src.config import settings
 from .abi import strk_abi
@@ -46,3 +48,16 @@ async def balanceOf(account_address: str) -> float:
     except Exception as e:
         raise RuntimeError(f"Failed to fetch STRK balance: {e}")
 
+
+def balance_call(account_address: str) -> Call:
+    """
+    A raw `balanceOf` call, for reading balances with `rpc_batch_client.call_many`.
+    """
+    return Call(to_addr=contract.address, selector=get_selector_from_name("balanceOf"), calldata=[int(account_address, 16)])
+
+
+def decode_balance(result: list[int]) -> float:
+    """
+    Decodes the u256 [low, high] returned by a `balance_call` to STRK (18 decimals).
+    """
+    return round(float((result[0] + (result[1] << 128)) / 1e18), 4)
@@ -0,0 +1,29 @@
+# /src/utils/telemetry.py
+"""
+Decoder for the estate hubs' batched telemetry frames, published on
+`{estate}/power/frame` when a hub runs with MQTT_TELEMETRY_FRAMES:
+
+    {"v": 1, "t0": 1760772000123, "ids": [3, 5, 9], "dt": [0, 412, 1830], "p": [1.62, 0.0, 2.05]}
+
+`t0` is in epoch milliseconds and `dt` holds each device's offset from it.
+Frames arrive in the hub's payload codec; decode them with src.utils.codec first.
+"""
+from datetime import datetime, timezone
+
+FRAME_VERSION = 1
+# Topic of frames under the estate name; the hubs publish with the same value
+FRAME_TOPIC = "power/frame"
+
+
+def split_frame(frame: dict) -> list[tuple[int, dict]]:
+    """Returns (device id, {"timestamp", "power"}) per device, the shape of a per-device message."""
+    if frame.get("v") != FRAME_VERSION:
+        raise ValueError(f"unsupported telemetry frame version {frame.get('v')}")
+    t0 = frame["t0"]
+    return [
+        (device_id, {
+            "timestamp": datetime.fromtimestamp((t0 + offset) / 1000, tz=timezone.utc).isoformat(),
+            "power": power,
+        })
+        for device_id, offset, power in zip(frame["ids"], frame["dt"], frame["p"])
+    ]
@@ -0,0 +1,63 @@
+# /src/central_api/batching.py
+import asyncio
+
+
+class RequestBatcher:
+    """
+    Coalesces single-item calls to central into batch requests.
+
+    `submit(item)` waits up to `window` seconds for other items (or until
+    `max_size` are pending), sends them all with `send_batch(items)` and
+    resolves each caller with its own entry of the returned per-item results,
+    so e.g. a hub restart activates hundreds of devices in one request.
+    Must be used from a single event loop (the central client's).
+    """
+
+    def __init__(self, send_batch, window: float = 0.05, max_size: int = 500):
+        self.send_batch = send_batch  # async (items) -> [{"ok": bool, "message" | "error": str}, ...]
+        self.window = window
+        self.max_size = max_size
+        self._pending = []  # (item, future)
+        self._full = None
+        self._flusher = None
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        if self._flusher is None or self._flusher.done():
+            self._full = asyncio.Event()
+            self._flusher = asyncio.create_task(self._flush())
+        if len(self._pending) >= self.max_size:
+            self._full.set()
+        return await future
+
+    async def _flush(self):
+        try:
+            await asyncio.wait_for(self._full.wait(), self.window)
+        except asyncio.TimeoutError:
+            pass
+        while self._pending:
+            batch, self._pending = self._pending[:self.max_size], self._pending[self.max_size:]
+            await self._send(batch)
+
+    async def _send(self, batch):
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await self.send_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"Batch of {len(batch)} answered with {len(results)} results")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if result.get("ok"):
+                future.set_result(result.get("message"))
+            else:
+                future.set_exception(ValueError(result.get("error", "Request failed")))
@@ -1,118 +1,287 @@
 # /src/central_api/client.py
-import requests
+import asyncio
+import time
+import httpx
 from sqlalchemy.orm import Session
 from src.config import settings
-from src.db.models import Device
+from src.db.database import get_db
+from src.db.models import Device, SyncState
 from src.starknet.sct import sct_client
+from src.central_api.batching import RequestBatcher
+from src.utils.async_runner import AsyncRunner
 from src.utils.loggers import central_logger
 from src.utils.redis import central_token_client
 from src.utils.exception_handlers.request_handlers import CentralRequestsHandler
-from src.utils.exception_handlers.function_handlers import central_fn_handler 
+from src.utils.exception_handlers.function_handlers import central_fn_handler
 from src.utils.exception_handlers.function_handlers import starknet_fn_handler
-from requests.exceptions import ConnectionError, Timeout, RequestException
+
+DEVICE_SYNC_KEY = "central_device_seq"
 
 
 class CentralAPIClient:
-    """Handles HTTP communication with central backend."""
+    """
+    Handles HTTP communication with central backend.
+
+    All requests share one pooled, keep-alive httpx client (HTTP/2 when `h2`
+    is installed) that lives on a dedicated event loop thread, with at most
+    `max_concurrency` requests in flight. The access token is kept in memory
+    and renewed `CENTRAL_TOKEN_REFRESH_MARGIN` seconds before it expires, or
+    straight away if central answers 401. Device status changes and token
+    consumption reports are coalesced into the batch endpoints.
+
+    The async methods can be awaited from any event loop; the sync methods
+    (`connect`, `activate_device`, ...) block only their calling thread.
+    """
 
     def __init__(
-        self, base_url: str = settings.BACKEND_URL, api_key: str = settings.BACKEND_KEY
+        self,
+        base_url: str = settings.BACKEND_URL,
+        api_key: str = settings.BACKEND_KEY,
+        max_concurrency: int = settings.CENTRAL_MAX_CONCURRENCY,
     ):
         self.base_url = f"{base_url}/hubs"
         self.params = {"api_key": api_key}
+        self.max_concurrency = max_concurrency
+        self._runner = None
+        self._http = None
+        self._slots = None
+        self._token = None
+        self._token_expires = 0.0  # time.monotonic()
+        self._token_lock = None
+        self._refresh_task = None
+        self._status_batches = RequestBatcher(
+            self._send_status_batch, settings.CENTRAL_BATCH_WINDOW, settings.CENTRAL_BATCH_SIZE
+        )
+        self._consumption_batches = RequestBatcher(
+            self._send_consumption_batch, settings.CENTRAL_BATCH_WINDOW, settings.CENTRAL_BATCH_SIZE
+        )
 
+    # ---- Event loop and connection pool ----
+    def _get_runner(self) -> AsyncRunner:
+        if self._runner is None:
+            self._runner = AsyncRunner()
+        return self._runner
 
-    def connect(self):
-        central_logger.info("Attempting to fetch access token")
-        url = f"{self.base_url}/connect"
-        token = CentralRequestsHandler.get_value(
-            "access_token", requests.post, url, params=self.params, timeout=10
+    def _run(self, coro):
+        """Runs a coroutine on the client's loop and waits for it (sync call sites)."""
+        return self._get_runner().submit(coro).result()
+
+    async def _submit(self, coro):
+        """Awaits a coroutine on the client's loop from whatever loop the caller is on."""
+        runner = self._get_runner()
+        if asyncio.get_running_loop() is runner.loop:
+            return await coro
+        return await asyncio.wrap_future(runner.submit(coro))
+
+    def _client(self) -> httpx.AsyncClient:
+        # Created lazily on the client's loop, which it is bound to
+        if self._http is None:
+            try:
+                import h2  # noqa: F401
+                http2 = settings.CENTRAL_HTTP2
+            except ImportError:
+                http2 = False
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=http2,
+                timeout=httpx.Timeout(settings.CENTRAL_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency
+                ),
+            )
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._token_lock = asyncio.Lock()
+        return self._http
+
+    async def _send(self, method: str, path: str, auth: bool = True, **kwargs) -> httpx.Response:
+        client = self._client()
+        async with self._slots:
+            if auth:
+                kwargs["headers"] = {"Authorization": f"Bearer {await self._access_token()}"}
+            response = await client.request(method, path, **kwargs)
+            if auth and response.status_code == 401:
+                central_logger.warning("Access token rejected, renewing it")
+                kwargs["headers"] = {"Authorization": f"Bearer {await self._access_token(renew=True)}"}
+                response = await client.request(method, path, **kwargs)
+        return response
+
+    async def _get_value(self, key: str, method: str, path: str, **kwargs):
+        return await CentralRequestsHandler.aget_value(key, self._send, method, path, **kwargs)
+
+    # ---- Access token ----
+    async def _access_token(self, renew: bool = False) -> str:
+        if not renew and self._token and time.monotonic() < self._token_expires:
+            return self._token
+        stale = self._token
+        self._client()
+        async with self._token_lock:
+            # Another request may have renewed it while this one waited
+            if self._token != stale and self._token and time.monotonic() < self._token_expires:
+                return self._token
+            await self._fetch_token()
+        return self._token
+
+    async def _fetch_token(self):
+        token = await CentralRequestsHandler.aget_value(
+            "access_token", self._client().post, "/connect", params=self.params
         )
-        central_token_client.set(token)
+        self._token = token
+        self._token_expires = (
+            time.monotonic() + settings.CENTRAL_TOKEN_TTL - settings.CENTRAL_TOKEN_REFRESH_MARGIN
+        )
+        central_token_client.set(token, settings.CENTRAL_TOKEN_TTL)
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._keep_token_fresh())
+
+    async def _keep_token_fresh(self):
+        """Renews the token ahead of expiry so requests never wait for it."""
+        while True:
+            await asyncio.sleep(max(self._token_expires - time.monotonic(), 1))
+            if time.monotonic() < self._token_expires:
+                continue  # Renewed meanwhile (e.g. after a 401)
+            try:
+                async with self._token_lock:
+                    await self._fetch_token()
+                central_logger.info("Access token renewed")
+            except Exception as e:
+                central_logger.warning(f"Access token renewal failed, retrying in 30s: {e}")
+                self._token_expires = time.monotonic() + 30
+
+    # ---- API ----
+    async def aconnect(self):
+        central_logger.info("Attempting to fetch access token")
+        await self._submit(self._access_token(renew=True))
         central_logger.info("Successfully retieved access token")
 
-    async def sync_devices(self, db: Session):
-        central_logger.info("Attempting to synchronize devices")
-        url = f"{self.base_url}/sync_devices"
-        token = central_token_client.get()
-        headers = {
-            "Authorization": f"Bearer {token}"
-        }
-        devices = CentralRequestsHandler.get_value(
-            "data", requests.get, url, timeout=10, headers=headers
+    def connect(self):
+        self._run(self.aconnect())
+
+    async def sync_devices(self, db: Session, reset_status: bool = True):
+        """
+        Delta device sync: fetches only the devices central changed since the
+        last applied change sequence (everything on first run), looks up
+        balances for those alone and applies them with one bulk upsert,
+        committed together with the new checkpoint. `reset_status` marks every
+        device inactive, as at hub startup; the periodic resync leaves them be.
+        """
+        since = SyncState.get(db, DEVICE_SYNC_KEY)
+        central_logger.info(f"Attempting to synchronize devices since change {since}")
+        sync = await self._submit(self._get_sync(since))
+        devices, removed = sync["data"], sync.get("deleted", [])
+        if sync.get("full") and "seq" in sync:
+            # A snapshot: whatever central no longer lists has left this hub
+            listed = {d["id"] for d in devices}
+            removed = [
+                id for (id,) in db.query(Device.id).filter(Device.status != Device.REMOVED) if id not in listed
+            ]
+        central_logger.info(
+            f"Found {len(devices)} changed devices: {[d.get('device_id') for d in devices]}, {len(removed)} removed"
         )
-        central_logger.info(f"Found {len(devices)} devices: {[d.get('device_id') for d in devices]}")
-        addresses = [[d.get("account_address"), d.get("device_id")] for d in devices]
-        balances = await sct_client.get_balances(addresses)
+        if devices:
+            addresses = [[d.get("account_address"), d.get("device_id")] for d in devices]
+            balances = await sct_client.get_balances(addresses)
+            for device in devices:
+                device["token_balance"] = balances.get(device["account_address"])
+
+        Device.bulk_sync(db, devices, removed, reset_status=reset_status)
+        if "seq" in sync:
+            SyncState.put(db, DEVICE_SYNC_KEY, sync["seq"])
+        db.commit()
+        Device.broadcast_sync(db, [d["id"] for d in devices], removed, reset_status=reset_status)
+        central_logger.info(f"Device synchronization completed at change {sync.get('seq', since)}.")
+
+    async def _get_sync(self, since: int) -> dict:
+        response = await CentralRequestsHandler.ahandle(self._send, "GET", "/sync_devices", params={"since": since})
+        if not response or response.get("data") is None:
+            raise ValueError("Device sync failed or returned no devices")
+        return response
 
-        for device in devices:
-            device["token_balance"] = balances.get(device["account_address"])
-            Device.sync(db, device)
+    async def keep_devices_synced(self, interval: float = settings.CENTRAL_SYNC_INTERVAL):
+        """Coroutine re-running the delta sync every `interval` seconds, off the calling loop."""
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self._resync)
+
+    def _resync(self):
+        with get_db() as db:
+            central_fn_handler.run(self.sync_devices, db, reset_status=False)
 
-        central_logger.info("Device synchronization completed.")
-    
     def shutdown(self, db: Session):
         central_logger.info("Attempting to shutdown connection")
-        url = f"{self.base_url}/shutdown"
-        token = central_token_client.get()
-        headers = {
-            "Authorization": f"Bearer {token}"
-        }
-        message = CentralRequestsHandler.get_value(
-            "message", requests.post, url, timeout=10, headers=headers
-        )
+        message = self._run(self._get_value("message", "POST", "/shutdown"))
         Device.set_all_inactive(db)
         central_logger.info(message)
 
+    async def _send_status_batch(self, changes: list[tuple[str, str]]) -> list[dict]:
+        """
+        Sends a batch of (device_id, status) changes. A device changed more than
+        once in the batch is reported with its last status only, so the two
+        endpoints can never apply its changes out of order; its earlier
+        changes fail as superseded and are not stored locally either.
+        """
+        last = {device_id: (index, status) for index, (device_id, status) in enumerate(changes)}
+        results = {}
+        for status, path in (("active", "/activate_devices"), ("inactive", "/deactivate_devices")):
+            device_ids = [device_id for device_id, (_, final) in last.items() if final == status]
+            if device_ids:
+                answered = await self._get_value("results", "POST", path, json={"device_ids": device_ids})
+                results.update(zip(device_ids, answered))
+        return [
+            results.get(device_id, {"ok": False, "error": f"No result for {device_id}"})
+            if last[device_id][0] == index
+            else {"ok": False, "error": f"{device_id} {status} superseded by {last[device_id][1]}"}
+            for index, (device_id, status) in enumerate(changes)
+        ]
+
+    async def _send_consumption_batch(self, consumptions: list[dict]) -> list[dict]:
+        return await self._get_value("results", "POST", "/token_consumptions", json={"consumptions": consumptions})
+
+    async def set_device_status(self, device_id: str, status: str) -> str:
+        """Reports a device online ("active") or offline ("inactive") to central."""
+        return await self._submit(self._status_batches.submit((device_id, status)))
+
     def activate_device(self, db: Session, device_id: str):
         central_logger.info(f"Attempting to activate device {device_id}")
-        url = f"{self.base_url}/activate_device"
-        token = central_token_client.get()
-        headers = {
-            "Authorization": f"Bearer {token}"
-        }
-        data = {"device_id": device_id}
-        message = CentralRequestsHandler.get_value(
-            "message", requests.post, url, json=data, timeout=10, headers=headers
-        )
+        message = self._run(self.set_device_status(device_id, "active"))
         device = Device.find(db, device_id=device_id)
         device.update(db, {"status": "active"})
         central_logger.info(message)
 
     def deactivate_device(self, db: Session, device_id: str):
         central_logger.info(f"Attempting to deactivate device {device_id}")
-        url = f"{self.base_url}/deactivate_device"
-        token = central_token_client.get()
-        headers = {
-            "Authorization": f"Bearer {token}"
-        }
-        data = {"device_id": device_id}
-        message = CentralRequestsHandler.get_value(
-            "message", requests.post, url, json=data, timeout=10, headers=headers
-        )
+        message = self._run(self.set_device_status(device_id, "inactive"))
         device = Device.find(db, device_id=device_id)
         device.update(db, {"status": "inactive"})
         central_logger.info(message)
 
-    def consume_token(self, consumption_dict: str):
+    async def aconsume_token(self, consumption_dict: dict):
         central_logger.info(f"[Notification] - [Power consumption] - {consumption_dict.get("device_id")}")
-        url = f"{self.base_url}/token_consumption"
-        token = central_token_client.get()
-        headers = {
-            "Authorization": f"Bearer {token}"
-        }
-        message = CentralRequestsHandler.get_value(
-            "message", requests.post, url, json=consumption_dict, timeout=10, headers=headers
-        )
+        message = await self._submit(self._consumption_batches.submit(consumption_dict))
         central_logger.info(message)
 
+    def consume_token(self, consumption_dict: dict):
+        self._run(self.aconsume_token(consumption_dict))
+
+    async def _aclose(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def close(self):
+        """Closes the pooled connections and stops the client's loop."""
+        if self._runner is not None:
+            self._run(self._aclose())
+            self._runner.shutdown()
+            self._runner = None
+
 
 central_client = CentralAPIClient()
 if __name__ == "__main__":
-    from src.db.database import get_db
-
     central_fn_handler.call(central_client.connect)
     with get_db() as db:
         # central_fn_handler.run(central_client.sync_devices, db)
         central_fn_handler.run(central_client.deactivate_device, db, "H001")
         # central_fn_handler.run(central_client.shutdown, db)
+    central_client.close()
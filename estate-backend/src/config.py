@@ -11,6 +11,42 @@ class Settings:
     REDIS_URL = os.getenv("REDIS_URL")
     HUB_NAME = os.getenv("HUB_NAME")
 
+    # Central API client: pooled keep-alive connections (HTTP/2 when available)
+    CENTRAL_HTTP2 = os.getenv("CENTRAL_HTTP2", "true").lower() == "true"
+    CENTRAL_MAX_CONCURRENCY = int(os.getenv("CENTRAL_MAX_CONCURRENCY", 8))
+    CENTRAL_TIMEOUT = float(os.getenv("CENTRAL_TIMEOUT", 10))
+    # Lifetime of central's hub token (60 min) and how long before expiry to renew it
+    CENTRAL_TOKEN_TTL = int(os.getenv("CENTRAL_TOKEN_TTL", 3600))
+    CENTRAL_TOKEN_REFRESH_MARGIN = int(os.getenv("CENTRAL_TOKEN_REFRESH_MARGIN", 300))
+    # Activation / deactivation / token-consumption reports are coalesced into batch
+    # requests: wait up to CENTRAL_BATCH_WINDOW seconds for at most CENTRAL_BATCH_SIZE items
+    CENTRAL_BATCH_WINDOW = float(os.getenv("CENTRAL_BATCH_WINDOW", 0.05))
+    CENTRAL_BATCH_SIZE = int(os.getenv("CENTRAL_BATCH_SIZE", 500))
+    # Seconds between delta device syncs after the startup one (0 disables)
+    CENTRAL_SYNC_INTERVAL = float(os.getenv("CENTRAL_SYNC_INTERVAL", 300))
+
+    # Serial protocol
+    SERIAL_BINARY = os.getenv("SERIAL_BINARY", "true").lower() == "true"
+    # Extra directory whose entries are all treated as Arduino ports
+    # (e.g. the pty links created by src.tests.fleet_simulator)
+    SERIAL_PORT_DIR = os.getenv("SERIAL_PORT_DIR")
+
+    # Metering: energy (Wh) billed per SCT, and the longest gap between
+    # two samples still integrated (longer silences count as no consumption).
+    # The default keeps the old tariff on average: the old loop billed one SCT per 50 summed
+    # W samples, one per ~3 s cycle (1 s buffer clear + 2 s sleep), i.e. 50 W x 3 s = 150 J
+    # ~ 0.0417 Wh per SCT. Billing by integrated energy rather than per sample still changes
+    # individual bills: loads that varied between samples are now billed for what they drew.
+    ENERGY_THRESHOLD_WH = float(os.getenv("ENERGY_THRESHOLD_WH", 50 * 3 / 3600))
+    METER_MAX_GAP = float(os.getenv("METER_MAX_GAP", 10))
+
+    # Power ingest pipeline
+    INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 500))
+    INGEST_FLUSH_INTERVAL = float(os.getenv("INGEST_FLUSH_INTERVAL", 2))
+    INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 20000))
+    INGEST_USE_COPY = os.getenv("INGEST_USE_COPY", "false").lower() == "true"
+    INGEST_MAX_RETRIES = int(os.getenv("INGEST_MAX_RETRIES", 4))  # Failed batch writes retried before dropping
+
     # Starknet config
     STARKNET_PRIVATE_KEY = os.getenv("STARKNET_PRIVATE_KEY")
     STARKNET_ACCOUNT_ADDRESS = os.getenv("STARKNET_ACCOUNT_ADDRESS")
@@ -18,10 +54,37 @@ class Settings:
     SCT_OWNER = os.getenv("SCT_OWNER")
     STRK_CONTRACT_ADDRESS = os.getenv("STRK_CONTRACT_ADDRESS")
     STARKNET_RPC_URL = os.getenv("STARKNET_RPC_URL")
+    # Bulk reads (src.starknet.rpc_batch): starknet_call requests per JSON-RPC batch, batches in flight
+    STARKNET_RPC_BATCH_SIZE = int(os.getenv("STARKNET_RPC_BATCH_SIZE", 50))
+    STARKNET_RPC_CONCURRENCY = int(os.getenv("STARKNET_RPC_CONCURRENCY", 4))
+    # Transfer-event indexer (src.starknet.indexer): events per get_events page,
+    # most blocks per committed pass, and how often balances are re-read over RPC
+    # for devices touched since (and for every device)
+    SCT_INDEXER_INTERVAL = float(os.getenv("SCT_INDEXER_INTERVAL", 2))
+    SCT_INDEXER_CHUNK_SIZE = int(os.getenv("SCT_INDEXER_CHUNK_SIZE", 1000))
+    SCT_INDEXER_MAX_BLOCKS = int(os.getenv("SCT_INDEXER_MAX_BLOCKS", 2000))
+    SCT_RECONCILE_INTERVAL = float(os.getenv("SCT_RECONCILE_INTERVAL", 60))
+    SCT_FULL_RECONCILE_INTERVAL = float(os.getenv("SCT_FULL_RECONCILE_INTERVAL", 3600))
 
     # MQTT Broker details
     MQTT_BROKER = os.getenv('MQTT_BROKER')
     MQTT_PORT = int(os.getenv("MQTT_PORT", 1883))
+    # Command handling pool (see src.mqtt.dispatcher)
+    MQTT_COMMAND_WORKERS = int(os.getenv("MQTT_COMMAND_WORKERS", 4))
+    MQTT_COMMAND_QUEUE_SIZE = int(os.getenv("MQTT_COMMAND_QUEUE_SIZE", 256))
+    # Publish one {HUB}/power/frame per tick with every device instead of per-device streams
+    MQTT_TELEMETRY_FRAMES = os.getenv("MQTT_TELEMETRY_FRAMES", "false").lower() == "true"
+    # Preferred payload codec for published messages: json, msgpack or cbor, used once
+    # central advertises it can decode it, JSON until then (see src.mqtt.codec)
+    MQTT_CODEC = os.getenv("MQTT_CODEC", "json")
+    # Store-and-forward outbox for every uplink message (empty path disables it).
+    # Each process gets its own database next to this path: mqtt_outbox.hub.db, mqtt_outbox.indexer.db
+    MQTT_OUTBOX_PATH = os.getenv("MQTT_OUTBOX_PATH", "mqtt_outbox.db")
+    MQTT_OUTBOX_BATCH_SIZE = int(os.getenv("MQTT_OUTBOX_BATCH_SIZE", 100))
+    MQTT_OUTBOX_MAX_RATE = float(os.getenv("MQTT_OUTBOX_MAX_RATE", 200))
+    MQTT_OUTBOX_MAX_MESSAGES = int(os.getenv("MQTT_OUTBOX_MAX_MESSAGES", 500000))
+    # Live readings older than this are not replayed after an outage
+    MQTT_LIVE_TTL = float(os.getenv("MQTT_LIVE_TTL", 60))
 
     # MQTT Authentication
     MQTT_USERNAME = os.getenv('MQTT_USERNAME')
@@ -0,0 +1,222 @@
+# src/db/ingest.py
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from src.config import settings
+from src.db.database import get_db
+from src.db.models import PowerConsumption
+from src.utils.loggers import ingest_logger
+
+
+class PowerIngest:
+    """
+    Buffers PowerConsumption readings from every device and writes them in
+    bulk from a single background thread. A batch is flushed when it reaches
+    `batch_size` rows or when `flush_interval` seconds have passed since the
+    first buffered reading, whichever comes first.
+
+    `submit()` never touches the database; when the queue is full the reading
+    is dropped and counted so back-pressure is visible in `stats()`. A batch
+    whose write fails is retried up to `max_retries` times with exponential
+    backoff from `retry_backoff` seconds (readings keep queueing meanwhile),
+    and its rows are only dropped, and counted, once those are used up.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = settings.INGEST_BATCH_SIZE,
+        flush_interval: float = settings.INGEST_FLUSH_INTERVAL,
+        max_queue: int = settings.INGEST_QUEUE_SIZE,
+        use_copy: bool = settings.INGEST_USE_COPY,
+        high_watermark: float = 0.8,
+        latency_window: int = 10000,
+        max_retries: int = settings.INGEST_MAX_RETRIES,
+        retry_backoff: float = 0.5,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.use_copy = use_copy
+        self.high_watermark = high_watermark
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._pressured = False
+
+        self.submitted = 0
+        self.dropped = 0
+        self.flushed_rows = 0
+        self.failed_rows = 0
+        self.retries = 0
+        self.batches = 0
+        self.last_flush_seconds = 0.0
+        self.last_batch_size = 0
+        # Seconds from serial receive (the reading's timestamp) to commit, most recent rows
+        self.latencies = deque(maxlen=latency_window)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="power-ingest", daemon=True)
+                self._thread.start()
+
+    def submit(self, data: dict) -> bool:
+        """
+        Enqueues a reading. Returns False if it was rejected because the pipeline is saturated.
+        """
+        row = PowerConsumption.prepare(data)
+        if self._thread is None:
+            self.start()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                ingest_logger.error(f"[Back-pressure] - queue full, {self.dropped} readings dropped")
+            return False
+        self.submitted += 1
+        self._check_pressure()
+        return True
+
+    def _check_pressure(self):
+        fill = self._queue.qsize() / self._queue.maxsize
+        if fill >= self.high_watermark and not self._pressured:
+            self._pressured = True
+            ingest_logger.warning(f"[Back-pressure] - queue {fill:.0%} full ({self._queue.qsize()} readings)")
+        elif fill < self.high_watermark / 2 and self._pressured:
+            self._pressured = False
+            ingest_logger.info(f"[Back-pressure] - relieved ({self._queue.qsize()} readings queued)")
+
+    def stats(self) -> dict:
+        depth = self._queue.qsize()
+        return {
+            "queue_depth": depth,
+            "queue_fill": round(depth / self._queue.maxsize, 3),
+            "back_pressure": self._pressured,
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "flushed_rows": self.flushed_rows,
+            "failed_rows": self.failed_rows,
+            "retries": self.retries,
+            "batches": self.batches,
+            "last_batch_size": self.last_batch_size,
+            "last_flush_ms": round(self.last_flush_seconds * 1000, 2),
+            "latency_ms": self.latency_percentiles(),
+        }
+
+    def latency_percentiles(self, percentiles=(50, 95, 99)) -> dict:
+        ordered = sorted(self.latencies)
+        if not ordered:
+            return {}
+        result = {
+            f"p{p}": round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000, 2)
+            for p in percentiles
+        }
+        result["max"] = round(ordered[-1] * 1000, 2)
+        return result
+
+    def _record_latency(self, batch: list[dict]):
+        now = {None: datetime.utcnow()}  # Naive timestamps are UTC (see PowerConsumption.prepare)
+        for row in batch:
+            timestamp = row["timestamp"]
+            zone = timestamp.tzinfo
+            if zone not in now:
+                now[zone] = datetime.now(zone)
+            self.latencies.append((now[zone] - timestamp).total_seconds())
+
+    def _collect(self) -> list[dict]:
+        try:
+            first = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stopping.is_set():
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        # Drain anything already waiting without blocking further
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: list[dict]):
+        writer = PowerConsumption.copy_create if self.use_copy else PowerConsumption.bulk_create
+        with get_db() as db:
+            try:
+                writer(db, batch)
+            except Exception:
+                db.rollback()
+                raise
+
+    def _flush(self, batch: list[dict]):
+        started = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._write(batch)
+                break
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self.failed_rows += len(batch)
+                    ingest_logger.error(
+                        f"[Back-pressure] - {len(batch)} readings dropped after {attempt + 1} failed writes "
+                        f"({self.failed_rows} in total): {e}"
+                    )
+                    self._check_pressure()
+                    return
+                delay = self.retry_backoff * 2 ** attempt
+                self.retries += 1
+                ingest_logger.warning(f"[Flush] - failed to write {len(batch)} readings, retrying in {delay}s: {e}")
+                self._check_pressure()
+                time.sleep(delay)
+        self.last_flush_seconds = time.perf_counter() - started
+        self.last_batch_size = len(batch)
+        self.flushed_rows += len(batch)
+        self.batches += 1
+        self._record_latency(batch)
+        self._check_pressure()
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+
+    def flush(self):
+        """
+        Synchronously writes everything currently queued (used on shutdown).
+        """
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+
+    def stop(self, timeout: float = 10):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+        ingest_logger.info(f"[Stopped] - {self.stats()}")
+
+
+power_ingest = PowerIngest()
@@ -1,9 +1,11 @@
 from .devices import Device
 from .power import PowerConsumption
+from .sync_state import SyncState
 
 # Optionally, export them all as a list or __all__
 __all__ = [
     "Device",
-    "PowerConsumption"
+    "PowerConsumption",
+    "SyncState",
 ]
 
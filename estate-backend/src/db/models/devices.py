@@ -1,7 +1,9 @@
 # /src/db/models/devices
 from src.db.database import Base
 from src.utils.helpers import normalize_addr 
-from sqlalchemy import Column, Integer, String, BigInteger, or_
+from src.utils.redis import device_change_client
+from redis import RedisError
+from sqlalchemy import Column, Integer, String, BigInteger, case, or_
 from sqlalchemy.orm import Session, relationship
 from typing import Optional
 
@@ -18,6 +20,12 @@ class Device(Base):
 
     power_readings = relationship("PowerConsumption", back_populates="device", cascade="all, delete-orphan")
 
+    # In-process callbacks run on every committed change before it is published
+    change_listeners = []
+
+    # Status of a device central no longer lists; its row and power history are kept
+    REMOVED = "removed"
+
 
     @classmethod
     def create(cls, db: Session, device_data: dict):
@@ -33,10 +41,11 @@ class Device(Base):
         db.add(device)
         db.commit()
         db.refresh(device)
+        device.publish_change()
         return device
 
     @classmethod
-    def find(cls, db: Session, id: Optional[str] = None, device_id: Optional[str] = None, account_address: Optional[str] = None) -> Optional["Device"]:
+    def find(cls, db: Session, id: Optional[str] = None, device_id: Optional[str] = None, account_address: Optional[str] = None, removed: bool = False) -> Optional["Device"]:
         filters = []
         if id:
             filters.append(cls.id == id)
@@ -48,7 +57,10 @@ class Device(Base):
         if not filters:
             return None  
 
-        return db.query(cls).filter(or_(*filters)).first()
+        query = db.query(cls).filter(or_(*filters))
+        if not removed:
+            query = query.filter(cls.status != cls.REMOVED)
+        return query.first()
 
     def update(self, db: Session, update_data: dict):
         for key, value in update_data.items():
@@ -56,14 +68,52 @@ class Device(Base):
                 setattr(self, key, value)
         db.commit()
         db.refresh(self)
+        self.publish_change()
         return self
+
+    @classmethod
+    def update_by_id(cls, db: Session, id: int, update_data: dict):
+        """
+        Writes `update_data` to a device row without loading it first.
+        """
+        fields = {key: value for key, value in update_data.items() if hasattr(cls, key)}
+        db.query(cls).filter(cls.id == id).update(fields)
+        db.commit()
+        cls.broadcast({"id": id, **fields})
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "device_id": self.device_id,
+            "connection_type": self.connection_type,
+            "status": self.status,
+            "instruction": self.instruction,
+            "account_address": self.account_address,
+            "token_balance": self.token_balance,
+        }
+
+    def publish_change(self):
+        self.broadcast(self.to_dict())
+
+    @classmethod
+    def broadcast(cls, change: dict):
+        """
+        Notifies in-memory device registries of a committed change.
+        A lost notification is repaired by the registry's periodic reload.
+        """
+        for listener in cls.change_listeners:
+            listener(change)
+        try:
+            device_change_client.publish(change)
+        except RedisError:
+            pass
     
     
 
 
     @classmethod
     def sync(cls, db: Session, device_data: dict):
-        device = cls.find(db, id=device_data["id"])
+        device = cls.find(db, id=device_data["id"], removed=True)
         if device:
             # Update with relevant fields from device_data
             update_fields = {
@@ -78,10 +128,61 @@ class Device(Base):
         else:
             return cls.create(db, device_data)
 
+    @classmethod
+    def bulk_sync(cls, db: Session, devices: list[dict], removed: list[int] = (), reset_status: bool = False):
+        """
+        Applies a batch of device changes from central with one upsert
+        statement and one update, without committing, so the caller can
+        commit them together with its sync checkpoint (then `broadcast_sync`).
+        New devices start inactive; existing ones keep their status and
+        instruction unless `reset_status`, as at hub startup. Devices central
+        no longer lists are marked `REMOVED`, keeping their power history,
+        and come back inactive if central lists them again.
+        """
+        rows = [
+            {
+                "id": device["id"],
+                "device_id": device["device_id"],
+                "connection_type": device["connection_type"],
+                "status": "inactive",
+                "instruction": 1,
+                "account_address": normalize_addr(device["account_address"]),
+                "token_balance": device.get("token_balance") or 0,
+            }
+            for device in devices
+        ]
+        if db.bind.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        updated = ["device_id", "connection_type", "account_address", "token_balance"]
+        if reset_status:
+            updated.append("instruction")
+        for start in range(0, len(rows), 1000):  # Stay well under the bind parameter limit
+            statement = upsert(cls).values(rows[start:start + 1000])
+            set_ = {column: statement.excluded[column] for column in updated}
+            set_["status"] = case((cls.status == cls.REMOVED, "inactive"), else_=cls.status)
+            db.execute(statement.on_conflict_do_update(index_elements=[cls.id], set_=set_))
+        if removed:
+            db.query(cls).filter(cls.id.in_(removed)).update({cls.status: cls.REMOVED}, synchronize_session=False)
+        if reset_status:
+            db.query(cls).filter(cls.status != cls.REMOVED).update({cls.status: "inactive"})
+
+    @classmethod
+    def broadcast_sync(cls, db: Session, ids: list[int], removed: list[int] = (), reset_status: bool = False):
+        """Publishes a committed `bulk_sync` to the device registries."""
+        if reset_status:
+            cls.broadcast({"all": True, "status": "inactive"})
+        for device in db.query(cls).filter(cls.id.in_(ids)) if ids else ():
+            device.publish_change()
+        for id in removed:
+            cls.broadcast({"id": id, "status": cls.REMOVED})
+
     @classmethod
     def set_all_inactive(cls, db: Session):
-        db.query(cls).update({cls.status: "inactive"})
+        db.query(cls).filter(cls.status != cls.REMOVED).update({cls.status: "inactive"})
         db.commit()
+        cls.broadcast({"all": True, "status": "inactive"})
 
     @classmethod
     def from_transfer_event(cls, db: Session, addresses: list[str, str]):
@@ -1,9 +1,11 @@
 # /src/db/models/power
 
 from src.db.database import Base  
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, Float
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Float, insert
 from sqlalchemy.orm import Session, relationship
 from datetime import datetime
+import csv
+import io
 
 class PowerConsumption(Base):
     __tablename__ = "power_consumption"
@@ -43,6 +45,62 @@ class PowerConsumption(Base):
         db.refresh(power_record)
         return power_record
 
+    @classmethod
+    def prepare(cls, data: dict) -> dict:
+        """
+        Validates a reading and returns the row dict used by the bulk writers.
+        """
+        voltage = data.get("voltage")
+        current = data.get("current")
+        power = data.get("power")
+
+        if power is None and voltage is not None and current is not None:
+            power = voltage * current
+        elif power is None:
+            raise ValueError("Power must be provided or calculable from voltage and current")
+
+        return {
+            "device_id": data["device_id"],
+            "power": power,
+            "voltage": voltage,
+            "current": current,
+            "timestamp": data.get("timestamp") or datetime.utcnow(),
+        }
+
+    @classmethod
+    def bulk_create(cls, db: Session, rows: list[dict]):
+        """
+        Inserts prepared rows with a single executemany in one transaction.
+        """
+        if not rows:
+            return 0
+        db.execute(insert(cls), rows)
+        db.commit()
+        return len(rows)
+
+    @classmethod
+    def copy_create(cls, db: Session, rows: list[dict]):
+        """
+        Streams prepared rows into Postgres with COPY FROM STDIN in one transaction.
+        """
+        if not rows:
+            return 0
+        columns = ("device_id", "timestamp", "voltage", "current", "power")
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(["" if row[c] is None else row[c] for c in columns])
+        buffer.seek(0)
+
+        raw = db.connection().connection
+        with raw.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {cls.__tablename__} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+        db.commit()
+        return len(rows)
+
     @classmethod
     def latest(cls, db: Session, device_id: int):
         return (
@@ -52,3 +110,27 @@ class PowerConsumption(Base):
             .first()
         )
 
+    @classmethod
+    def stream_since(cls, db: Session, since: datetime, chunk_size: int = 1000, after_id: int = 0):
+        """
+        Yields (id, device_id, timestamp, power) rows newer than `since` in id order.
+        Pages are fetched with a keyset cursor on `id` and streamed with `yield_per`,
+        and plain rows are not kept in the session, so memory stays at one page
+        whatever the size of the history.
+        """
+        last_id = after_id
+        while True:
+            page = (
+                db.query(cls.id, cls.device_id, cls.timestamp, cls.power)
+                .filter(cls.timestamp >= since, cls.id > last_id)
+                .order_by(cls.id)
+                .limit(chunk_size)
+                .yield_per(chunk_size)
+            )
+            count = 0
+            for row in page:
+                count += 1
+                last_id = row.id
+                yield row
+            if count < chunk_size:
+                return
@@ -0,0 +1,26 @@
+# /src/db/models/sync_state
+from src.db.database import Base
+from sqlalchemy import Column, String, BigInteger
+from sqlalchemy.orm import Session
+
+
+class SyncState(Base):
+    """
+    Named checkpoints of the hub's syncs with central, e.g. the last device
+    change sequence applied. Written in the same transaction as the data
+    they describe, so a checkpoint never runs ahead of the local rows.
+    """
+    __tablename__ = "sync_state"
+
+    key = Column(String(50), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+    @classmethod
+    def get(cls, db: Session, key: str, default: int = 0) -> int:
+        state = db.get(cls, key)
+        return state.value if state else default
+
+    @classmethod
+    def put(cls, db: Session, key: str, value: int):
+        """Stages the checkpoint; the caller commits."""
+        db.merge(cls(key=key, value=value))
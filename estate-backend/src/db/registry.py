@@ -0,0 +1,238 @@
+# src/db/registry.py
+import threading
+import time
+from typing import Optional
+from redis import RedisError
+from src.db.database import get_db
+from src.db.models import Device
+from src.utils.helpers import normalize_addr
+from src.utils.loggers import registry_logger
+from src.utils.redis import device_change_client
+
+
+class DeviceState:
+    """
+    Detached, in-memory copy of a `devices` row.
+    """
+
+    __slots__ = (
+        "id", "device_id", "connection_type", "status",
+        "instruction", "account_address", "token_balance",
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_model(cls, device: Device) -> "DeviceState":
+        return cls(**device.to_dict())
+
+    def apply(self, change: dict):
+        for key, value in change.items():
+            if key in self.__slots__ and key != "id":
+                setattr(self, key, value)
+
+    def __repr__(self):
+        return f"<DeviceState {self.device_id} status={self.status} balance={self.token_balance}>"
+
+
+class DeviceRegistry:
+    """
+    Process-wide cache of every hub device, indexed by `id`, `device_id` and
+    `account_address`. It is loaded once from Postgres, then kept current by
+    the change notifications that `Device` publishes on Redis after each commit.
+    A full reload runs every `reload_interval` seconds and after a listener
+    reconnect, so a missed notification never leaves stale state for long.
+    Lookups that find no device are remembered too, so an unknown id or
+    device_id (a stray command, an unregistered Arduino reconnecting) costs
+    one SELECT per `reload_interval`; indexing a device from a change
+    notification or a reload forgets its misses straight away.
+    """
+
+    def __init__(self, reload_interval: float = 300):
+        self.reload_interval = reload_interval
+        self._by_id = {}
+        self._by_device_id = {}
+        self._by_address = {}
+        self._misses = {}  # (field, value) -> time.monotonic() of the SELECT that found nothing
+        self._lock = threading.RLock()
+        self._thread = None
+        self._running = False
+        self._loaded = False
+        self._last_reload = 0.0
+        Device.change_listeners.append(self.apply)
+
+    # ---- Loading ----
+    def load(self):
+        with get_db() as db:
+            states = [
+                DeviceState.from_model(d) for d in db.query(Device).filter(Device.status != Device.REMOVED)
+            ]
+        with self._lock:
+            self._by_id.clear()
+            self._by_device_id.clear()
+            self._by_address.clear()
+            self._misses.clear()
+            for state in states:
+                self._index(state)
+            self._loaded = True
+            self._last_reload = time.monotonic()
+        registry_logger.info(f"[Loaded] - {len(states)} devices")
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+        if self._thread is None:
+            self.start()
+
+    def _index(self, state: DeviceState):
+        self._by_id[state.id] = state
+        self._misses.pop(("id", state.id), None)
+        if state.device_id:
+            self._by_device_id[state.device_id] = state
+            self._misses.pop(("device_id", state.device_id), None)
+        if state.account_address:
+            address = normalize_addr(state.account_address)
+            self._by_address[address] = state
+            self._misses.pop(("account_address", address), None)
+
+    @staticmethod
+    def _miss_keys(id=None, device_id=None, account_address=None) -> list[tuple]:
+        keys = []
+        if id is not None:
+            keys.append(("id", int(id)))
+        if device_id:
+            keys.append(("device_id", device_id))
+        if account_address:
+            keys.append(("account_address", normalize_addr(account_address)))
+        return keys
+
+    def _known_miss(self, keys: list[tuple]) -> bool:
+        """True if every key was looked up in vain within the last `reload_interval` seconds."""
+        now = time.monotonic()
+        return all(key in self._misses and now - self._misses[key] < self.reload_interval for key in keys)
+
+    def _unindex(self, state: DeviceState):
+        if self._by_device_id.get(state.device_id) is state:
+            del self._by_device_id[state.device_id]
+        address = normalize_addr(state.account_address) if state.account_address else None
+        if address and self._by_address.get(address) is state:
+            del self._by_address[address]
+
+    # ---- Lookups ----
+    def get(self, id: Optional[int] = None, device_id: Optional[str] = None, account_address: Optional[str] = None) -> Optional[DeviceState]:
+        """
+        Same lookup semantics as `Device.find`, served from memory.
+        A cold miss falls back to a single SELECT and caches the result, or
+        that there is no such device.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            state = None
+            if id is not None:
+                state = self._by_id.get(int(id))
+            if state is None and device_id:
+                state = self._by_device_id.get(device_id)
+            if state is None and account_address:
+                state = self._by_address.get(normalize_addr(account_address))
+            keys = self._miss_keys(id, device_id, account_address) if state is None else []
+            if keys and self._known_miss(keys):
+                return None
+        if keys:
+            state = self._fetch(id=id, device_id=device_id, account_address=account_address)
+            if state is None:
+                missed = time.monotonic()
+                with self._lock:
+                    self._misses.update((key, missed) for key in keys)
+        return state
+
+    def _fetch(self, **filters) -> Optional[DeviceState]:
+        with get_db() as db:
+            device = Device.find(db, **filters)
+            if device is None:
+                return None
+            state = DeviceState.from_model(device)
+        with self._lock:
+            self._index(state)
+        return state
+
+    def by_addresses(self, addresses: list[str]) -> list[DeviceState]:
+        self._ensure_loaded()
+        with self._lock:
+            found = (self._by_address.get(normalize_addr(a)) for a in addresses)
+            return [state for state in found if state is not None]
+
+    def all(self) -> list[DeviceState]:
+        self._ensure_loaded()
+        with self._lock:
+            return list(self._by_id.values())
+
+    # ---- Change notifications ----
+    def apply(self, change: dict):
+        """
+        Applies a change published by `Device.broadcast`.
+        """
+        with self._lock:
+            if change.get("all"):
+                for state in self._by_id.values():
+                    state.apply(change)
+                return
+            state = self._by_id.get(change.get("id"))
+            if change.get("status") == Device.REMOVED:
+                if state is not None:
+                    self._unindex(state)
+                    del self._by_id[state.id]
+                return
+            if state is None:
+                if "device_id" in change:
+                    self._index(DeviceState(**change))
+                return
+            self._unindex(state)
+            state.apply(change)
+            self._index(state)
+
+    def _listen(self):
+        reconnecting = False
+        while self._running:
+            pubsub = None
+            try:
+                pubsub = device_change_client.subscribe()
+                if reconnecting:
+                    self.load()  # Catch up on anything missed while disconnected
+                reconnecting = True
+                while self._running:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get("type") == "message":
+                        change = device_change_client.decode(message["data"])
+                        # Our own changes were applied in-process; a late echo could revert a newer one
+                        if change is not None:
+                            self.apply(change)
+                    if time.monotonic() - self._last_reload > self.reload_interval:
+                        self.load()
+            except (RedisError, OSError) as e:
+                registry_logger.error(f"[Listener] - {e}, retrying in 5s")
+                time.sleep(5)
+            except Exception:
+                registry_logger.exception("[Listener] - unexpected error")
+                time.sleep(5)
+            finally:
+                if pubsub is not None:
+                    pubsub.close()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._listen, name="device-registry", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+device_registry = DeviceRegistry()
@@ -1,21 +1,25 @@
 # /src/homes/arduino_interface.py
-import serial
-import serial.tools.list_ports
-import json
-import time, threading, asyncio
-import redis
-from datetime import datetime
-from zoneinfo import ZoneInfo
-from src.db.database import SessionLocal, get_db 
-from src.db.models import Device, PowerConsumption
-from sqlalchemy.orm import Session
-# from starknet.stark import consume, balanceOf
+import time
 import asyncio
+from src.db.database import get_db
+from src.db.models import Device
+from src.db.ingest import power_ingest
+from src.db.registry import device_registry
+from sqlalchemy.orm import Session
 from src.utils.loggers import arduino_logger
 from src.utils.redis import arduino_port_client, PowerClient
 from src.utils.exception_handlers.function_handlers import arduino_fn_handler, central_fn_handler
-from src.starknet.sct import sct_client
+from src.starknet.balances import balance_service
+from src.starknet.consume_queue import consume_queue
 from src.central_api.client import central_client
+from src.mqtt.client import mqtt_client
+from src.mqtt.live import live_hub
+from src.homes.serial_mux import AsyncSerialPort, SerialMultiplexer
+from src.homes.frames import FrameReader
+from src.homes.metering import EnergyMeter
+from src.homes.hotplug import scan_ports
+from src.homes.protocol import PROTOCOL_VERSION, encode_command, encode_text_command
+from src.config import settings
 
 
 
@@ -38,82 +42,139 @@ class ArduinoClient:
         self.connection_type = 0
         self.updateBalance = 0
         self.tokenConsumed = False
-        self.threshold = 50
+        self.threshold = settings.ENERGY_THRESHOLD_WH  # Wh per SCT
+        self.meter = EnergyMeter(max_gap=settings.METER_MAX_GAP)
+        self.meter_batch = None  # Shared MeterBatch, set by the multiplexer
+        self.frames = None
+        self.window = 256
+        self.request_binary = False
+        self.samples = []
+        self.read_timeout = 3
+        self.boot_seconds = 3
+        self._tasks = set()
     
-    def run(self):
+    async def run(self):
             """
-            This replaces the external monitor_device(). Continuously tries to connect
-            and run the monitoring loop. Recovers from disconnections.
+            Drives the device session on the multiplexer's event loop: handshake,
+            activation with central, then the monitoring loop. Recovers from disconnections.
             """
             try:
-                with get_db() as db:
-                    self.connect(db)
-                    central_fn_handler.run(central_client.activate_device, db, self.device_id)
-                    self.start_monitoring_loop(db)
+                started = time.perf_counter()
+                await self.connect()
+                self.serial.stats.observe("handshake", time.perf_counter() - started)
+                await self.activate()
+                await self.start_monitoring_loop()
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 device_id = getattr(self, "device_id", None) or self.port
                 if self.device_id and self.status == 'active':
-                    with get_db() as db:
-                        central_fn_handler.run(central_client.deactivate_device, db, self.device_id)
+                    await self.deactivate()
                 arduino_logger.error(f"[{device_id}] -  [Disconnected] - {e}")
+            finally:
+                self.running = False
+                if self.frames is not None:
+                    await self.frames.stop()
+                if self.serial is not None:
+                    self.serial.close()
                 arduino_port_client.delete(self.port)
-    
-    def connect(self, db: Session):
+
+    async def activate(self):
+        """Reports the device online to central, which marks it active."""
+        await self._set_status("active")
+
+    async def deactivate(self):
+        await self._set_status("inactive")
+
+    async def _set_status(self, status: str):
+        # The HTTP call is awaited on the central client's pool; only the SQL runs in a thread
+        message = await central_fn_handler.acall(central_client.set_device_status, self.device_id, status)
+        if message is None:
+            return
+        await asyncio.to_thread(self._with_db, self._store_status, status)
+        arduino_logger.info(f"[{self.device_id}] - [Central] - {message}")
+
+    def _store_status(self, db: Session, status: str):
+        device = Device.find(db, device_id=self.device_id)
+        device.update(db, {"status": status})
+
+    def _with_db(self, fn, *args):
         """
-        Reads serial input and sets the device ID from JSON until a 'current' reading is received.
-        Keeps sending instructions during the connection handshake.
+        Runs `fn(db, *args)` inside a fresh session. Used from worker threads
+        so blocking SQL never runs on the serial event loop.
         """
-        self.serial = serial.Serial(self.port, self.baud, timeout=1)
-        time.sleep(2)  # Allow Arduino to reset
-        self.serial.flushInput()
-        last_received = time.time()
+        with get_db() as db:
+            return fn(db, *args)
+
+    def stats_timer(self, step: str):
+        return self.serial.stats.timer(step)
+
+    def _load_device(self):
+        device = device_registry.get(device_id=self.device_id)
+        if not device:
+            raise ValueError(f"[{self.device_id}] not found in database")
+        self.id = device.id
+        self.balance = device.token_balance
+        self.account_address = device.account_address
+        self.connection_type = device.connection_type
+
+    async def connect(self):
+        """
+        Reads serial input and sets the device ID from the idle frame until a 'current' reading is received.
+        Keeps sending instructions during the connection handshake and, when both sides
+        support it, asks the device to switch to the binary frame format.
+        """
+        self.serial = AsyncSerialPort(self.port, self.baud)
+        await self.serial.open()
+        arduino_port_client.set(self.port)
+        self.frames = FrameReader(self.serial, window=self.window)
+        self.frames.start()
         timeout_seconds = 2
+        # Opening the port resets the Arduino; bootloader noise is skipped by the
+        # frame decoder, so only the first frame gets the extra boot allowance.
+        wait_seconds = timeout_seconds + self.boot_seconds
 
         while True:
-            if self.serial.in_waiting:
-                try:
-                    line = self.serial.readline().decode().strip()
-                    if not line.startswith('{'):
-                        continue  # Skip non-JSON lines
-
-                    data = json.loads(line)
-                    if "device_id" in data and self.device_id is None:
-                        self.device_id = data["device_id"]
-                        if self.id is None:
-                            device = Device.find(db, device_id=self.device_id) 
-                            if not device:
-                                raise ValueError(f"[{self.device_id}] not found in database")
-                            self.id = device.id
-                            self.balance = device.token_balance
-                            self.account_address = device.account_address
-                            self.connection_type = device.connection_type
-
-                        arduino_logger.info(f"[{self.device_id}] - [Detected] - in [{self.port}]")
-                        self.send_data()  # Keep sending initial instruction
-                        last_received = time.time()
-
-                    # Exit condition when 'current' data is received
-                    if "current" in data:
-                        arduino_logger.info(f"[{self.device_id}] - [Connected]")
-                        return
-
-                except json.JSONDecodeError:
-                    arduino_logger.warning("Ignoring Invalid JSON received")
-            else:
-                if time.time() - last_received > timeout_seconds:
-                    raise ValueError(f"Timeout waiting for data.")
-            time.sleep(0.1)
+            if not await self.frames.wait(timeout=wait_seconds, control=True):
+                raise ValueError(f"Timeout waiting for data.")
+            wait_seconds = timeout_seconds
+
+            data = self.frames.take_control()
+            if data and "device_id" in data and self.device_id is None:
+                self.device_id = data["device_id"]
+                self.frames.device_id = self.device_id
+                if self.id is None:
+                    await asyncio.to_thread(self._load_device)
+                self.request_binary = settings.SERIAL_BINARY and data.get("proto") == PROTOCOL_VERSION
+
+                arduino_logger.info(f"[{self.device_id}] - [Detected] - in [{self.port}]")
+                await self.send_data()  # Keep sending initial instruction
+
+            # Exit condition when 'current' data is received
+            if self.frames.pending:
+                if self.device_id is None:
+                    self.frames.drain()  # Still connected from an earlier session; wait for its ID
+                    continue
+                protocol = "binary" if self.frames.binary else "json"
+                arduino_logger.info(f"[{self.device_id}] - [Connected] - [{protocol}]")
+                return
 
-    def send_data(self):
+    async def send_data(self):
         """
-        Sends balance and instruction to Arduino as a comma-separated string.
-        Format: "<balance>,<instruction>\n"
+        Sends balance and instruction to Arduino.
+        Text format: "<balance>,<instruction>\n" (suffixed with ",B" to request binary mode);
+        a binary COMMAND frame once the device has switched.
         """
         if self.instruction is None:
             self.instruction = 0
-        message = f"{self.balance},{self.instruction}\n"
+        if self.frames is not None and self.frames.binary:
+            message = encode_command(self.balance, self.instruction)
+        else:
+            message = encode_text_command(self.balance, self.instruction, self.request_binary)
         try:
-            self.serial.write(message.encode())
+            with self.stats_timer("send"):
+                self.serial.write(message)
+                await self.serial.drain()
             instruction = ""
             if self.instruction == 2:
                 instruction = "Toggle Load"
@@ -125,174 +186,185 @@ class ArduinoClient:
             raise
 
 
-    def start_monitoring_loop(self, db: Session):
+    async def start_monitoring_loop(self):
         """
         Starts the main loop for monitoring and communication with Arduino.
         """
         self.running = True
         power_client = PowerClient(self.device_id)
         while self.running:
-            self.update_state(db)
+            started = time.perf_counter()
+            await self.update_state()
             if self.status == 'inactive':
                 raise ValueError("Device is inactive")
-            self.read_power()
-            self.save_power(db)
+            await self.read_power()
+            self.save_power()
             if self.connection_type == 'Consumer' and self.balance != 0:
-                self.increase_counter(power_client)
+                await self.increase_counter(power_client)
                 if self.consumeToken:
-                    arduino_fn_handler.run_no_wait(self.consume_tokens)
+                    self._spawn(arduino_fn_handler.acall(self.consume_tokens, self.consumeToken))
                     self.consumeToken = 0
-            time.sleep(2)
+            self.serial.stats.observe("cycle", time.perf_counter() - started)
+            await asyncio.sleep(2)
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
 
+    def _update_device(self, db: Session, update_data: dict):
+        Device.update_by_id(db, self.id, update_data)
 
-    def update_state(self, db: Session):
+    async def update_state(self):
         """
-        Syncs local state from DB and sends instructions to Arduino accordingly.
+        Syncs local state from the device registry and sends instructions to Arduino accordingly.
         """
-        device = Device.find(db, device_id=self.device_id)
-        self.status = device.status
-        if device:
-            if self.updateBalance == "true" or self.tokenConsumed == True:
-                self.instruction = 3
-                self.tokenConsumed = False
-                self.balance = arduino_fn_handler.run(sct_client.balanceOf, self.account_address, self.device_id)
-                device.update(db, {"token_balance": self.balance})
-                self.send_data()
-                self.updateBalance = "false"
-                return
+        device = device_registry.get(device_id=self.device_id)
+        self.status = device.status if device else "inactive"
+        if not device:
+            return
+        if self.updateBalance == "true" or self.tokenConsumed == True:
+            # Served from the registry, kept current by the indexer and `balance_service.debit`
+            self.instruction = 3
+            self.tokenConsumed = False
             self.balance = device.token_balance
-            self.instruction = device.instruction
+            await self.send_data()
+            self.updateBalance = "false"
+            return
+        self.balance = device.token_balance
+        self.instruction = device.instruction
 
-            if self.instruction == 2:
-                self.send_data()
-                arduino_logger.info(f"[{self.device_id}] - [Load Toggled]")
-                device.update(db, {"instruction": 1})
-            elif self.instruction == 1:
-                self.send_data()
+        if self.instruction == 2:
+            await self.send_data()
+            arduino_logger.info(f"[{self.device_id}] - [Load Toggled]")
+            await asyncio.to_thread(self._with_db, self._update_device, {"instruction": 1})
+        elif self.instruction == 1:
+            await self.send_data()
 
 
-    def clear_serial_buffer(self):
+    async def read_power(self):
         """
-        Clears the serial input buffer to avoid stale data.
+        Takes every status frame received since the previous cycle from the frame reader.
+        Updates current, voltage, timestamp, and request type from the latest one.
         """
-        self.serial.reset_input_buffer()  # or: self.serial.flushInput()
-        time.sleep(1)  # Wait a bit for new data to come in
-
-
-    def read_power(self):
+        with self.stats_timer("read"):
+            if not await self.frames.wait(timeout=self.read_timeout):
+                arduino_logger.warning(f"[{self.device_id}] - No serial data available to read.")
+                self.samples = []
+                return
+        self.samples = self.frames.drain()
+        latest = self.samples[-1]
+        self.current = latest.current
+        self.voltage = latest.voltage
+        self.timestamp = latest.timestamp
+        self.req = "ON" if latest.req == "true" else "OFF"
+        # A balance request in any frame of the window must not be missed
+        self.updateBalance = "true" if any(s.update == "true" for s in self.samples) else latest.update
+
+        arduino_logger.info(f"[{self.device_id}] - [Received] - {len(self.samples)} frames | Current: {self.current} A, Voltage: {self.voltage} V, Load Status: {self.req}, Update Balance: {self.updateBalance}")
+
+    def save_power(self):
         """
-        Reads a JSON-formatted line from serial port.
-        Updates current, voltage, timestamp, and request type.
+        Enqueues every PowerConsumption reading of the window on the batched ingest pipeline
+        and updates the live stream's latest value.
+        No database round-trip happens here; rows are group-committed by `power_ingest`.
         """
-        self.clear_serial_buffer()
-        if self.serial.in_waiting:
+        queued = 0
+        for sample in self.samples:
+            live_hub.update(self.id, sample.timestamp, sample.power)
+            power_data = {
+                "device_id": self.id,
+                "voltage": sample.voltage,
+                "current": sample.current,
+                "timestamp": sample.timestamp
+            }
             try:
-                line = self.serial.readline().decode().strip()
-                if not line.startswith('{'):
-                    arduino_logger.warning("Skipping Non-JSON line received.")
-                    return
-
-                data = json.loads(line)
-                self.current = data.get("current")
-                self.voltage = data.get("voltage")
-                self.timestamp = datetime.now(ZoneInfo("Africa/Nairobi"))
-                self.req = "ON" if data.get("req") == "true" else "OFF"
-                self.updateBalance = data.get("update")
-
-                arduino_logger.info(f"[{self.device_id}] - [Received] - Current: {self.current} A, Voltage: {self.voltage} V, Load Status: {self.req}, Update Balance: {self.updateBalance}")
-
-            except json.JSONDecodeError:
-                arduino_logger.warning(f"[{self.device_id}] -  Invalid JSON serial data recieved.")
-        else:
-            arduino_logger.warning(f"[{self.device_id}] - No serial data available to read.")
+                if power_ingest.submit(power_data):
+                    queued += 1
+            except Exception as e:
+                arduino_logger.error(f"[{self.device_id}] - [Power consumption] - Fail to save: {e}")
+        if queued:
+            arduino_logger.info(f"[{self.device_id}] - [Power consumption] - queued {queued}")
 
-    def save_power(self, db_session: Session):
+
+    async def increase_counter(self, pow_client):
         """
-        Inserts a PowerConsumption record into the database.
-        Ensures device id is known.
+        Integrates the window's samples over their receive times (trapezoidal rule)
+        and adds the energy, in Wh, to the device's accumulator.
         """
-        device = Device.find(db_session, device_id=self.device_id)
-        power_data = {
-            "device_id": self.id,
-            "voltage": self.voltage,
-            "current": self.current,
-            "timestamp": self.timestamp
-        }
-
         try:
-            power_record = PowerConsumption.create(db_session, power_data)
-            arduino_logger.info(f"[{self.device_id}] - [Power consumption] - saved- [{power_record.id}]")
-        except Exception as e:
-            arduino_logger.error(f"[{self.device_id}] - [Power consumption] - Fail to save: {e}")
-
-
-    def increase_counter(self, pow_client):
-        try:
-            power = self.current * self.voltage
-            pow_client.set(power)
-            total = pow_client.get()
+            if self.meter_batch is not None:
+                energy = await self.meter_batch.integrate(self.meter, self.samples)
+            else:
+                energy = self.meter.integrate(self.samples)
+            tokens, total = pow_client.accumulate(energy, self.threshold)
 
-            arduino_logger.info(f"[{self.device_id}] - [Power consumption] - [Accumulated] - {total} W")
+            arduino_logger.info(f"[{self.device_id}] - [Power consumption] - [Accumulated] - {total:.4f} Wh")
 
-            if total >= self.threshold:
-                arduino_logger.info(f"[{self.device_id}] - [Power consumption] - [Threshold reached]")
-                pow_client.reset(total - self.threshold)  # Reset counter
-                self.consumeToken = 1
+            if tokens:
+                arduino_logger.info(f"[{self.device_id}] - [Power consumption] - [Threshold reached] - {tokens} SCT due")
+                self.consumeToken = tokens
         except Exception as e:
             arduino_logger.error(f"[{self.device_id}] - [Redis] - increment failed: {e}")
 
 
 
-    async def consume_tokens(self):
-            result = await sct_client.consume(self.account_address, self.device_id)
+    async def consume_tokens(self, amount: int = 1):
+            result = await consume_queue.submit(self.account_address, self.device_id, amount)
+            balance = await asyncio.to_thread(balance_service.debit, self.id, result, amount)
             self.tokenConsumed = True
             token_consumption = {}
             token_consumption["device_id"] = self.device_id
-            token_consumption["balance"] = self.balance - 1
+            token_consumption["balance"] = balance if balance is not None else self.balance - amount
             token_consumption["tx_hash"] = result
-            central_client.consume_token(token_consumption)
+            await central_fn_handler.acall(central_client.aconsume_token, token_consumption)
     
     @classmethod
     def detect_ports(cls):
+        """
+        One-shot scan for ports without a session; the hub itself uses `PortWatcher`.
+        """
         devices = arduino_port_client.get()
-        ports = serial.tools.list_ports.comports()
         new_devices = []
-        for port in ports:
-            if "ACM" in port.device and (
-                "Arduino" in port.description or "ttyACM" in port.device
-            ):
-                if port.device not in devices:
-                    arduino_logger.info(f"[Port Detected] - [{port.device}]")
-                    new_devices.append(cls(port.device))
-                    arduino_port_client.set(port.device)
+        for port in sorted(scan_ports()):
+            if port not in devices:
+                arduino_logger.info(f"[Port Detected] - [{port}]")
+                new_devices.append(cls(port))
+                arduino_port_client.set(port)
         return new_devices
 
 if __name__ == "__main__":
-    from src.utils.helpers import start_daemon_thread
-    import time
-
     arduino_port_client.clear()
-    threads = []
     central_fn_handler.call(central_client.connect)
     with get_db() as db:
         central_fn_handler.run(central_client.sync_devices, db)
 
+    multiplexer = SerialMultiplexer(ArduinoClient)
+
+    async def serve():
+        # Live power streams are pushed from the same loop as the serial sessions
+        publisher = asyncio.create_task(mqtt_client.publish_live())
+        background = [publisher]
+        if settings.CENTRAL_SYNC_INTERVAL > 0:
+            background.append(asyncio.create_task(central_client.keep_devices_synced()))
+        try:
+            # Sessions start on hotplug events (inotify on /dev, 5 s polling as a fallback)
+            await multiplexer.serve()
+        finally:
+            for task in background:
+                task.cancel()
+
+    mqtt_client.start(outbox="hub")
     try:
-        # device = ArduinoClient('/dev/pts/6')
-        # t = start_daemon_thread(device.run)
-        # threads.append(t)
-        while True:
-            devices = ArduinoClient.detect_ports()
-            for d in devices:
-                t = start_daemon_thread(d.run)
-                threads.append(t)
-            # Check for new devices every 5 seconds (adjustable)
-            time.sleep(5)
+        asyncio.run(serve())
 
     except KeyboardInterrupt:
         print("[Main] KeyboardInterrupt received. Shutting Down...")
+        mqtt_client.stop()
+        power_ingest.stop()
         with get_db() as db:
             central_fn_handler.call(central_client.shutdown, db)
+        central_client.close()
         time.sleep(5)
         arduino_port_client.clear()
-
@@ -0,0 +1,187 @@
+# /src/homes/frames.py
+import asyncio
+import time
+from collections import deque
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from src.utils.loggers import arduino_logger
+from src.homes.protocol import FrameDecoder
+
+NAIROBI = ZoneInfo("Africa/Nairobi")
+
+
+class Sample:
+    """
+    One status frame received from an Arduino.
+    `monotonic` is the hub's receive time used for integration,
+    `timestamp` the wall-clock time stored with the reading.
+    """
+
+    __slots__ = ("monotonic", "timestamp", "current", "voltage", "update", "req")
+
+    def __init__(self, current, voltage, update=None, req=None, monotonic=None, timestamp=None):
+        self.current = current
+        self.voltage = voltage
+        self.update = update
+        self.req = req
+        self.monotonic = time.monotonic() if monotonic is None else monotonic
+        self.timestamp = timestamp or datetime.now(NAIROBI)
+
+    @property
+    def power(self) -> float:
+        return (self.current or 0.0) * (self.voltage or 0.0)
+
+    def __repr__(self):
+        return f"<Sample current={self.current} voltage={self.voltage} at={self.timestamp}>"
+
+
+class FrameReader:
+    """
+    Continuously frames and parses everything an Arduino sends, JSON lines
+    and binary frames alike (see `src.homes.protocol`).
+
+    Status frames are kept in a bounded ring of `window` samples. Callers
+    either peek at `latest`/`window()` or take everything received since the
+    last call with `drain()`. Samples pushed out of the ring before being
+    drained are counted as dropped, unparsable lines as malformed.
+    """
+
+    def __init__(self, port, device_id: str = None, window: int = 256):
+        self.port = port
+        self.device_id = device_id
+        self._ring = deque(maxlen=window)
+        self._pending = 0  # samples in the ring not yet drained
+        self._arrived = asyncio.Event()
+        self._task = None
+        self.decoder = FrameDecoder()
+        self.latest = None
+        self.last_control = None  # most recent non-status frame, e.g. {"device_id": ...}
+        self._control_seen = 0
+        self._control_taken = 0
+        self.dropped = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._read_loop(), name=f"frames:{self.port.port}")
+            self._task.add_done_callback(lambda _task: self._arrived.set())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    async def _read_loop(self):
+        while True:
+            self.feed(await self.port.read())
+
+    def feed(self, raw: bytes):
+        """
+        Decodes a chunk of the byte stream. Exposed separately so frames can be injected without a port.
+        """
+        malformed = self.malformed
+        decoded = 0
+        for data in self.decoder.feed(raw):
+            decoded += 1
+            self.handle(data)
+        stats = getattr(self.port, "stats", None)
+        if decoded and stats is not None:
+            stats.record_frames(decoded)
+        if self.malformed != malformed:
+            arduino_logger.warning(f"[{self.device_id}] - {self.malformed} malformed frames so far")
+
+    def handle(self, data: dict):
+        if "current" not in data:
+            self.last_control = data
+            self._control_seen += 1
+            self._arrived.set()
+            return
+        self.push(Sample(
+            current=data.get("current"),
+            voltage=data.get("voltage"),
+            update=data.get("update"),
+            req=data.get("req"),
+        ))
+
+    @property
+    def frames(self) -> int:
+        return self.decoder.json_frames + self.decoder.binary_frames
+
+    @property
+    def malformed(self) -> int:
+        return self.decoder.malformed + self.decoder.crc_errors
+
+    @property
+    def binary(self) -> bool:
+        """True once the device has sent at least one binary frame."""
+        return self.decoder.binary_frames > 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def take_control(self):
+        """Returns the latest control frame if it arrived after the previous call."""
+        if self._control_taken == self._control_seen:
+            return None
+        self._control_taken = self._control_seen
+        return self.last_control
+
+    def push(self, sample: Sample):
+        if len(self._ring) == self._ring.maxlen and self._pending >= self._ring.maxlen:
+            self.dropped += 1
+        self._ring.append(sample)
+        self._pending = min(self._pending + 1, self._ring.maxlen)
+        self.latest = sample
+        self._arrived.set()
+
+    def window(self) -> list[Sample]:
+        """All samples currently held in the ring, oldest first."""
+        return list(self._ring)
+
+    def drain(self) -> list[Sample]:
+        """Samples received since the previous drain, oldest first."""
+        if not self._pending:
+            return []
+        samples = list(self._ring)[-self._pending:]
+        self._pending = 0
+        self._arrived.clear()
+        return samples
+
+    async def wait(self, timeout: float, control: bool = False) -> bool:
+        """
+        Waits until at least one undrained sample is available
+        (or, with `control`, an unseen control frame).
+        """
+        def ready():
+            return bool(self._pending) or (control and self._control_taken != self._control_seen)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not ready():
+            if self._task is not None and self._task.done():
+                self._task.result()  # Surface serial errors to the session
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            self._arrived.clear()
+            try:
+                await asyncio.wait_for(self._arrived.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "frames": self.frames,
+            "binary_frames": self.decoder.binary_frames,
+            "malformed": self.malformed,
+            "crc_errors": self.decoder.crc_errors,
+            "dropped": self.dropped,
+            "buffered": len(self._ring),
+            "pending": self._pending,
+        }
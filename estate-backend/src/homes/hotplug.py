@@ -0,0 +1,212 @@
+# /src/homes/hotplug.py
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import struct
+import serial.tools.list_ports
+from src.utils.loggers import arduino_logger
+from src.config import settings
+
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+_EVENT = struct.Struct("iIII")
+
+
+def is_arduino_port(device: str, description: str = "") -> bool:
+    if settings.SERIAL_PORT_DIR and os.path.dirname(device) == os.path.normpath(settings.SERIAL_PORT_DIR):
+        return True
+    name = os.path.basename(device)
+    return "ACM" in name and ("Arduino" in description or name.startswith("ttyACM"))
+
+
+def _port_dir_entries() -> set[str]:
+    directory = settings.SERIAL_PORT_DIR
+    if not directory or not os.path.isdir(directory):
+        return set()
+    directory = os.path.normpath(directory)
+    return {
+        path
+        for path in (os.path.join(directory, name) for name in os.listdir(directory))
+        if os.path.exists(path)  # Skip dangling links left by a stopped simulator
+    }
+
+
+def scan_ports() -> set[str]:
+    """
+    Current Arduino ports, as found by the original 5-second comports() poll,
+    plus every entry of `SERIAL_PORT_DIR` when set.
+    """
+    return {
+        port.device
+        for port in serial.tools.list_ports.comports()
+        if is_arduino_port(port.device, port.description or "")
+    } | _port_dir_entries()
+
+
+def watch_directories() -> tuple[str, ...]:
+    if settings.SERIAL_PORT_DIR and os.path.isdir(settings.SERIAL_PORT_DIR):
+        return ("/dev", os.path.normpath(settings.SERIAL_PORT_DIR))
+    return ("/dev",)
+
+
+class _Inotify:
+    """
+    Minimal inotify binding (Linux) used to watch /dev for tty nodes.
+    """
+
+    def __init__(self, directories):
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc not found")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available on this platform")
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories = {}
+        mask = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+        for directory in directories:
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+            if wd < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+            self.directories[wd] = directory
+
+    def read_events(self):
+        """
+        Yields (added: bool | None, path) for each queued event; None means the queue overflowed.
+        """
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + _EVENT.size <= len(buffer):
+            wd, mask, _cookie, length = _EVENT.unpack_from(buffer, offset)
+            offset += _EVENT.size
+            name = buffer[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                yield None, None
+                continue
+            directory = self.directories.get(wd)
+            if directory is None or not name:
+                continue
+            yield bool(mask & (IN_CREATE | IN_MOVED_TO)), os.path.join(directory, name)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PortWatcher:
+    """
+    Reports Arduino ports as they appear and disappear.
+
+    On Linux, /dev (and `SERIAL_PORT_DIR`) is watched with inotify so a newly plugged house is seen
+    within `settle` seconds (time for udev to finish the node's permissions).
+    Where inotify is unavailable the watcher falls back to polling `scan_ports()`
+    every `poll_interval` seconds. In both modes a full rescan runs every
+    `reconcile_interval` seconds so ports whose session ended are offered again.
+    """
+
+    def __init__(
+        self,
+        on_added,
+        on_removed,
+        directories=None,
+        poll_interval: float = 5,
+        reconcile_interval: float = 10,
+        settle: float = 0.3,
+    ):
+        self.on_added = on_added
+        self.on_removed = on_removed
+        self.directories = directories or watch_directories()
+        self.poll_interval = poll_interval
+        self.reconcile_interval = reconcile_interval
+        self.settle = settle
+        self.present = set()
+        self.mode = None
+
+    def scan(self) -> set[str]:
+        return scan_ports()
+
+    def _matches(self, path: str) -> bool:
+        return is_arduino_port(path)
+
+    def _add(self, port: str):
+        self.present.add(port)
+        arduino_logger.info(f"[Port Detected] - [{port}]")
+        self.on_added(port)
+
+    def _remove(self, port: str):
+        self.present.discard(port)
+        arduino_logger.info(f"[Port Removed] - [{port}]")
+        self.on_removed(port)
+
+    def reconcile(self):
+        """
+        Diffs a fresh scan against the known ports. Ports still present are
+        offered again through `on_added`, which must ignore ones already in session.
+        """
+        current = self.scan()
+        for port in self.present - current:
+            self._remove(port)
+        for port in current:
+            if port in self.present:
+                self.on_added(port)
+            else:
+                self._add(port)
+
+    async def run(self):
+        try:
+            inotify = _Inotify(self.directories)
+        except OSError as e:
+            arduino_logger.warning(f"[Hotplug] - inotify unavailable ({e}), polling every {self.poll_interval}s")
+            self.mode = "poll"
+            await self._run_polling()
+            return
+        self.mode = "inotify"
+        arduino_logger.info(f"[Hotplug] - watching {', '.join(self.directories)}")
+        try:
+            await self._run_inotify(inotify)
+        finally:
+            inotify.close()
+
+    async def _run_polling(self):
+        while True:
+            self.reconcile()
+            await asyncio.sleep(self.poll_interval)
+
+    async def _run_inotify(self, inotify: _Inotify):
+        loop = asyncio.get_running_loop()
+        events = asyncio.Event()
+        loop.add_reader(inotify.fd, events.set)
+        try:
+            self.reconcile()
+            while True:
+                try:
+                    await asyncio.wait_for(events.wait(), self.reconcile_interval)
+                except asyncio.TimeoutError:
+                    self.reconcile()
+                    continue
+                events.clear()
+                for added, path in inotify.read_events():
+                    if path is None:
+                        self.reconcile()
+                    elif not self._matches(path):
+                        continue
+                    elif added and path not in self.present:
+                        loop.call_later(self.settle, self._add_if_present, path)
+                    elif not added and path in self.present:
+                        self._remove(path)
+        finally:
+            loop.remove_reader(inotify.fd)
+
+    def _add_if_present(self, path: str):
+        if os.path.exists(path) and path not in self.present:
+            self._add(path)
@@ -0,0 +1,135 @@
+# /src/homes/metering.py
+import asyncio
+import numpy as np
+
+SECONDS_PER_HOUR = 3600.0
+
+
+def integrate_segments(times: np.ndarray, power: np.ndarray, starts: np.ndarray, max_gap: float) -> np.ndarray:
+    """
+    Trapezoidal energy (Wh) for several devices' samples in one pass.
+
+    `times` (seconds) and `power` (W) hold every device's samples back to back,
+    `starts` the index where each device's run begins. Intervals that cross a
+    device boundary, go backwards or exceed `max_gap` seconds (the device was
+    silent) contribute nothing.
+    """
+    if times.size < 2:
+        return np.zeros(len(starts))
+    dt = np.diff(times)
+    area = dt * (power[1:] + power[:-1]) * 0.5
+    valid = (dt > 0) & (dt <= max_gap)
+    boundaries = starts[1:] - 1
+    valid[boundaries[(boundaries >= 0) & (boundaries < dt.size)]] = False
+    area = np.where(valid, area, 0.0)
+    # Interval i belongs to the device whose run contains sample i
+    owner = np.searchsorted(starts, np.arange(dt.size), side="right") - 1
+    return np.bincount(owner, weights=area, minlength=len(starts)) / SECONDS_PER_HOUR
+
+
+def _arrays(samples, carry=None):
+    count = len(samples) + (carry is not None)
+    times = np.empty(count)
+    power = np.empty(count)
+    offset = 0
+    if carry is not None:
+        times[0], power[0] = carry
+        offset = 1
+    times[offset:] = [s.monotonic for s in samples]
+    power[offset:] = [s.power for s in samples]
+    return times, power
+
+
+class EnergyMeter:
+    """
+    Integrates a device's power samples over their receive timestamps, so the
+    billed energy depends on elapsed time and not on how often the hub loop runs.
+    The last sample of each window is carried into the next one so the interval
+    between windows is not lost.
+    """
+
+    def __init__(self, max_gap: float = 10.0):
+        self.max_gap = max_gap
+        self.total_wh = 0.0
+        self._carry = None  # (monotonic, power) of the last integrated sample
+
+    def integrate(self, samples) -> float:
+        """Energy (Wh) since the previous call."""
+        if not samples:
+            return 0.0
+        times, power = _arrays(samples, self._carry)
+        energy = float(integrate_segments(times, power, np.zeros(1, dtype=np.intp), self.max_gap)[0])
+        self._carry = (times[-1], power[-1])
+        self.total_wh += energy
+        return energy
+
+
+def integrate_windows(windows: dict, meters: dict) -> dict:
+    """
+    Batched variant of `EnergyMeter.integrate` for many devices at once:
+    `windows` maps device -> samples, `meters` device -> EnergyMeter.
+    All samples go through a single vectorised pass.
+    """
+    devices = [d for d, samples in windows.items() if samples]
+    if not devices:
+        return {}
+    arrays = [_arrays(windows[d], meters[d]._carry) for d in devices]
+    lengths = np.array([t.size for t, _ in arrays])
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.intp)
+    times = np.concatenate([t for t, _ in arrays])
+    power = np.concatenate([p for _, p in arrays])
+    max_gap = max(meters[d].max_gap for d in devices)
+    energies = integrate_segments(times, power, starts, max_gap)
+
+    results = {}
+    for device, (t, p), energy in zip(devices, arrays, energies):
+        meter = meters[device]
+        meter._carry = (t[-1], p[-1])
+        meter.total_wh += float(energy)
+        results[device] = float(energy)
+    return results
+
+
+class MeterBatch:
+    """
+    Gathers the windows that device sessions submit within `window` seconds
+    and integrates them with a single `integrate_windows` call, so the
+    per-sample cost stays flat however many devices the hub drives.
+    Must be used from a single event loop (the serial multiplexer's).
+    """
+
+    def __init__(self, window: float = 0.05):
+        self.window = window
+        self._windows = {}
+        self._meters = {}
+        self._futures = {}
+        self._flush_handle = None
+        self.batches = 0
+
+    async def integrate(self, meter: EnergyMeter, samples) -> float:
+        """Energy (Wh) of `samples` since the meter's previous window."""
+        loop = asyncio.get_running_loop()
+        key = id(meter)
+        future = loop.create_future()
+        self._windows[key] = samples
+        self._meters[key] = meter
+        self._futures[key] = future
+        if self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        windows, meters, futures = self._windows, self._meters, self._futures
+        self._windows, self._meters, self._futures = {}, {}, {}
+        self._flush_handle = None
+        self.batches += 1
+        try:
+            energies = integrate_windows(windows, meters)
+        except Exception as e:
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in futures.items():
+            if not future.done():
+                future.set_result(energies.get(key, 0.0))
@@ -0,0 +1,196 @@
+# /src/homes/protocol.py
+"""
+Serial framing shared by the estate hub and the house sketches.
+
+Two formats can be mixed on the same stream:
+
+* JSON text lines, e.g. {"current":0.42,"voltage":3.91,"update":"false","req":"true"}\\n
+* Fixed-layout binary frames, negotiated during the connect handshake:
+
+    SYNC(0xA5) | TYPE(1) | PAYLOAD | CRC16(2)
+
+  CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF) over TYPE + PAYLOAD, all
+  fields little-endian as on AVR.
+
+  STATUS  (0x01, uplink)   current int16 centiamps | voltage uint16 centivolts | flags uint8
+                            flags bit0 = update balance, bit1 = load on
+  COMMAND (0x81, downlink) balance int32 SCT | instruction uint8
+
+A binary STATUS frame is 9 bytes against ~60 for the JSON line.
+"""
+import json
+import struct
+
+PROTOCOL_VERSION = 1
+SYNC = 0xA5
+STATUS = 0x01
+COMMAND = 0x81
+BINARY_REQUEST = ",B"  # Suffix on the text downlink asking the device to switch
+
+_STATUS = struct.Struct("<hHB")
+_COMMAND = struct.Struct("<iB")
+_CRC = struct.Struct("<H")
+PAYLOAD_SIZES = {STATUS: _STATUS.size, COMMAND: _COMMAND.size}
+MAX_LINE = 256
+
+FLAG_UPDATE = 0x01
+FLAG_REQ = 0x02
+
+
+def _crc16_table():
+    table = []
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+        table.append(crc & 0xFFFF)
+    return tuple(table)
+
+
+_CRC16_TABLE = _crc16_table()
+
+
+def crc16(data: bytes) -> int:
+    crc = 0xFFFF
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFF) ^ _CRC16_TABLE[(crc >> 8) ^ byte]
+    return crc
+
+
+def _frame(frame_type: int, payload: bytes) -> bytes:
+    body = bytes((frame_type,)) + payload
+    return bytes((SYNC,)) + body + _CRC.pack(crc16(body))
+
+
+def encode_status(current: float, voltage: float, update: bool, req: bool) -> bytes:
+    flags = (FLAG_UPDATE if update else 0) | (FLAG_REQ if req else 0)
+    payload = _STATUS.pack(
+        max(-32768, min(32767, round((current or 0) * 100))),
+        max(0, min(65535, round((voltage or 0) * 100))),
+        flags,
+    )
+    return _frame(STATUS, payload)
+
+
+def encode_command(balance: int, instruction: int) -> bytes:
+    return _frame(COMMAND, _COMMAND.pack(int(balance), int(instruction)))
+
+
+def encode_text_command(balance, instruction, request_binary: bool = False) -> bytes:
+    suffix = BINARY_REQUEST if request_binary else ""
+    return f"{balance},{instruction}{suffix}\n".encode()
+
+
+def _decode_payload(frame_type: int, payload: bytes) -> dict:
+    if frame_type == STATUS:
+        current, voltage, flags = _STATUS.unpack(payload)
+        return {
+            "current": current / 100,
+            "voltage": voltage / 100,
+            "update": "true" if flags & FLAG_UPDATE else "false",
+            "req": "true" if flags & FLAG_REQ else "false",
+        }
+    balance, instruction = _COMMAND.unpack(payload)
+    return {"balance": balance, "instruction": instruction}
+
+
+class FrameDecoder:
+    """
+    Incremental decoder for a byte stream carrying JSON lines, binary frames or both.
+    `feed()` returns the decoded frames as dicts in the JSON shape, so callers
+    do not care which format the device used.
+    """
+
+    def __init__(self, commands: bool = False):
+        # With `commands`, text lines are parsed as "<balance>,<instruction>[,B]"
+        # downlink commands; this is the device side of the link.
+        self.commands = commands
+        self._buf = bytearray()
+        self.json_frames = 0
+        self.binary_frames = 0
+        self.malformed = 0
+        self.crc_errors = 0
+        self.skipped_bytes = 0
+
+    def feed(self, data: bytes) -> list[dict]:
+        self._buf.extend(data)
+        frames = []
+        buf = self._buf
+        while buf:
+            head = buf[0]
+            if head == SYNC:
+                if len(buf) < 2:
+                    break
+                size = PAYLOAD_SIZES.get(buf[1])
+                if size is None:
+                    self._skip(1)
+                    continue
+                total = 2 + size + 2
+                if len(buf) < total:
+                    break
+                body = bytes(buf[1:2 + size])
+                (crc,) = _CRC.unpack_from(buf, 2 + size)
+                if crc != crc16(body):
+                    self.crc_errors += 1
+                    self._skip(1)  # Resynchronise on the next SYNC byte
+                    continue
+                del buf[:total]
+                self.binary_frames += 1
+                frames.append(_decode_payload(body[0], body[1:]))
+            elif head == 0x7B:  # '{'
+                end = buf.find(b"\n")
+                sync = buf.find(bytes((SYNC,)))
+                if 0 <= sync < (end if end >= 0 else len(buf)):
+                    # A binary frame starts before the line ends: this was not JSON
+                    self.malformed += 1
+                    self._skip(sync)
+                    continue
+                if end < 0:
+                    if len(buf) > MAX_LINE:
+                        self.malformed += 1
+                        self._skip(len(buf))
+                    break
+                line = bytes(buf[:end])
+                del buf[:end + 1]
+                try:
+                    frame = json.loads(line.decode())
+                    if not isinstance(frame, dict):
+                        raise ValueError("frame is not an object")
+                except (ValueError, UnicodeDecodeError):
+                    self.malformed += 1
+                    continue
+                self.json_frames += 1
+                frames.append(frame)
+            else:
+                # Noise, debug prints or the tail of a broken frame
+                end = buf.find(b"\n")
+                stop = len(buf) if end < 0 else end + 1
+                for marker in (SYNC, 0x7B):
+                    found = buf.find(bytes((marker,)), 0, stop)
+                    if found >= 0:
+                        stop = min(stop, found)
+                if stop == len(buf) and end < 0 and len(buf) <= MAX_LINE:
+                    break  # Wait for more bytes before deciding
+                if end >= 0 and stop == end + 1 and buf[:end].strip():
+                    command = self._text_command(bytes(buf[:end])) if self.commands else None
+                    if command is None:
+                        self.malformed += 1
+                    else:
+                        self.json_frames += 1
+                        frames.append(command)
+                self._skip(stop)
+        return frames
+
+    @staticmethod
+    def _text_command(line: bytes):
+        try:
+            parts = line.decode().strip().split(",")
+            command = {"balance": float(parts[0]), "instruction": int(parts[1])}
+        except (ValueError, IndexError, UnicodeDecodeError):
+            return None
+        command["binary"] = len(parts) > 2 and parts[2] == BINARY_REQUEST[1:]
+        return command
+
+    def _skip(self, count: int):
+        self.skipped_bytes += count
+        del self._buf[:count]
@@ -0,0 +1,314 @@
+# /src/homes/serial_mux.py
+import asyncio
+import os
+import time
+import serial
+from src.utils.loggers import arduino_logger
+from src.homes.hotplug import PortWatcher
+from src.homes.metering import MeterBatch
+
+
+class PortStats:
+    """
+    Per-port counters for throughput (bytes in and out, frames decoded in,
+    lines written out) and latency of each named step of the device session
+    (handshake, read, save, send).
+    """
+
+    def __init__(self, port: str):
+        self.port = port
+        self.started = time.monotonic()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.frames_in = 0
+        self.lines_out = 0
+        self.steps = {}  # step -> [count, total_seconds, max_seconds, last_seconds]
+
+    def record_read(self, nbytes: int):
+        self.bytes_in += nbytes
+
+    def record_frames(self, count: int = 1):
+        self.frames_in += count
+
+    def record_write(self, nbytes: int):
+        self.bytes_out += nbytes
+        self.lines_out += 1
+
+    def observe(self, step: str, seconds: float):
+        entry = self.steps.setdefault(step, [0, 0.0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+        entry[3] = seconds
+
+    def timer(self, step: str):
+        return _StepTimer(self, step)
+
+    def snapshot(self) -> dict:
+        uptime = max(time.monotonic() - self.started, 1e-9)
+        return {
+            "port": self.port,
+            "uptime_s": round(uptime, 1),
+            "bytes_in_per_s": round(self.bytes_in / uptime, 2),
+            "bytes_out_per_s": round(self.bytes_out / uptime, 2),
+            "frames_in_per_s": round(self.frames_in / uptime, 3),
+            "lines_out_per_s": round(self.lines_out / uptime, 3),
+            "latency_ms": {
+                step: {
+                    "count": count,
+                    "avg": round(total / count * 1000, 2) if count else 0.0,
+                    "max": round(peak * 1000, 2),
+                    "last": round(last * 1000, 2),
+                }
+                for step, (count, total, peak, last) in self.steps.items()
+            },
+        }
+
+
+class _StepTimer:
+    def __init__(self, stats: PortStats, step: str):
+        self.stats = stats
+        self.step = step
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stats.observe(self.step, time.perf_counter() - self.start)
+        return False
+
+
+class AsyncSerialPort:
+    """
+    Non-blocking wrapper around a pyserial port driven by the running event loop.
+    Incoming bytes are read from the file descriptor with `loop.add_reader` and
+    buffered until a coroutine asks for a line; writes are queued and flushed
+    with `loop.add_writer` whenever the tty cannot take the whole frame.
+    """
+
+    def __init__(self, port: str, baud: int = 9600):
+        self.port = port
+        self.baud = baud
+        self.serial = None
+        self.stats = PortStats(port)
+        self._loop = None
+        self._fd = None
+        self._rx = bytearray()
+        self._tx = bytearray()
+        self._rx_ready = asyncio.Event()
+        self._tx_done = asyncio.Event()
+        self._tx_done.set()
+        self._error = None
+
+    async def open(self):
+        self._loop = asyncio.get_running_loop()
+        self.serial = serial.Serial(self.port, self.baud, timeout=0, write_timeout=0)
+        self._fd = self.serial.fileno()
+        os.set_blocking(self._fd, False)
+        self._loop.add_reader(self._fd, self._on_readable)
+
+    def _on_readable(self):
+        try:
+            data = os.read(self._fd, 4096)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._fail(serial.SerialException(f"{self.port} read failed: {e}"))
+            return
+        if not data:
+            self._fail(serial.SerialException(f"{self.port} closed by device"))
+            return
+        self.stats.record_read(len(data))
+        self._rx.extend(data)
+        self._rx_ready.set()
+
+    def _on_writable(self):
+        try:
+            written = os.write(self._fd, self._tx)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._fail(serial.SerialException(f"{self.port} write failed: {e}"))
+            return
+        del self._tx[:written]
+        if not self._tx:
+            self._loop.remove_writer(self._fd)
+            self._tx_done.set()
+
+    def abort(self, reason: str):
+        """
+        Fails pending and future I/O, e.g. when the device node was removed.
+        """
+        self._fail(serial.SerialException(f"{self.port} {reason}"))
+
+    def _fail(self, error: Exception):
+        self._error = error
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+            self._loop.remove_writer(self._fd)
+        self._rx_ready.set()
+        self._tx_done.set()
+
+    async def _wait_rx(self, deadline):
+        if self._error:
+            raise self._error
+        self._rx_ready.clear()
+        if deadline is None:
+            await self._rx_ready.wait()
+            return
+        remaining = deadline - self._loop.time()
+        if remaining <= 0:
+            raise asyncio.TimeoutError
+        await asyncio.wait_for(self._rx_ready.wait(), remaining)
+
+    async def readline(self, timeout: float | None = None) -> bytes:
+        """
+        Returns the next newline-terminated frame (newline included).
+        Raises asyncio.TimeoutError if none arrives within `timeout` seconds.
+        """
+        deadline = None if timeout is None else self._loop.time() + timeout
+        while True:
+            idx = self._rx.find(b"\n")
+            if idx >= 0:
+                line = bytes(self._rx[:idx + 1])
+                del self._rx[:idx + 1]
+                self.stats.record_frames()
+                return line
+            await self._wait_rx(deadline)
+
+    async def read(self, timeout: float | None = None) -> bytes:
+        """
+        Returns every byte buffered so far, waiting for at least one.
+        """
+        deadline = None if timeout is None else self._loop.time() + timeout
+        while not self._rx:
+            await self._wait_rx(deadline)
+        data = bytes(self._rx)
+        self._rx.clear()
+        return data
+
+    def write(self, data: bytes):
+        """
+        Queues `data` for the device, writing immediately when the tty has room.
+        """
+        if self._error:
+            raise self._error
+        self.stats.record_write(len(data))
+        if not self._tx:
+            try:
+                written = os.write(self._fd, data)
+            except BlockingIOError:
+                written = 0
+            except OSError as e:
+                self._fail(serial.SerialException(f"{self.port} write failed: {e}"))
+                raise self._error
+            data = data[written:]
+            if not data:
+                return
+        self._tx.extend(data)
+        self._tx_done.clear()
+        self._loop.add_writer(self._fd, self._on_writable)
+
+    async def drain(self):
+        await self._tx_done.wait()
+        if self._error:
+            raise self._error
+
+    def reset_input_buffer(self):
+        self._rx.clear()
+        self.serial.reset_input_buffer()
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._rx)
+
+    def close(self):
+        if self._fd is not None and self._loop is not None and not self._loop.is_closed():
+            self._loop.remove_reader(self._fd)
+            self._loop.remove_writer(self._fd)
+        if self.serial is not None:
+            self.serial.close()
+        self._fd = None
+
+
+class SerialMultiplexer:
+    """
+    Drives every Arduino session on the hub from a single asyncio event loop.
+    Sessions are started as soon as the `PortWatcher` reports a port and torn
+    down when it disappears; each runs the client's `run()` coroutine as a task,
+    so handshakes proceed in parallel. Per-port statistics are logged every
+    `report_interval` seconds. The sessions' energy windows are integrated
+    together through one `MeterBatch`.
+    """
+
+    def __init__(self, client_cls, report_interval: float = 60):
+        self.client_cls = client_cls
+        self.report_interval = report_interval
+        self.clients = {}
+        self.tasks = {}
+        self.meter_batch = MeterBatch()
+
+    def attach(self, client):
+        if client.port in self.tasks:
+            return self.tasks[client.port]
+        client.meter_batch = self.meter_batch
+        task = asyncio.create_task(client.run(), name=f"arduino:{client.port}")
+        self.clients[client.port] = client
+        self.tasks[client.port] = task
+        task.add_done_callback(lambda _t, port=client.port: self._detach(port))
+        return task
+
+    def _detach(self, port: str):
+        self.tasks.pop(port, None)
+        self.clients.pop(port, None)
+
+    def add_port(self, port: str):
+        if port not in self.tasks:
+            self.attach(self.client_cls(port))
+
+    def remove_port(self, port: str):
+        """
+        Ends the session of an unplugged port through its normal disconnect path.
+        """
+        client = self.clients.get(port)
+        if client is None:
+            return
+        if client.serial is not None:
+            client.serial.abort("removed")
+        else:
+            self.tasks[port].cancel()
+
+    def report(self) -> dict:
+        report = {}
+        for port, client in self.clients.items():
+            if client.serial is None:
+                continue
+            report[port] = client.serial.stats.snapshot()
+            if getattr(client, "frames", None) is not None:
+                report[port]["frames"] = client.frames.stats()
+        return report
+
+    async def _report_loop(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            for port, stats in self.report().items():
+                arduino_logger.info(f"[Stats] - [{port}] - {stats}")
+
+    async def serve(self, watcher: PortWatcher = None):
+        """
+        Runs the hotplug watcher (inotify, or polling as a fallback) until cancelled.
+        """
+        watcher = watcher or PortWatcher(self.add_port, self.remove_port)
+        reporter = asyncio.create_task(self._report_loop())
+        try:
+            await watcher.run()
+        finally:
+            reporter.cancel()
+            await self.shutdown()
+
+    async def shutdown(self):
+        tasks = list(self.tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -15,7 +15,8 @@ def main():
     with get_db() as db:
         central_fn_handler.run(central_client.sync_devices, db)
         central_fn_handler.run(central_client.shutdown, db)
-    
+    central_client.close()
+
 import serial  # make sure serial is imported
 import serial.tools.list_ports
 def get_ports():
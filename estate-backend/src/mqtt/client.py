@@ -1,16 +1,19 @@
 # src/mqtt/client.py
+import os
 import paho.mqtt.client as paho
 from paho.mqtt.client import CallbackAPIVersion
 from paho import mqtt
 from src.config import settings
 from src.utils.loggers import mqtt_logger
 from src.db.database import get_db
-from src.db.models import Device, PowerConsumption
-import threading
-import json
-import time
+from src.db.models import Device
+from src.db.registry import device_registry
+from src.mqtt.live import live_hub
+from src.mqtt.telemetry import FRAME_TOPIC
+from src.mqtt.dispatcher import CommandDispatcher
+from src.mqtt.outbox import Outbox
+from src.mqtt.codec import CODECS, CODECS_SUFFIX, CODECS_TOPIC, advertisement, for_content_type, negotiate
 
-streaming_flags = {}
 class MqttClient:
     def __init__(self):
         self.client = paho.Client(
@@ -24,57 +27,108 @@ class MqttClient:
         
         self.subscribe_topic = f"{settings.HUB_NAME}/commands"
         self.publish_topic = f"{settings.HUB_NAME}/power"
-        self.device = None
+        self.dead_letter_topic = f"{settings.HUB_NAME}/commands/dead_letter"
+        self.commands = CommandDispatcher(
+            self.handle_command,
+            workers=settings.MQTT_COMMAND_WORKERS,
+            queue_size=settings.MQTT_COMMAND_QUEUE_SIZE,
+            on_dead_letter=self.publish_dead_letter,
+        )
+        self.outbox = None  # Opened in start() for a named outbox when MQTT_OUTBOX_PATH is set
+        self.codec = CODECS["json"]  # MQTT_CODEC once central advertises it (see src.mqtt.codec)
 
         # Set callbacks
         self.client.on_connect = self.on_connect
         self.client.on_message = self.on_message
         self.client.on_subscribe = self.on_subscribe
         self.client.on_publish = self.on_publish
+        self.client.on_disconnect = self.on_disconnect
 
     def on_connect(self, client, userdata, flags, rc, properties=None):
         if rc == 0:
             client.subscribe(self.subscribe_topic, qos=1)
             mqtt_logger.info(f"Subscribed to {self.subscribe_topic}")
+            client.subscribe(CODECS_TOPIC, qos=1)
+            client.publish(
+                f"{settings.HUB_NAME}/{CODECS_SUFFIX}", advertisement(), qos=1, retain=True,
+                properties=CODECS["json"].properties(),
+            )
+            if self.outbox is not None:
+                self.outbox.connected()
         else:
             mqtt_logger.error(f"Connection failed with code {rc}")
 
     def on_message(self, client, userdata, msg):
-        # mqtt_logger.info(f"Message received on {msg.topic}: {msg.payload.decode()}")
-
-        try:
-            command = json.loads(msg.payload.decode())
-            device_id = command["device"]
-            device = None
+        if msg.topic == CODECS_TOPIC:
+            self.codec = negotiate(settings.MQTT_CODEC, msg.payload)
+            mqtt_logger.info(f"[Codec] - central decodes {msg.payload!r}, publishing with {self.codec.name}")
+            return
+        # Runs on paho's network thread: parse and enqueue only
+        self.commands.submit(msg.topic, msg.payload, getattr(msg.properties, "ContentType", None))
+
+    def handle_command(self, command: dict):
+        """
+        Applies one command on a dispatcher worker. Raising dead-letters the command.
+        """
+        device_id = command["device"]
+        device = device_registry.get(id=device_id)
+        if device is None:
+            raise ValueError(f"[Receive] - Device ID [{device_id}] not found in database.")
+        if "instruction" in command:
             with get_db() as db:
-                device = Device.find(db, id=device_id)
-                self.device = device
-                if device is None:
-                    raise ValueError(f"[Receive] - Device ID [{device_id}[ not found in database.")
-                if "instruction" in command:
-                    device.update(db, {"instruction": 2})
-                    mqtt_logger.info(f"[Receive] - [Toogle Load] - [{device.device_id}]")
-                    return
-
-            if command.get("command") == "stream":
-                if not streaming_flags.get(device_id):
-                    streaming_flags[device_id] = True
-                    threading.Thread(target=self.stream_power, args=(device, client), daemon=True).start()
-                    mqtt_logger.info(f"[Receive] - [Stream Start] - [{device.device_id}]")
-                else:
-                    mqtt_logger.warning(f"[Stream] Already streaming for device {device_id}")
-
-            elif command.get("command") == "stop":
-                streaming_flags[device_id] = False
-                mqtt_logger.info(f"[Receive] - [Stream Stop] - [{device.device_id}]")
+                Device.update_by_id(db, device.id, {"instruction": 2})
+            mqtt_logger.info(f"[Receive] - [Toogle Load] - [{device.device_id}]")
+            return
 
+        if command.get("command") == "stream":
+            if live_hub.subscribe(device.id):
+                mqtt_logger.info(f"[Receive] - [Stream Start] - [{device.device_id}]")
             else:
-                mqtt_logger.info(f"[Receive] Unknown command: {command}")
+                mqtt_logger.warning(f"[Stream] Already streaming for device {device_id}")
 
-        except json.JSONDecodeError:
-            mqtt_logger.warning("[Receive] - Invalid JSON payload")
-        except ValueError as e:
-            mqtt_logger.warning(f"[Receive] - [Err] - {e}")
+        elif command.get("command") == "stop":
+            live_hub.unsubscribe(device.id)
+            mqtt_logger.info(f"[Receive] - [Stream Stop] - [{device.device_id}]")
+
+        else:
+            raise ValueError(f"[Receive] Unknown command: {command}")
+
+    def publish_frame(self, frame: dict):
+        """Publishes a hub telemetry frame (see `src.mqtt.telemetry`)."""
+        self.publish(f"{settings.HUB_NAME}/{FRAME_TOPIC}", frame, qos=0, ttl=settings.MQTT_LIVE_TTL)
+
+    def publish_live(self):
+        """
+        Coroutine pushing `live_hub` readings: per-device messages to subscribed
+        streams, or one frame per tick when MQTT_TELEMETRY_FRAMES is set.
+        """
+        frames = self.publish_frame if settings.MQTT_TELEMETRY_FRAMES else None
+        return live_hub.run(self.publish_power, frames)
+
+    def publish_dead_letter(self, letter: dict):
+        self.publish(self.dead_letter_topic, letter, qos=1)
+
+    def publish(self, topic: str, message, qos: int = 1, ttl: float = None):
+        """
+        Every hub-to-central message goes through here. It is encoded with the
+        codec negotiated with central (named in the Content Type property). With the outbox
+        enabled it is persisted first and sent in order by the outbox drain, so
+        broker outages do not lose it; messages older than `ttl` seconds are not replayed.
+        """
+        payload = self.codec.encode(message)
+        if self.outbox is None:
+            self.client.publish(topic, payload, qos=qos, properties=self.codec.properties())
+            return
+        self.outbox.enqueue(topic, payload, qos=qos, ttl=ttl, content_type=self.codec.content_type)
+
+    def _publish_encoded(self, topic: str, payload: bytes, qos: int, content_type: str = None):
+        """Sends an already encoded outbox message with the content type it was stored with."""
+        return self.client.publish(topic, payload, qos=qos, properties=for_content_type(content_type).properties())
+
+    def on_disconnect(self, client, userdata, flags, rc, properties=None):
+        if self.outbox is not None:
+            self.outbox.disconnected()
+        mqtt_logger.warning(f"Disconnected from broker ({rc}), reconnecting")
 
     def on_subscribe(self, client, userdata, mid, granted_qos, properties=None):
         mqtt_logger.info(f"Subscription successful")
@@ -83,31 +137,50 @@ class MqttClient:
         if userdata:
             mqtt_logger.info(f"Message published (mid={mid}), {userdata.get("power")}")
 
-    def start(self):
-        self.client.connect(settings.MQTT_BROKER, settings.MQTT_PORT)
+    @staticmethod
+    def outbox_path(name: str) -> str:
+        """Outbox database of the `name` process: MQTT_OUTBOX_PATH with the name before the extension."""
+        root, ext = os.path.splitext(settings.MQTT_OUTBOX_PATH)
+        return f"{root}.{name}{ext}"
+
+    def start(self, outbox: str = None):
+        """
+        Connects and starts the command workers. `outbox` names this process's
+        store-and-forward outbox; each process needs its own, since every drain
+        sends all the rows of its database. Without one, messages go straight out.
+        """
+        self.commands.start()
+        if outbox and settings.MQTT_OUTBOX_PATH and self.outbox is None:
+            self.outbox = Outbox(
+                self.outbox_path(outbox),
+                self._publish_encoded,
+                batch_size=settings.MQTT_OUTBOX_BATCH_SIZE,
+                max_rate=settings.MQTT_OUTBOX_MAX_RATE,
+                max_messages=settings.MQTT_OUTBOX_MAX_MESSAGES,
+            )
+            self.outbox.start()
+        # Asynchronous connect: a hub booting without connectivity keeps retrying
+        # in the network loop while the outbox accumulates
+        self.client.connect_async(settings.MQTT_BROKER, settings.MQTT_PORT)
         self.client.loop_start()
 
     def stop(self):
+        if self.outbox is not None:
+            self.outbox.stop()
+            mqtt_logger.info(f"[Outbox] - [Stopped] - {self.outbox.stats()}")
         self.client.loop_stop()
         self.client.disconnect()
+        self.commands.stop()
+        mqtt_logger.info(f"[Commands] - [Stopped] - {self.commands.stats()}")
 
 
-    def stream_power(self, device, client):
-        while streaming_flags.get(device.id):
-            try:
-                with get_db() as db:
-                    power = PowerConsumption.latest(db, device.id)
-                    if power:
-                        message = {
-                            "timestamp": str(power.timestamp),
-                            "power": power.power
-                        }
-                        topic = f"{self.publish_topic}/{device.id}"
-                        client.publish(topic, json.dumps(message))
-                        mqtt_logger.info(f"[Publish] - [Stream] - [{device.device_id}] -  {message.get("power")} W")
-                    time.sleep(3)  # Add delay between messages
-            except Exception as e:
-                mqtt_logger.error(f"[StreamError] {e}")
+    def publish_power(self, device_id: int, message: dict):
+        """
+        Publishes a live reading pushed by `live_hub`; paho queues it for its network thread.
+        """
+        topic = f"{self.publish_topic}/{device_id}"
+        self.publish(topic, message, qos=0, ttl=settings.MQTT_LIVE_TTL)
+        mqtt_logger.debug(f"[Publish] - [Stream] - [{device_id}] -  {message.get('power')} W")
 
 
 mqtt_client = MqttClient()
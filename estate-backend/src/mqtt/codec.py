@@ -0,0 +1,114 @@
+# src/mqtt/codec.py
+"""
+MQTT payload codecs. Each side advertises the codecs it can decode in a
+retained JSON message (central on CODECS_TOPIC, each hub on
+`{HUB}/codecs`), and a sender uses its preferred codec (MQTT_CODEC) only once
+the receiver has advertised it, JSON until then. Every message names its
+codec in the MQTT v5 Content Type property and is decoded by it; messages
+without one (MQTT 3.1.1 peers, older hubs) are JSON, and a content type this
+side cannot decode is rejected with `UnsupportedContentType`.
+
+backend-central carries the same table in src/utils/codec.py.
+"""
+import json
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
+from src.utils.loggers import mqtt_logger
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+CBOR = "application/cbor"
+
+# Retained advertisement of the codecs central decodes; hubs use `{HUB}/codecs`
+CODECS_TOPIC = "central/codecs"
+CODECS_SUFFIX = "codecs"
+
+
+class UnsupportedContentType(ValueError):
+    """A payload whose Content Type names a codec this side cannot decode."""
+
+
+class Codec:
+    def __init__(self, name: str, content_type: str, encode, decode):
+        self.name = name
+        self.content_type = content_type
+        self.encode = encode  # object -> bytes
+        self.decode = decode  # bytes -> object
+
+    def properties(self) -> Properties:
+        properties = Properties(PacketTypes.PUBLISH)
+        properties.ContentType = self.content_type
+        return properties
+
+    def __repr__(self):
+        return f"<Codec {self.name}>"
+
+
+def _json_encode(obj) -> bytes:
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def _json_decode(payload: bytes):
+    return json.loads(payload)
+
+
+CODECS = {"json": Codec("json", JSON, _json_encode, _json_decode)}
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+else:
+    CODECS["msgpack"] = Codec(
+        "msgpack", MSGPACK,
+        lambda obj: msgpack.packb(obj, use_bin_type=True),
+        lambda payload: msgpack.unpackb(payload, raw=False),
+    )
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+else:
+    CODECS["cbor"] = Codec("cbor", CBOR, cbor2.dumps, cbor2.loads)
+
+_BY_CONTENT_TYPE = {codec.content_type: codec for codec in CODECS.values()}
+
+
+def get_codec(name: str) -> Codec:
+    """The named codec, or JSON when it is unknown or its library is not installed."""
+    codec = CODECS.get((name or "json").lower())
+    if codec is None:
+        mqtt_logger.warning(f"[Codec] - '{name}' unavailable, using JSON")
+        return CODECS["json"]
+    return codec
+
+
+def for_content_type(content_type) -> Codec:
+    """The codec named by a Content Type property; JSON when there is none."""
+    if not content_type:
+        return CODECS["json"]
+    codec = _BY_CONTENT_TYPE.get(content_type)
+    if codec is None:
+        raise UnsupportedContentType(f"no codec for content type {content_type} (library not installed?)")
+    return codec
+
+
+def decode(payload: bytes, properties=None):
+    """Decodes a received payload according to its Content Type property."""
+    return for_content_type(getattr(properties, "ContentType", None)).decode(payload)
+
+
+def advertisement() -> bytes:
+    """The retained capability message: the codecs this side decodes, always as JSON."""
+    return _json_encode({"codecs": sorted(CODECS)})
+
+
+def negotiate(preferred: str, advertised: bytes) -> Codec:
+    """The preferred codec if the peer's advertisement lists it, JSON otherwise."""
+    try:
+        names = json.loads(advertised).get("codecs", []) if advertised else []
+    except (ValueError, AttributeError):
+        names = []
+    codec = get_codec(preferred)
+    return codec if codec.name in names else CODECS["json"]
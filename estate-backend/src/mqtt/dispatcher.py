@@ -0,0 +1,168 @@
+# src/mqtt/dispatcher.py
+import queue
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import datetime, timezone
+from src.utils.loggers import mqtt_logger
+from src.mqtt.codec import for_content_type
+
+
+class CommandDispatcher:
+    """
+    Runs MQTT commands on a pool of worker threads so paho's network thread
+    only parses and enqueues.
+
+    Each worker owns a bounded queue and commands are routed by device, so
+    the commands for one device are handled in arrival order while different
+    devices proceed in parallel. When a worker's queue is full the command
+    is rejected instead of blocking the network loop. Rejected, unparsable and
+    failing commands are dead-lettered: kept in memory (last `dead_letter_size`)
+    and handed to `on_dead_letter`, e.g. to publish them on a dead-letter topic.
+    """
+
+    def __init__(
+        self,
+        handler,
+        workers: int = 4,
+        queue_size: int = 256,
+        dead_letter_size: int = 100,
+        on_dead_letter=None,
+        high_watermark: float = 0.8,
+    ):
+        self.handler = handler
+        self.on_dead_letter = on_dead_letter
+        self.high_watermark = high_watermark
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in range(workers)]
+        self._threads = []
+        self._lock = threading.Lock()
+        self._pressured = False
+        self.dead_letters = deque(maxlen=dead_letter_size)
+
+        self.received = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.dead_lettered = 0
+        self.max_depth = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+        self._run_max = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for index, commands in enumerate(self._queues):
+                thread = threading.Thread(target=self._work, args=(commands,), name=f"mqtt-command-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: float = 5):
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for commands in self._queues:
+            commands.put(None)
+        for thread in threads:
+            thread.join(timeout)
+
+    def _shard(self, key) -> queue.Queue:
+        return self._queues[zlib.crc32(str(key).encode()) % len(self._queues)]
+
+    def submit(self, topic: str, payload: bytes, content_type: str = None) -> bool:
+        """
+        Decodes (by MQTT content type, JSON by default) and enqueues a command;
+        never blocks. Returns False if it was dead-lettered.
+        """
+        self.received += 1
+        try:
+            command = for_content_type(content_type).decode(payload)
+            if not isinstance(command, dict) or "device" not in command:
+                raise ValueError("command must be an object with a 'device'")
+        except Exception as e:
+            self.dead_letter(topic, payload, f"invalid payload: {e}")
+            return False
+        commands = self._shard(command["device"])
+        try:
+            commands.put_nowait((command, topic, payload, time.monotonic()))
+        except queue.Full:
+            self.rejected += 1
+            self.dead_letter(topic, payload, "queue full")
+            return False
+        self._check_pressure()
+        return True
+
+    def _check_pressure(self):
+        deepest = max(commands.qsize() for commands in self._queues)
+        self.max_depth = max(self.max_depth, deepest)
+        fill = deepest / self._queues[0].maxsize
+        if fill >= self.high_watermark and not self._pressured:
+            self._pressured = True
+            mqtt_logger.warning(f"[Commands] - [Back-pressure] - a worker queue is {fill:.0%} full ({deepest} commands)")
+        elif fill < self.high_watermark / 2 and self._pressured:
+            self._pressured = False
+            mqtt_logger.info(f"[Commands] - [Back-pressure] - relieved ({self.depth()} commands queued)")
+
+    def _work(self, commands: queue.Queue):
+        while True:
+            item = commands.get()
+            if item is None:
+                return
+            command, topic, payload, queued_at = item
+            started = time.monotonic()
+            try:
+                self.handler(command)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                self.dead_letter(topic, payload, f"{type(e).__name__}: {e}")
+            finished = time.monotonic()
+            self._observe(started - queued_at, finished - started)
+            self._check_pressure()
+
+    def _observe(self, waited: float, ran: float):
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        self._run_total += ran
+        self._run_max = max(self._run_max, ran)
+
+    def dead_letter(self, topic: str, payload: bytes, reason: str):
+        self.dead_lettered += 1
+        try:
+            text = payload.decode()
+        except UnicodeDecodeError:  # msgpack / CBOR command
+            text = payload.hex()
+        letter = {
+            "topic": topic,
+            "payload": text,
+            "reason": reason,
+            "at": datetime.now(timezone.utc).isoformat(),
+        }
+        self.dead_letters.append(letter)
+        mqtt_logger.warning(f"[Commands] - [Dead letter] - {reason}: {letter['payload'][:200]}")
+        if self.on_dead_letter is not None:
+            try:
+                self.on_dead_letter(letter)
+            except Exception as e:
+                mqtt_logger.error(f"[Commands] - [Dead letter] - could not forward: {e}")
+
+    def depth(self) -> int:
+        return sum(commands.qsize() for commands in self._queues)
+
+    def stats(self) -> dict:
+        done = max(self.processed + self.failed, 1)
+        return {
+            "workers": len(self._queues),
+            "queue_depth": self.depth(),
+            "max_depth": self.max_depth,
+            "back_pressure": self._pressured,
+            "received": self.received,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "dead_lettered": self.dead_lettered,
+            "wait_ms": {"avg": round(self._wait_total / done * 1000, 2), "max": round(self._wait_max * 1000, 2)},
+            "handle_ms": {"avg": round(self._run_total / done * 1000, 2), "max": round(self._run_max * 1000, 2)},
+        }
@@ -0,0 +1,101 @@
+# src/mqtt/live.py
+import asyncio
+from src.utils.loggers import mqtt_logger
+from src.mqtt.telemetry import build_frame
+
+
+class LiveHub:
+    """
+    Latest power reading of every device, kept in memory by the ingest path.
+
+    Viewers subscribe through the `stream`/`stop` MQTT commands; a single
+    publisher coroutine on the serial event loop pushes a device's newest
+    reading at most once per `interval`, and only while someone is
+    subscribed to it and a new reading has arrived since the last push.
+    No database reads and no per-device threads are involved.
+
+    In frame mode the publisher instead sends one telemetry frame per
+    interval with every device that reported since the previous one
+    (see `src.mqtt.telemetry`), whatever the subscriptions.
+    """
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self.latest = {}  # device id -> (timestamp, power)
+        self.subscribed = set()
+        self._dirty = set()
+        self._changed = set()
+        self.published = 0
+        self.frames = 0
+
+    def update(self, device_id: int, timestamp, power: float):
+        """Records a new reading; O(1), called for every sample on the ingest path."""
+        self.latest[device_id] = (timestamp, power)
+        self._changed.add(device_id)
+        if device_id in self.subscribed:
+            self._dirty.add(device_id)
+
+    def subscribe(self, device_id: int) -> bool:
+        """Returns False if the device was already streaming."""
+        if device_id in self.subscribed:
+            return False
+        self.subscribed.add(device_id)
+        self._dirty.add(device_id)  # Send the current value straight away
+        return True
+
+    def unsubscribe(self, device_id: int):
+        self.subscribed.discard(device_id)
+        self._dirty.discard(device_id)
+
+    def message(self, device_id: int) -> dict:
+        timestamp, power = self.latest[device_id]
+        return {"timestamp": str(timestamp), "power": power}
+
+    def _take_due(self) -> list[int]:
+        due, self._dirty = self._dirty, set()
+        return [device_id for device_id in due if device_id in self.subscribed and device_id in self.latest]
+
+    def _take_frame(self) -> dict:
+        changed, self._changed = self._changed, set()
+        return {device_id: self.latest[device_id] for device_id in changed}
+
+    async def run(self, publish, publish_frame=None):
+        """
+        Publisher loop; `publish(device_id, message)` must not block (e.g. a paho publish).
+        Passing `publish_frame(payload)` switches to one telemetry frame per interval.
+        """
+        while True:
+            await asyncio.sleep(self.interval)
+            if publish_frame is not None:
+                self._publish_frame(publish_frame)
+                continue
+            self._changed.clear()
+            for device_id in self._take_due():
+                try:
+                    publish(device_id, self.message(device_id))
+                    self.published += 1
+                except Exception as e:
+                    mqtt_logger.error(f"[Publish] - [Stream] - [{device_id}] - {e}")
+
+    def _publish_frame(self, publish_frame):
+        self._dirty.clear()
+        readings = self._take_frame()
+        if not readings:
+            return
+        try:
+            publish_frame(build_frame(readings))
+            self.frames += 1
+            self.published += len(readings)
+        except Exception as e:
+            mqtt_logger.error(f"[Publish] - [Frame] - {len(readings)} devices - {e}")
+
+    def stats(self) -> dict:
+        return {
+            "devices": len(self.latest),
+            "subscribed": len(self.subscribed),
+            "published": self.published,
+            "frames": self.frames,
+        }
+
+
+live_hub = LiveHub()
@@ -0,0 +1,223 @@
+# src/mqtt/outbox.py
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from src.utils.loggers import mqtt_logger
+
+
+class Outbox:
+    """
+    Store-and-forward queue for everything the hub publishes to the broker.
+
+    `enqueue` only appends to an in-memory buffer, so publishing never waits
+    on SQLite from the caller's thread or event loop. A single outbox thread
+    persists the buffer to a SQLite database in WAL mode, in one transaction
+    per wake-up (within about a second), so messages survive broker outages
+    and hub restarts, and publishes them in order, in batches of
+    `batch_size`, while the client is connected. Rows are deleted only once
+    the broker has acknowledged them (at-least-once).
+
+    After a reconnect the drain starts after a random delay of up to
+    `reconnect_jitter` seconds and never exceeds `max_rate` messages per
+    second, so an estate-wide reconnect does not hammer the broker. Messages
+    may carry a `ttl`; expired ones (e.g. live readings) are discarded instead
+    of being replayed. Beyond `max_messages` the oldest rows are dropped.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        publish,
+        batch_size: int = 100,
+        max_rate: float = 200,
+        max_messages: int = 500000,
+        reconnect_jitter: float = 10,
+        ack_timeout: float = 30,
+    ):
+        self.path = path
+        self.publish = publish  # (topic, payload, qos, content_type) -> paho MQTTMessageInfo
+        self.batch_size = batch_size
+        self.max_rate = max_rate
+        self.max_messages = max_messages
+        self.reconnect_jitter = reconnect_jitter
+        self.ack_timeout = ack_timeout
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " topic TEXT NOT NULL,"
+            " payload BLOB NOT NULL,"
+            " qos INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " expires REAL,"
+            " content_type TEXT)"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(outbox)")}
+        if "content_type" not in columns:  # Outbox written before payload codecs
+            self._db.execute("ALTER TABLE outbox ADD COLUMN content_type TEXT")
+        self._buffer = deque()  # Rows enqueued, not yet persisted
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._connected = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._reconnected = False
+
+        self.enqueued = 0
+        self.sent = 0
+        self.expired = 0
+        self.overflowed = 0
+        self.failed_batches = 0
+        self._depth = self._count()
+
+    def _count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    # ---- Producer side ----
+    def enqueue(self, topic: str, payload, qos: int = 1, ttl: float = None, content_type: str = None):
+        """Buffers a message for the outbox thread; never touches the database."""
+        now = time.time()
+        if isinstance(payload, str):
+            payload = payload.encode()
+        self._buffer.append((topic, payload, qos, now, now + ttl if ttl else None, content_type))
+        self.enqueued += 1
+        self._wake.set()
+
+    def _persist(self):
+        """Writes the buffered messages in one transaction (outbox thread, and on stop)."""
+        rows = []
+        while self._buffer:
+            rows.append(self._buffer.popleft())
+        if not rows:
+            return
+        with self._lock:
+            depth = self._depth + len(rows)
+            overflow = max(depth - self.max_messages, 0)
+            try:
+                self._db.execute("BEGIN")
+                self._db.executemany(
+                    "INSERT INTO outbox (topic, payload, qos, created, expires, content_type) VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                if overflow:
+                    self._db.execute(
+                        "DELETE FROM outbox WHERE seq IN (SELECT seq FROM outbox ORDER BY seq LIMIT ?)", (overflow,)
+                    )
+                self._db.execute("COMMIT")
+            except sqlite3.Error as e:
+                if self._db.in_transaction:
+                    self._db.execute("ROLLBACK")
+                self._buffer.extendleft(reversed(rows))  # Retried on the next wake-up
+                mqtt_logger.error(f"[Outbox] - failed to persist {len(rows)} messages: {e}")
+                return
+            self._depth = depth - overflow
+        if overflow:
+            self.overflowed += overflow
+            if self.overflowed == overflow or self.overflowed % 10000 < overflow:
+                mqtt_logger.error(f"[Outbox] - full, {self.overflowed} oldest messages dropped")
+
+    # ---- Connection state (called from paho callbacks) ----
+    def connected(self):
+        self._reconnected = True
+        self._connected.set()
+        self._wake.set()
+
+    def disconnected(self):
+        self._connected.clear()
+
+    # ---- Drain side ----
+    def start(self):
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="mqtt-outbox", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._persist()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(1)
+            self._persist()
+            if not self._connected.is_set():
+                self._wake.clear()
+                continue
+            if self._reconnected:
+                self._reconnected = False
+                delay = random.uniform(0, self.reconnect_jitter) if self._depth else 0
+                if delay:
+                    mqtt_logger.info(f"[Outbox] - reconnected, draining {self._depth} messages in {delay:.1f}s")
+                    if self._stopping.wait(delay):
+                        return
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT seq, topic, payload, qos, expires, content_type FROM outbox ORDER BY seq LIMIT ?",
+                    (self.batch_size,),
+                ).fetchall()
+                if not rows and not self._buffer:
+                    self._wake.clear()
+                if not rows:
+                    continue
+            try:
+                self._drain(rows)
+            except Exception as e:
+                self.failed_batches += 1
+                mqtt_logger.warning(f"[Outbox] - drain interrupted, {self._depth} messages kept: {e}")
+                self._stopping.wait(1)
+
+    def _drain(self, rows):
+        started = time.monotonic()
+        now = time.time()
+        done = None  # highest seq that is acknowledged or expired
+        inflight = []
+        for seq, topic, payload, qos, expires, content_type in rows:
+            if expires is not None and expires < now:
+                self.expired += 1
+            else:
+                inflight.append((seq, self.publish(topic, payload, qos, content_type)))
+        try:
+            for seq, info in inflight:
+                info.wait_for_publish(self.ack_timeout)
+                if not info.is_published():
+                    raise TimeoutError(f"no acknowledgement for message {seq}")
+                self.sent += 1
+                done = seq
+        finally:
+            if not inflight:
+                done = rows[-1][0]
+            elif done is not None and done == inflight[-1][0]:
+                done = rows[-1][0]  # Expired rows after the last acked one go too
+            if done is not None:
+                with self._lock:
+                    removed = self._db.execute("DELETE FROM outbox WHERE seq <= ?", (done,)).rowcount
+                    self._depth -= removed
+        # Rate limit across batches
+        minimum = len(inflight) / self.max_rate if self.max_rate else 0
+        elapsed = time.monotonic() - started
+        if elapsed < minimum:
+            self._stopping.wait(minimum - elapsed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            oldest = self._db.execute("SELECT MIN(created) FROM outbox").fetchone()[0]
+        return {
+            "depth": self._depth + len(self._buffer),
+            "buffered": len(self._buffer),
+            "oldest_age_s": round(time.time() - oldest, 1) if oldest else 0.0,
+            "connected": self._connected.is_set(),
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "expired": self.expired,
+            "overflowed": self.overflowed,
+            "failed_batches": self.failed_batches,
+        }
@@ -1,37 +1,65 @@
-# src/local_hub_mqtt/publisher.py
+# src/mqtt/publisher.py
+import time
+from collections import deque
+from src.mqtt.client import mqtt_client, MqttClient
+from src.utils.loggers import mqtt_logger
 
-from config import MQTT_BROKER, MQTT_PORT, MQTT_USERNAME, MQTT_PASSWORD, MQTT_PUBLISH_TOPIC
-import paho.mqtt.client as mqtt
-import json
 
-def publish_power_consumptions(records: list):
+class InflightWindow:
     """
-    Publishes a list of PowerConsumption SQLAlchemy objects to MQTT.
-    
-    Args:
-        records (list): List of PowerConsumption instances.
+    Bounds the QoS 1 messages handed to paho but not yet acknowledged by the
+    broker. Once `limit` are outstanding, `add()` waits for the oldest PUBACK,
+    so a long replay never queues more than `limit` messages in memory.
     """
-    client = mqtt.Client()
-    client.username_pw_set(MQTT_USERNAME, MQTT_PASSWORD)
-    client.tls_set()
 
-    try:
-        client.connect(MQTT_BROKER, MQTT_PORT)
-        client.loop_start()
+    def __init__(self, limit: int = 100, ack_timeout: float = 30):
+        self.limit = limit
+        self.ack_timeout = ack_timeout
+        self._pending = deque()
+        self.acked = 0
 
-        for record in records:
-            device_id = record.device_id
-            topic = f"{MQTT_PUBLISH_TOPIC}/{device_id}"
+    def add(self, info):
+        while len(self._pending) >= self.limit:
+            self._wait_oldest()
+        self._pending.append(info)
 
-            payload = {
-                "power": record.power,
-                "timestamp": record.timestamp.isoformat() + "Z"
-            }
+    def _wait_oldest(self):
+        info = self._pending.popleft()
+        try:
+            info.wait_for_publish(self.ack_timeout)
+        except (RuntimeError, ValueError) as e:
+            raise ConnectionError(f"message {info.mid} not sent: {e}") from e
+        if not info.is_published():
+            raise TimeoutError(f"no PUBACK for message {info.mid} within {self.ack_timeout}s")
+        self.acked += 1
 
-            client.publish(topic, json.dumps(payload))
-            print(f"Published to {topic}: {payload}")
+    def drain(self):
+        while self._pending:
+            self._wait_oldest()
 
-    finally:
-        client.loop_stop()
-        client.disconnect()
 
+def publish_power_consumptions(records, client: MqttClient = mqtt_client, max_inflight: int = 100, qos: int = 1) -> int:
+    """
+    Publishes PowerConsumption rows (anything with device_id, power and
+    timestamp) over the hub's persistent MQTT connection, with at most
+    `max_inflight` unacknowledged messages. `records` may be a generator,
+    e.g. `PowerConsumption.stream_since`, and is consumed lazily.
+    """
+    window = InflightWindow(max_inflight)
+    properties = client.codec.properties()
+    started = time.monotonic()
+    published = 0
+    for record in records:
+        topic = f"{client.publish_topic}/{record.device_id}"
+        payload = {
+            "power": record.power,
+            "timestamp": record.timestamp.isoformat() + "Z"
+        }
+        window.add(client.client.publish(topic, client.codec.encode(payload), qos=qos, properties=properties))
+        published += 1
+        if published % 10000 == 0:
+            rate = published / max(time.monotonic() - started, 1e-9)
+            mqtt_logger.info(f"[Backfill] - {published} readings published ({rate:.0f}/s)")
+    window.drain()
+    mqtt_logger.info(f"[Backfill] - done, {published} readings in {time.monotonic() - started:.1f}s")
+    return published
@@ -0,0 +1,53 @@
+# src/mqtt/telemetry.py
+"""
+Hub-level telemetry frame: one message per tick on `{HUB}/power/frame`
+carrying the newest reading of every device that reported since the previous
+frame, stored column-wise:
+
+    {"v": 1, "t0": 1760772000123, "ids": [3, 5, 9], "dt": [0, 412, 1830], "p": [1.62, 0.0, 2.05]}
+
+`t0` is the earliest reading time in epoch milliseconds and `dt` each
+reading's offset from it, so timestamps cost a few digits instead of an ISO
+string per device. The frame is encoded with the client's payload codec
+(src.mqtt.codec) like any other message. backend-central demultiplexes frames
+back into per-device `{"timestamp", "power"}` messages (src/utils/telemetry.py there).
+"""
+from datetime import datetime, timezone
+
+FRAME_VERSION = 1
+# Topic of frames under the hub name; backend-central subscribes with the same value
+FRAME_TOPIC = "power/frame"
+
+
+def _epoch_ms(timestamp: datetime) -> int:
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return int(timestamp.timestamp() * 1000)
+
+
+def build_frame(readings: dict) -> dict:
+    """`readings` maps device id -> (timestamp: datetime, power: float)."""
+    ids = sorted(readings)
+    stamps = [_epoch_ms(readings[i][0]) for i in ids]
+    t0 = min(stamps) if stamps else 0
+    return {
+        "v": FRAME_VERSION,
+        "t0": t0,
+        "ids": ids,
+        "dt": [stamp - t0 for stamp in stamps],
+        "p": [round(readings[i][1], 4) for i in ids],
+    }
+
+
+def split_frame(frame: dict) -> list[tuple[int, dict]]:
+    """Per-device (id, {"timestamp", "power"}) readings of a decoded frame."""
+    if frame.get("v") != FRAME_VERSION:
+        raise ValueError(f"unsupported telemetry frame version {frame.get('v')}")
+    t0 = frame["t0"]
+    return [
+        (device_id, {
+            "timestamp": datetime.fromtimestamp((t0 + offset) / 1000, tz=timezone.utc).isoformat(),
+            "power": power,
+        })
+        for device_id, offset, power in zip(frame["ids"], frame["dt"], frame["p"])
+    ]
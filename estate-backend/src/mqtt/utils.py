@@ -1,15 +1,18 @@
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from src.database import SessionLocal
-from src.local_hub_mqtt.publisher import publish_power_consumptions
-from src.local_hub_mqtt.models import PowerConsumption
+from src.db.database import get_db
+from src.db.models import PowerConsumption
+from src.mqtt.client import mqtt_client
+from src.mqtt.publisher import publish_power_consumptions
 
-def publish_historical_data(hours=24):
-    db: Session = SessionLocal()
+def publish_historical_data(hours=24, chunk_size=1000, max_inflight=100):
+    """
+    Replays the last `hours` of readings over the hub's MQTT connection,
+    one keyset page at a time with a bounded number of unacknowledged messages.
+    """
+    if not mqtt_client.client.is_connected():
+        mqtt_client.start()
     start_time = datetime.utcnow() - timedelta(hours=hours)
 
-    readings = db.query(PowerConsumption).filter(PowerConsumption.timestamp >= start_time).all()
-    publish_power_consumptions(readings)
-
-
-
+    with get_db() as db:
+        readings = PowerConsumption.stream_since(db, start_time, chunk_size=chunk_size)
+        return publish_power_consumptions(readings, max_inflight=max_inflight)
@@ -0,0 +1,65 @@
+# src/starknet/balances.py
+from typing import Optional
+from sqlalchemy import select
+from src.db.database import get_db
+from src.db.models import Device
+from src.db.registry import device_registry
+from src.utils.loggers import starknet_logger
+from src.utils.redis import debit_client
+
+
+class BalanceService:
+    """
+    SCT balances for device loops, served from memory.
+
+    Reads come from the device registry, which every hub process keeps
+    current from the Transfer indexer's balance deltas, so no read waits on
+    an RPC round-trip. After a confirmed consume, `debit` lowers the balance
+    straight away instead of waiting for the indexer to see the Consume event.
+    Whichever of the two sides comes first applies the change (see
+    `DebitClient.claim`), so it is never counted twice; the indexer then
+    re-reads the device's balance on chain at its next reconcile.
+    """
+
+    def __init__(self, registry=device_registry, debits=debit_client):
+        self.registry = registry
+        self.debits = debits
+        self.debited = 0
+        self.already_indexed = 0
+
+    def get(self, id: Optional[int] = None, device_id: Optional[str] = None) -> Optional[int]:
+        state = self.registry.get(id=id, device_id=device_id)
+        return state.token_balance if state else None
+
+    def debit(self, id: int, tx_hash: str, amount: int) -> Optional[int]:
+        """
+        Applies `amount` SCT consumed by device `id` in `tx_hash` to its cached
+        balance, unless the indexer already has, and returns the new balance.
+        """
+        if not self.debits.claim(tx_hash, id, amount, "hub"):
+            self.already_indexed += 1
+            return self.get(id=id)
+        devices = Device.__table__
+        with get_db() as db:
+            db.execute(
+                devices.update()
+                .where(devices.c.id == id)
+                .values(token_balance=devices.c.token_balance - amount)
+            )
+            balance = db.execute(select(devices.c.token_balance).where(devices.c.id == id)).scalar()
+            db.commit()
+        if balance is not None:
+            Device.broadcast({"id": id, "token_balance": balance})
+        self.debited += 1
+        starknet_logger.info(f"[Balances] - device {id}: -{amount} SCT pending on {tx_hash}, now {balance}")
+        return balance
+
+    def stats(self) -> dict:
+        return {
+            "debited": self.debited,
+            "already_indexed": self.already_indexed,
+            "pending": self.debits.pending(),
+        }
+
+
+balance_service = BalanceService()
@@ -0,0 +1,156 @@
+# src/starknet/consume_queue.py
+import asyncio
+import time
+from src.starknet.sct import sct_client, StarknetSCT, ConsumeFailed
+from src.utils.loggers import starknet_logger
+
+
+class ConsumeRequest:
+    __slots__ = ("account_address", "device_id", "amount", "future", "attempts", "queued_at")
+
+    def __init__(self, account_address: str, device_id: str, amount: int, future: asyncio.Future):
+        self.account_address = account_address
+        self.device_id = device_id
+        self.amount = amount
+        self.future = future
+        self.attempts = 0
+        self.queued_at = time.monotonic()
+
+
+class ConsumeQueue:
+    """
+    Hub-wide queue of pending SCT consumptions.
+
+    Requests are gathered for `window` seconds (or until `max_batch` are
+    waiting) and submitted as a single multicall from the hub account.
+    A multicall reverts as a whole, so a batch that failed without consuming
+    anything (`ConsumeFailed`) is split in halves and resubmitted until the
+    failing requests are isolated; those are retried up
+    to `max_attempts` times, `retry_delay` seconds apart, before their
+    submitter gets the error. Up to `max_inflight` batches await acceptance
+    at once, each with its own nonce from the account's `NonceManager`.
+    """
+
+    def __init__(
+        self,
+        sct: StarknetSCT = sct_client,
+        window: float = 2.0,
+        max_batch: int = 50,
+        max_attempts: int = 3,
+        retry_delay: float = 5.0,
+        max_inflight: int = 4,
+    ):
+        self.sct = sct
+        self.window = window
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_inflight = max_inflight
+        self._pending = []
+        self._wake = None
+        self._worker = None
+        self._slots = None
+        self._inflight = set()
+        self.results = {}  # device_id -> last outcome
+        self.transactions = 0
+        self.consumed = 0
+        self.failed = 0
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._wake = asyncio.Event()
+            self._slots = asyncio.Semaphore(self.max_inflight)
+            self._worker = asyncio.create_task(self._run(), name="consume-queue")
+
+    async def submit(self, account_address: str, device_id: str, amount: int = 1) -> str:
+        """
+        Queues a consumption and waits for the hash of the transaction that included it.
+        """
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        self._enqueue(ConsumeRequest(account_address, device_id, amount, future))
+        return await future
+
+    def _enqueue(self, request: ConsumeRequest):
+        self._pending.append(request)
+        self._wake.set()
+
+    async def _run(self):
+        while True:
+            await self._wake.wait()
+            # Let the window fill unless the batch is already full
+            deadline = time.monotonic() + self.window
+            while len(self._pending) < self.max_batch and time.monotonic() < deadline:
+                await asyncio.sleep(min(0.1, deadline - time.monotonic()))
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            if not self._pending:
+                self._wake.clear()
+            if batch:
+                # Send the next batch as soon as a slot frees up, not after acceptance
+                await self._slots.acquire()
+                task = asyncio.create_task(self._submit_in_slot(batch))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+
+    async def _submit_in_slot(self, batch: list[ConsumeRequest]):
+        try:
+            await self._submit(batch)
+        finally:
+            self._slots.release()
+
+    async def _submit(self, batch: list[ConsumeRequest]):
+        try:
+            tx_hash = await self.sct.consume_many([(r.account_address, r.amount) for r in batch])
+        except ConsumeFailed as e:
+            if len(batch) > 1:
+                middle = len(batch) // 2
+                starknet_logger.warning(f"[Consume Queue] - batch of {len(batch)} failed, splitting: {e}")
+                await self._submit(batch[:middle])
+                await self._submit(batch[middle:])
+                return
+            self._retry(batch[0], e)
+            return
+        except Exception as e:
+            # Unknown whether anything was consumed: never resubmit, that could charge twice
+            for request in batch:
+                request.attempts += 1
+                self._fail(request, e)
+            return
+
+        self.transactions += 1
+        for request in batch:
+            self.consumed += request.amount
+            self.results[request.device_id] = {"tx_hash": tx_hash, "attempts": request.attempts + 1}
+            if not request.future.done():
+                request.future.set_result(tx_hash)
+        starknet_logger.info(
+            f"[Consume Queue] - {len(batch)} consumptions in {tx_hash} for {[r.device_id for r in batch]}"
+        )
+
+    def _retry(self, request: ConsumeRequest, error: Exception):
+        request.attempts += 1
+        if request.attempts < self.max_attempts:
+            starknet_logger.warning(
+                f"[{request.device_id}] - [Consume Queue] - attempt {request.attempts} failed, retrying in {self.retry_delay}s: {error}"
+            )
+            asyncio.get_running_loop().call_later(self.retry_delay, self._enqueue, request)
+            return
+        self._fail(request, error)
+
+    def _fail(self, request: ConsumeRequest, error: Exception):
+        self.failed += 1
+        self.results[request.device_id] = {"error": str(error), "attempts": request.attempts}
+        if not request.future.done():
+            request.future.set_exception(ValueError(f"[{request.device_id}] consume failed after {request.attempts} attempts: {error}"))
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "inflight": len(self._inflight),
+            "transactions": self.transactions,
+            "consumed": self.consumed,
+            "failed": self.failed,
+        }
+
+
+consume_queue = ConsumeQueue()
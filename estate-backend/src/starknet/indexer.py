@@ -0,0 +1,253 @@
+# src/starknet/indexer.py
+import asyncio
+import time
+from sqlalchemy import bindparam, select
+from starknet_py.hash.selector import get_selector_from_name
+from src.config import settings
+from src.db.database import get_db
+from src.db.models import Device, SyncState
+from src.db.registry import device_registry
+from src.starknet.sct import sct_client
+from src.utils.helpers import normalize_addr
+from src.utils.loggers import starknet_logger
+from src.utils.redis import debit_client
+
+CHECKPOINT_KEY = "sct_transfer_block"
+TRANSFER_KEY = get_selector_from_name("Transfer")
+CONSUME_KEY = get_selector_from_name("Consume")
+MINT_KEY = get_selector_from_name("Mint")
+
+
+class TransferIndexer:
+    """
+    Follows the SCT contract's Transfer, Consume and Mint events and keeps
+    device token balances current without an RPC call per event.
+
+    Each pass reads the events of a bounded block range in pages of
+    `chunk_size`, matches sender and recipient against the device registry's
+    in-memory address index, and sums the decoded amounts into one balance
+    delta per device. The deltas and the last indexed block are committed in
+    a single transaction, so a restart resumes right after the checkpoint:
+    no events are lost or applied twice, and nothing is rescanned. A consume
+    the hub already debited optimistically (`BalanceService.debit`) is
+    settled instead of applied again.
+
+    Balances are re-read over RPC only when reconciling: devices touched by
+    transfers every `reconcile_interval` seconds and every device every
+    `full_reconcile_interval`. The reads are pinned to the checkpoint block,
+    so they agree with the deltas applied so far.
+    """
+
+    def __init__(
+        self,
+        sct=sct_client,
+        debits=debit_client,
+        interval: float = settings.SCT_INDEXER_INTERVAL,
+        chunk_size: int = settings.SCT_INDEXER_CHUNK_SIZE,
+        max_blocks: int = settings.SCT_INDEXER_MAX_BLOCKS,
+        reconcile_interval: float = settings.SCT_RECONCILE_INTERVAL,
+        full_reconcile_interval: float = settings.SCT_FULL_RECONCILE_INTERVAL,
+    ):
+        self.sct = sct
+        self.debits = debits
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self.max_blocks = max_blocks
+        self.reconcile_interval = reconcile_interval
+        self.full_reconcile_interval = full_reconcile_interval
+        self.running = False
+        self.checkpoint = None  # Last block whose events are applied
+        self._touched = set()  # Device ids with deltas since the last reconcile
+        self._last_reconcile = time.monotonic()
+        self._last_full_reconcile = time.monotonic()
+
+        self.events = 0
+        self.matched = 0
+        self.settled = 0
+        self.reconciled = 0
+        self.corrections = 0
+
+    # ---- Checkpoint ----
+    async def _start_block(self) -> int:
+        with get_db() as db:
+            checkpoint = SyncState.get(db, CHECKPOINT_KEY, None)
+        if checkpoint is None:
+            # First run: balances come from the device sync, follow from here
+            latest = await self.sct.client.get_block_number()
+            checkpoint = latest - 1
+            # Debits from before this point will never be seen as events
+            self.debits.clear()
+            starknet_logger.info(f"[Indexer] - no checkpoint, starting after block {checkpoint}")
+        else:
+            starknet_logger.info(f"[Indexer] - resuming after block {checkpoint}")
+        return checkpoint
+
+    # ---- Event pass ----
+    async def poll_once(self) -> bool:
+        """Indexes the blocks after the checkpoint, at most `max_blocks`; True once caught up."""
+        latest = await self.sct.client.get_block_number()
+        if latest <= self.checkpoint:
+            return True
+        to_block = min(latest, self.checkpoint + self.max_blocks)
+        deltas = {}
+        consumed = {}  # (tx_hash, device id) -> amount
+        seen = 0
+        token = None
+        while True:
+            chunk = await self.sct.client.get_events(
+                address=self.sct.contract.address,
+                keys=[[TRANSFER_KEY, CONSUME_KEY, MINT_KEY]],
+                from_block_number=self.checkpoint + 1,
+                to_block_number=to_block,
+                continuation_token=token,
+                chunk_size=self.chunk_size,
+            )
+            for event in chunk.events:
+                seen += 1
+                self._add_deltas(deltas, consumed, event)
+            token = chunk.continuation_token
+            if not token:
+                break
+        self._settle(deltas, consumed)
+        self._apply(deltas, to_block)
+        self.events += seen
+        return to_block == latest
+
+    def _add_deltas(self, deltas: dict, consumed: dict, event):
+        if len(event.keys) < 2:
+            return
+        amount = self.sct.decode_uint256(event.data)
+        if event.keys[0] in (CONSUME_KEY, MINT_KEY):
+            for state in device_registry.by_addresses([hex(event.keys[1])]):
+                if event.keys[0] == MINT_KEY:
+                    deltas[state.id] = deltas.get(state.id, 0) + amount
+                else:
+                    key = (hex(event.transaction_hash), state.id)
+                    consumed[key] = consumed.get(key, 0) + amount
+                self.matched += 1
+            return
+        if len(event.keys) < 3:
+            return
+        sender, recipient = normalize_addr(hex(event.keys[1])), normalize_addr(hex(event.keys[2]))
+        for state in device_registry.by_addresses([sender, recipient]):
+            address = normalize_addr(state.account_address)
+            delta = (amount if address == recipient else 0) - (amount if address == sender else 0)
+            deltas[state.id] = deltas.get(state.id, 0) + delta
+            self.matched += 1
+
+    def _settle(self, deltas: dict, consumed: dict):
+        """Adds the consumes the hub has not debited yet; the others only need a reconcile."""
+        for (tx_hash, id), amount in consumed.items():
+            if self.debits.claim(tx_hash, id, amount, "indexer"):
+                deltas[id] = deltas.get(id, 0) - amount
+            else:
+                deltas.setdefault(id, 0)
+                self.settled += 1
+
+    def _apply(self, deltas: dict, to_block: int):
+        """Commits the summed deltas together with the new checkpoint."""
+        devices = Device.__table__
+        balances = {}
+        with get_db() as db:
+            changed = [{"device": id, "delta": delta} for id, delta in deltas.items() if delta]
+            if changed:
+                db.execute(
+                    devices.update()
+                    .where(devices.c.id == bindparam("device"))
+                    .values(token_balance=devices.c.token_balance + bindparam("delta")),
+                    changed,
+                )
+                balances = dict(db.execute(
+                    select(devices.c.id, devices.c.token_balance).where(devices.c.id.in_(deltas))
+                ).all())
+            SyncState.put(db, CHECKPOINT_KEY, to_block)
+            db.commit()
+        first = self.checkpoint + 1
+        self.checkpoint = to_block
+        for id, balance in balances.items():
+            Device.broadcast({"id": id, "token_balance": balance})
+        if deltas:
+            self._touched.update(deltas)
+            starknet_logger.info(
+                f"[Indexer] - blocks {first}-{to_block}: balance deltas for {len(deltas)} devices"
+            )
+
+    # ---- Reconciliation ----
+    async def reconcile(self, ids: set = None) -> int:
+        """
+        Re-reads balances over RPC as of the checkpoint block and corrects any
+        drift (e.g. a transfer the registry could not match yet); all devices
+        when `ids` is None. Debits the hub applied ahead of the checkpoint are
+        taken off the on-chain balance. Returns the number of corrected devices.
+        """
+        states = device_registry.all()
+        if ids is not None:
+            states = [state for state in states if state.id in ids]
+        if not states:
+            return 0
+        # Runs between passes, so the checkpoint cannot move during the reads
+        block = self.checkpoint
+        balances = await self.sct.get_balances([[s.account_address, s.device_id] for s in states], block)
+        pending = self.debits.pending(state.id for state in states)
+        corrected = {}
+        for state in states:
+            balance = balances.get(state.account_address)
+            if balance is None:
+                continue
+            balance -= pending.get(state.id, 0)
+            if balance != state.token_balance:
+                corrected[state.id] = balance
+        if corrected:
+            with get_db() as db:
+                for id, balance in corrected.items():
+                    Device.update_by_id(db, id, {"token_balance": balance})
+            self.corrections += len(corrected)
+            starknet_logger.warning(f"[Indexer] - corrected balances of {len(corrected)} devices at block {block}")
+        self.reconciled += len(states)
+        return len(corrected)
+
+    async def _maybe_reconcile(self):
+        now = time.monotonic()
+        if now - self._last_full_reconcile >= self.full_reconcile_interval:
+            self._last_full_reconcile = self._last_reconcile = now
+            self._touched.clear()
+            await self.reconcile()
+        elif self._touched and now - self._last_reconcile >= self.reconcile_interval:
+            self._last_reconcile = now
+            touched, self._touched = self._touched, set()
+            await self.reconcile(touched)
+
+    # ---- Loop ----
+    async def run(self):
+        self.running = True
+        self.checkpoint = await self._start_block()
+        starknet_logger.info("Started indexing Transfer events")
+        try:
+            while self.running:
+                try:
+                    caught_up = await self.poll_once()
+                    await self._maybe_reconcile()
+                except Exception as e:
+                    starknet_logger.error(f"[Indexer] - pass failed, retrying from block {self.checkpoint + 1}: {e}")
+                    caught_up = True
+                if caught_up:
+                    await asyncio.sleep(self.interval)
+        except asyncio.CancelledError:
+            starknet_logger.info("Indexer task cancelled gracefully.")
+            raise
+
+    def stop(self):
+        self.running = False
+
+    def stats(self) -> dict:
+        return {
+            "checkpoint": self.checkpoint,
+            "events": self.events,
+            "matched": self.matched,
+            "settled": self.settled,
+            "reconciled": self.reconciled,
+            "corrections": self.corrections,
+        }
+
+
+transfer_indexer = TransferIndexer()
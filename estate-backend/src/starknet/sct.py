@@ -1,19 +1,24 @@
 # src/utils/starknet/sct.py
 import asyncio
+import time
 from starknet_py.net.account.account import Account, KeyPair
 from starknet_py.net.full_node_client import FullNodeClient
 from starknet_py.net.models.chains import StarknetChainId
-from starknet_py.hash.selector import get_selector_from_name
 from starknet_py.contract import Contract
+from starknet_py.hash.selector import get_selector_from_name
+from starknet_py.net.client_models import Call, TransactionExecutionStatus, TransactionStatus
 from src.utils.loggers import starknet_logger
 
 from src.config import settings
-from src.db.models import Device
-from src.db.database import get_db
 from .abi import sct_abi
+from .rpc_batch import RpcBatchClient
+from .nonces import NonceManager
 
 from src.utils.exception_handlers.function_handlers import starknet_fn_handler
-from src.utils.helpers import addr_owner 
+
+class ConsumeFailed(ValueError):
+    """A consume transaction was not sent, or was reverted or rejected: nothing was consumed."""
+
 
 class StarknetSCT:
     def __init__(
@@ -39,47 +44,59 @@ class StarknetSCT:
             provider=self.account,
             cairo_version=cairo_version,
         )
+        self.rpc_batch = RpcBatchClient(node_url=rpc_url)
+        self.nonces = NonceManager(self.account, filler=self._fill_nonce)
         self.running = False
 
-    async def balanceOf(self, account_address: str, device_id: str) -> int:
+    async def balanceOf(self, account_address: str, device_id: str, block_number=None) -> int:
         try:
-            (saved,) = await self.contract.functions["balanceOf"].call(int(account_address, 16))
+            (saved,) = await self.contract.functions["balanceOf"].call(
+                int(account_address, 16), block_number=block_number
+            )
             starknet_logger.info(f"Fetched balance of [{device_id}]:  {saved} SCT")
             return saved
         except Exception as e:
             raise ValueError(f"Failed to fetch balance for [{device_id}]: {e}")
 
-    async def get_balances(self, account_addresses: list[list[str, str]]) -> dict[str, int]:
+    async def get_balances(self, account_addresses: list[list[str, str]], block_number=None) -> dict[str, int]:
         """
-        Fetch balances for multiple account addresses concurrently.
+        Fetch balances for multiple account addresses in JSON-RPC batches, optionally as of `block_number`.
         Returns a dictionary mapping address -> balance.
         """
+        selector = get_selector_from_name("balanceOf")
+        calls = [
+            Call(to_addr=self.contract.address, selector=selector, calldata=[int(address[0], 16)])
+            for address in account_addresses
+        ]
         try:
-            tasks = [
-                self.balanceOf(address[0], address[1])
-                for address in account_addresses
-            ]
-            balances = await asyncio.gather(*tasks)
+            balances = await self.rpc_batch.call_many(calls, block_number)
             results = {}
             for address, balance in zip(account_addresses, balances):
-                results[address[0]] = balance
-
-            return results
-
+                results[address[0]] = self.decode_uint256(balance)
         except Exception as e:
             raise ValueError(f"Failed to fetch multiple balances: {e}")
+        starknet_logger.info(f"Fetched balances of {len(results)} accounts in {-(-len(calls) // self.rpc_batch.batch_size)} batches")
+        return results
 
     
 
+    async def _fill_nonce(self, nonce: int):
+        """Uses up `nonce` with a no-op: a `balanceOf` of the hub account, which changes nothing."""
+        call = self.contract.functions["balanceOf"].prepare_invoke_v3(self.account.address)
+        await self.account.execute_v3(calls=[call], nonce=nonce, auto_estimate=True)
+
     async def consume(self, account: str, device_id: str) -> str:
         account_address = int(account, 16)
         try:
-            invocation = await self.contract.functions["consume"].invoke_v3(
-                account=account_address,
-                amount=1,
-                auto_estimate=True,
+            invocation = await self.nonces.execute(
+                lambda nonce: self.contract.functions["consume"].invoke_v3(
+                    account=account_address,
+                    amount=1,
+                    nonce=nonce,
+                    auto_estimate=True,
+                ),
+                wait=lambda invocation: invocation.wait_for_acceptance(),
             )
-            await invocation.wait_for_acceptance()
             result = hex(invocation.hash)
             starknet_logger.info(f"[{device_id}] - [Consumed] - 1 SCT - {result}")
             return result 
@@ -87,58 +104,61 @@ class StarknetSCT:
             raise ValueError(f"Error during contract invocation: {e}")
 
 
-    async def poll_transfer_events(self, interval: int = 1):
-        """Poll Transfer events emitted by the contract."""
-        event_name = "Transfer"
-        event_key = get_selector_from_name(event_name)
-        contract_address = self.contract.address
+    async def consume_many(self, consumptions: list[tuple[str, int]]) -> str:
+        """
+        Consumes tokens for several accounts in one multicall transaction signed by the hub account.
+        `consumptions` is a list of (account_address, amount). The whole batch reverts together.
+        The nonce is allocated locally, so several batches can be awaiting acceptance at once.
 
-        try:
-            self.running = True
-            latest_block = await self.client.get_block(block_number="latest")
-            last_checked_block = latest_block.block_number - 1
-            starknet_logger.info("Started polling for Transfer events")
-            while self.running:
-                await asyncio.sleep(interval)
-                try:
-                    with get_db() as db:
-                        events_response = await self.client.get_events(
-                            address=contract_address,
-                            keys=[[event_key]],
-                            from_block_number=last_checked_block + 1,
-                            to_block_number="latest",
-                            follow_continuation_token=True,
-                            chunk_size=5
-                        )
-                        for event in events_response.events:
-                            from_addr = hex(event.keys[1])
-                            to_addr = hex(event.keys[2])
-                            amount = self.decode_uint256(event.data)
-                            devices = Device.from_transfer_event(db, [from_addr, to_addr])
-                            if devices == []:
-                                continue
-                            starknet_logger.info(
-                                f"Transfer Event Deteced | From: {addr_owner(from_addr, devices)} | "
-                                    f"To: {addr_owner(to_addr, devices)} | Amount: {amount} | Block: {event.block_number}"
-                            )
-                            addresses = [[d.account_address, d.device_id] for d in devices]
-                            balances = await self.get_balances(addresses)
-                            for dev in devices:
-                                token_balance = balances.get(dev.account_address)
-                                dev.update(db, {"token_balance": token_balance})
-                            starknet_logger.info(
-                                f"Updated Token Balances for {[d.device_id for d in devices]}"
-                            )
-                        if events_response.events:
-                            last_checked_block = max(e.block_number for e in events_response.events)
-                
+        Raises `ConsumeFailed` only when the batch is known not to have consumed
+        anything (estimation or signing failed, or the transaction was reverted
+        or rejected); once sent, anything else returns the hash.
+        """
+        calls = [
+            self.contract.functions["consume"].prepare_invoke_v3(account=int(account, 16), amount=amount)
+            for account, amount in consumptions
+        ]
+
+        async def send(nonce):
+            try:
+                return await self.account.execute_v3(calls=calls, nonce=nonce, auto_estimate=True)
+            except Exception as e:
+                raise ConsumeFailed(f"Multicall consume of {len(calls)} calls not sent: {e}") from e
+
+        response = await self.nonces.execute(
+            send, wait=lambda response: self.wait_for_outcome(hex(response.transaction_hash))
+        )
+        result = hex(response.transaction_hash)
+        starknet_logger.info(f"[Multicall] - [Consumed] - {len(calls)} calls - {result}")
+        return result
 
-                except Exception as e:
-                    starknet_logger.error(f"Error polling events: {e}")
-                    self.stop()
-        except asyncio.CancelledError:
-            starknet_logger.info("Polling task cancelled gracefully.")
-            raise  # Important: re-raise to allow outer cleanup
+    async def wait_for_outcome(self, tx_hash: str, timeout: float = 300, interval: float = 2):
+        """
+        Polls the status of a sent transaction until it is accepted. Raises
+        `ConsumeFailed` if it was reverted or rejected; RPC errors and a
+        timeout are logged only, since the transaction may still land.
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                status = await self.client.get_transaction_status(tx_hash)
+            except Exception as e:
+                # Not known to the node yet, or a transient RPC error
+                starknet_logger.debug(f"[{tx_hash}] - status unavailable: {e}")
+            else:
+                if status.finality_status == TransactionStatus.REJECTED:
+                    raise ConsumeFailed(f"Transaction {tx_hash} rejected: {status.failure_reason}")
+                if status.execution_status == TransactionExecutionStatus.REVERTED:
+                    raise ConsumeFailed(f"Transaction {tx_hash} reverted: {status.failure_reason}")
+                if status.finality_status in (TransactionStatus.ACCEPTED_ON_L2, TransactionStatus.ACCEPTED_ON_L1):
+                    return
+            await asyncio.sleep(interval)
+        starknet_logger.warning(f"[{tx_hash}] - no final status after {timeout}s, treating it as sent")
+
+    async def poll_transfer_events(self):
+        """Follow Transfer events; see `src.starknet.indexer.TransferIndexer`."""
+        from src.starknet.indexer import transfer_indexer
+        await transfer_indexer.run()
 
     def decode_uint256(self, data: list[int]) -> int:
         """Decode StarkNet uint256 from felt array [low, high]"""
@@ -148,6 +168,8 @@ class StarknetSCT:
 
     def stop(self):
         self.running = False
+        from src.starknet.indexer import transfer_indexer
+        transfer_indexer.stop()
 
 
     
@@ -161,7 +183,7 @@ if __name__ == "__main__":
     from src.mqtt.client import mqtt_client
 
     try:
-        mqtt_client.start()
+        mqtt_client.start(outbox="indexer")
         starknet_fn_handler.run(sct_client.poll_transfer_events)
     except KeyboardInterrupt:
         print("\nKeyboard interrupt detected. Shutting down...")
@@ -0,0 +1,92 @@
+# /src/tests/codec_benchmark.py
+"""
+Payload codec benchmark: encoded size and encode/decode time of every
+installed codec (src.mqtt.codec) on the messages the hub actually exchanges,
+i.e. a live power reading, a telemetry frame, a stream command and a
+historical backfill row.
+
+    python -m src.tests.codec_benchmark --devices 100 --iterations 20000 --output codecs.json
+
+Needs no database, Redis or broker. The result is one JSON document.
+"""
+import argparse
+import json
+import platform
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from src.mqtt.codec import CODECS
+from src.mqtt.telemetry import build_frame
+
+
+def sample_messages(devices: int, seed: int = 1) -> dict:
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    readings = {
+        device_id: (now - timedelta(milliseconds=rng.randint(0, 1000)), rng.uniform(0, 3))
+        for device_id in range(1, devices + 1)
+    }
+    return {
+        "live": {"timestamp": str(now.replace(tzinfo=None)), "power": 1.8342},
+        f"frame_{devices}": build_frame(readings),
+        "command": {"device": 17, "command": "stream"},
+        "backfill": {"power": 0.9521, "timestamp": now.replace(tzinfo=None).isoformat() + "Z"},
+    }
+
+
+def measure(codec, message, iterations: int) -> dict:
+    payload = codec.encode(message)
+    assert codec.decode(payload) == message, f"{codec.name} does not round-trip"
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        codec.encode(message)
+    encode_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        codec.decode(payload)
+    decode_s = time.perf_counter() - started
+
+    return {
+        "bytes": len(payload),
+        "encode_us": round(encode_s / iterations * 1e6, 3),
+        "decode_us": round(decode_s / iterations * 1e6, 3),
+    }
+
+
+def main(args) -> dict:
+    messages = sample_messages(args.devices)
+    results = {}
+    for name, message in messages.items():
+        # Large frames get fewer rounds so every shape takes comparable time
+        iterations = max(args.iterations // max(len(message.get("ids", ())), 1), 100)
+        results[name] = {codec.name: measure(codec, message, iterations) for codec in CODECS.values()}
+        baseline = results[name]["json"]["bytes"]
+        for row in results[name].values():
+            row["size_vs_json"] = round(row["bytes"] / baseline, 3)
+    return {
+        "run_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "codecs": list(CODECS),
+        "config": vars(args),
+        "messages": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="MQTT payload codec benchmark")
+    parser.add_argument("--devices", type=int, default=100, help="devices in the telemetry frame")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--output", help="write the JSON result here instead of stdout")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    document = json.dumps(main(args), indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(document + "\n")
+    else:
+        print(document)
@@ -2,6 +2,7 @@ import serial
 import time
 import json
 import random
+from src.homes.protocol import PROTOCOL_VERSION, FrameDecoder, encode_status
 
 # Use your actual virtual port here
 SERIAL_PORT = "/dev/pts/5"  # Or COM3 on Windows
@@ -11,6 +12,7 @@ account_balance = 4.89
 connection_status = False
 led_state = False
 update = False
+binary_mode = False
 device_id = "H001"
 current = 0.0
 battery_voltage = 3.7
@@ -29,15 +31,20 @@ def build_status_message():
         "req": "true" if led_state else "false"
     })
 
+def build_binary_status():
+    return encode_status(current, battery_voltage, update, led_state)
+
 def build_idle_message():
     return json.dumps({
-        "device_id": device_id
+        "device_id": device_id,
+        "proto": PROTOCOL_VERSION
     })
 
 def main():
-    global current, battery_voltage, connection_status, account_balance, led_state, update
+    global current, battery_voltage, connection_status, account_balance, led_state, update, binary_mode
     ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1)
     print(f"Connected to {SERIAL_PORT} at {BAUD_RATE} baud.")
+    decoder = FrameDecoder(commands=True)
     
     last_send = time.time()
     last_recv = time.time()
@@ -45,37 +52,36 @@ def main():
     try:
         while True:
             if ser.in_waiting > 0:
-                line = ser.readline().decode('utf-8').strip()
-                if line:
-                    print(f"[Estate Hub → Simulated Arduino] {line}")
+                for command in decoder.feed(ser.read(ser.in_waiting)):
+                    print(f"[Estate Hub → Simulated Arduino] {command}")
                     last_recv = time.time()
-                    try:
-                        if "," in line:
-                            balance_str, instruction_str = line.split(",")
-                            account_balance = float(balance_str)
-                            instruction = int(instruction_str)
-
-                            if instruction == 0:
-                                connection_status = False
-                            elif instruction == 1:
-                                connection_status = True
-                            elif instruction == 2:
-                                led_state = not led_state
-                            elif instruction == 3:
-                                update = False
-
-                    except Exception as e:
-                        print("Error parsing serial input:", e)
+                    account_balance = float(command["balance"])
+                    instruction = command["instruction"]
+                    if command.get("binary"):
+                        binary_mode = True
+
+                    if instruction == 0:
+                        connection_status = False
+                    elif instruction == 1:
+                        connection_status = True
+                    elif instruction == 2:
+                        led_state = not led_state
+                    elif instruction == 3:
+                        update = False
 
             # Auto-disconnect after 10s of inactivity
             if time.time() - last_recv > 10:
                 connection_status = False
+                binary_mode = False
 
             # Send data every second
             if time.time() - last_send > 1:
                 current = get_current()
                 battery_voltage = get_battery_voltage()
-                if connection_status:
+                if connection_status and binary_mode:
+                    ser.write(build_binary_status())
+                    print("[Arduino → Estate Hub] Sent binary status.")
+                elif connection_status:
                     ser.write((build_status_message() + "\n").encode())
                     print("[Arduino → Estate Hub] Sent status.")
                 else:
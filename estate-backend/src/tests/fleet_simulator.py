@@ -0,0 +1,271 @@
+# /src/tests/fleet_simulator.py
+"""
+Simulates a fleet of house Arduinos on pseudo-terminals, for load-testing the hub.
+
+Each simulated device owns a pty pair and speaks the same protocol as
+house_a.ino: idle {"device_id", "proto"} frames until the hub sends an
+instruction, then status frames (JSON, or binary once the hub appends ",B").
+The slave side of every pty is linked as <link-dir>/ttyACM<n>; point the hub
+at it with SERIAL_PORT_DIR=<link-dir> and it is picked up by the hotplug
+watcher and `ArduinoClient.detect_ports` like a USB device.
+
+    python -m src.tests.fleet_simulator --devices 50 --rate 2 --jitter 0.2 \\
+        --malformed 0.01 --disconnect-every 120 --link-dir /tmp/solaris-fleet
+
+Devices must exist in the hub database; `--seed` inserts them (ids from
+`--first-id`) as active Consumers with `--balance` SCT.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import time
+import tty
+from src.homes.protocol import PROTOCOL_VERSION, FrameDecoder, encode_status
+
+
+class VirtualArduino:
+    """
+    One simulated house on its own pty pair. The master side is driven from
+    the event loop; the slave side stays open so writes queue in the tty even
+    while the hub has no session on it.
+    """
+
+    def __init__(self, index: int, device_id: str, link_dir: str, rate: float, jitter: float,
+                 malformed: float, update_every: float, silence_timeout: float, seed: int):
+        self.index = index
+        self.device_id = device_id
+        self.link = os.path.join(link_dir, f"ttyACM{index}")
+        self.rate = rate
+        self.jitter = jitter
+        self.malformed = malformed
+        self.update_every = update_every
+        self.silence_timeout = silence_timeout
+        self.random = random.Random(seed)
+        self.master = None
+        self.slave = None
+        self.decoder = None
+        self.connected = False
+        self.binary_mode = False
+        self.led_on = False
+        self.update = False
+        self.balance = 0
+        self.last_recv = 0.0
+        self.stats = {"sent": 0, "binary": 0, "idle": 0, "malformed": 0, "dropped": 0,
+                      "commands": 0, "disconnects": 0}
+
+    @property
+    def path(self):
+        return os.ttyname(self.slave) if self.slave is not None else None
+
+    def plug(self):
+        loop = asyncio.get_running_loop()
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        os.set_blocking(self.master, False)
+        self.decoder = FrameDecoder(commands=True)
+        self.connected = self.binary_mode = False
+        loop.add_reader(self.master, self._on_readable)
+        if os.path.lexists(self.link):
+            os.unlink(self.link)
+        os.symlink(self.path, self.link)
+
+    def unplug(self):
+        if os.path.lexists(self.link):
+            os.unlink(self.link)
+        if self.master is not None:
+            asyncio.get_running_loop().remove_reader(self.master)
+            os.close(self.master)
+            os.close(self.slave)
+        self.master = self.slave = None
+
+    def _on_readable(self):
+        try:
+            data = os.read(self.master, 4096)
+        except (BlockingIOError, OSError):
+            return
+        for command in self.decoder.feed(data):
+            self.stats["commands"] += 1
+            self.last_recv = time.monotonic()
+            self.balance = command["balance"]
+            if command.get("binary"):
+                self.binary_mode = True
+            instruction = command["instruction"]
+            if instruction == 0:
+                self.connected = False
+            elif instruction == 1:
+                self.connected = True
+            elif instruction == 2:
+                self.led_on = not self.led_on
+            elif instruction == 3:
+                self.update = False
+
+    def _status(self) -> bytes:
+        current = round(self.random.uniform(0.2, 0.6), 2) if self.led_on or self.random.random() < 0.8 else 0.0
+        voltage = round(self.random.uniform(3.5, 4.2), 2)
+        if self.binary_mode:
+            self.stats["binary"] += 1
+            return encode_status(current, voltage, self.update, self.led_on)
+        return (json.dumps({
+            "current": current,
+            "voltage": voltage,
+            "update": "true" if self.update else "false",
+            "req": "true" if self.led_on else "false",
+        }) + "\n").encode()
+
+    def _garbage(self, frame: bytes) -> bytes:
+        self.stats["malformed"] += 1
+        kind = self.random.randrange(3)
+        if kind == 0:  # Truncated frame
+            return frame[:max(1, len(frame) // 2)] + (b"" if self.binary_mode else b"\n")
+        if kind == 1:  # Single flipped bit
+            broken = bytearray(frame)
+            position = self.random.randrange(len(broken))
+            broken[position] ^= 1 << self.random.randrange(8)
+            return bytes(broken)
+        return bytes(self.random.randrange(256) for _ in range(self.random.randrange(1, 16))) + b"\n"
+
+    def _write(self, frame: bytes):
+        try:
+            os.write(self.master, frame)
+        except (BlockingIOError, OSError):
+            self.stats["dropped"] += 1  # tty buffer full: nobody is reading
+            return
+        self.stats["sent"] += 1
+
+    def tick(self):
+        if self.master is None:
+            return
+        now = time.monotonic()
+        if now - self.last_recv > self.silence_timeout:
+            self.connected = self.binary_mode = False
+        if self.connected and self.update_every and self.random.random() < 1 / (self.update_every * self.rate):
+            self.update = True
+        if self.connected:
+            frame = self._status()
+        else:
+            self.stats["idle"] += 1
+            frame = (json.dumps({"device_id": self.device_id, "proto": PROTOCOL_VERSION}) + "\n").encode()
+        if self.malformed and self.random.random() < self.malformed:
+            frame = self._garbage(frame)
+        self._write(frame)
+
+    async def run(self, disconnect_every: float, offline: float):
+        self.plug()
+        next_unplug = self._next_unplug(disconnect_every)
+        try:
+            while True:
+                self.tick()
+                if next_unplug is not None and time.monotonic() >= next_unplug:
+                    self.stats["disconnects"] += 1
+                    self.unplug()
+                    await asyncio.sleep(offline)
+                    self.plug()
+                    next_unplug = self._next_unplug(disconnect_every)
+                period = 1 / self.rate
+                await asyncio.sleep(max(0.0, period * (1 + self.random.uniform(-self.jitter, self.jitter))))
+        finally:
+            self.unplug()
+
+    def _next_unplug(self, disconnect_every: float):
+        if not disconnect_every:
+            return None
+        return time.monotonic() + self.random.expovariate(1 / disconnect_every)
+
+
+def seed_devices(devices: list[VirtualArduino], first_id: int, balance: int):
+    """
+    Inserts the simulated devices in the hub database as active Consumers.
+    """
+    from src.db.database import get_db
+    from src.db.models import Device
+
+    with get_db() as db:
+        for offset, device in enumerate(devices):
+            existing = Device.find(db, device_id=device.device_id)
+            if existing:
+                Device.update_by_id(db, existing.id, {"status": "active", "token_balance": balance})
+                continue
+            created = Device.create(db, {
+                "id": first_id + offset,
+                "device_id": device.device_id,
+                "connection_type": "Consumer",
+                "account_address": hex(0x5E1 << 240 | first_id + offset),
+                "token_balance": balance,
+            })
+            Device.update_by_id(db, created.id, {"status": "active"})
+
+
+async def report(devices: list[VirtualArduino], interval: float):
+    started = time.monotonic()
+    while True:
+        await asyncio.sleep(interval)
+        totals = {}
+        for device in devices:
+            for key, value in device.stats.items():
+                totals[key] = totals.get(key, 0) + value
+        elapsed = time.monotonic() - started
+        online = sum(1 for d in devices if d.connected)
+        print(json.dumps({"elapsed": round(elapsed, 1), "online": online,
+                          "frames_per_s": round(totals.get("sent", 0) / elapsed, 1), **totals}), flush=True)
+
+
+async def main(args):
+    os.makedirs(args.link_dir, exist_ok=True)
+    devices = [
+        VirtualArduino(
+            index=i,
+            device_id=f"{args.prefix}{i + 1:03d}",
+            link_dir=args.link_dir,
+            rate=args.rate,
+            jitter=args.jitter,
+            malformed=args.malformed,
+            update_every=args.update_every,
+            silence_timeout=args.silence_timeout,
+            seed=args.random_seed + i,
+        )
+        for i in range(args.devices)
+    ]
+    if args.seed:
+        seed_devices(devices, args.first_id, args.balance)
+
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    tasks = [asyncio.create_task(d.run(args.disconnect_every, args.offline)) for d in devices]
+    tasks.append(asyncio.create_task(report(devices, args.report_interval)))
+    print(f"{len(devices)} devices linked in {args.link_dir}; run the hub with SERIAL_PORT_DIR={args.link_dir}", flush=True)
+    try:
+        await stop.wait()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate a fleet of house Arduinos on ptys")
+    parser.add_argument("--devices", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=1.0, help="frames per second per device")
+    parser.add_argument("--jitter", type=float, default=0.1, help="relative jitter of the frame period")
+    parser.add_argument("--malformed", type=float, default=0.0, help="probability a frame is corrupted")
+    parser.add_argument("--update-every", type=float, default=0.0, help="mean seconds between balance requests")
+    parser.add_argument("--disconnect-every", type=float, default=0.0, help="mean seconds between unplugs (0: never)")
+    parser.add_argument("--offline", type=float, default=5.0, help="seconds a device stays unplugged")
+    parser.add_argument("--silence-timeout", type=float, default=10.0, help="idle after this long without commands")
+    parser.add_argument("--link-dir", default="/tmp/solaris-fleet")
+    parser.add_argument("--prefix", default="SIM")
+    parser.add_argument("--report-interval", type=float, default=10.0)
+    parser.add_argument("--random-seed", type=int, default=0, help="random seed")
+    parser.add_argument("--seed", action="store_true", help="insert the devices in the hub database")
+    parser.add_argument("--first-id", type=int, default=9000)
+    parser.add_argument("--balance", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,348 @@
+# /src/tests/hub_benchmark.py
+"""
+End-to-end ingest benchmark for the estate hub.
+
+For each fleet size, simulated devices (src.tests.fleet_simulator, run as a
+separate process so its CPU is not counted) are driven through the real
+`SerialMultiplexer` / `ArduinoClient` sessions into PowerConsumption (through
+`power_ingest`), the Redis energy accumulators and, with --mqtt, the MQTT power
+stream (`live_hub`). Central and Starknet are left out: activation is
+skipped and the token threshold is never reached.
+
+    python -m src.tests.hub_benchmark --devices 10,50,100 --rate 2 --duration 60 \\
+        --output bench.json
+
+Needs the hub's local Postgres and Redis (DATABASE_URL, REDIS_URL). Benchmark
+devices are inserted as BENCH001... and removed afterwards with their readings.
+The result is one JSON document, so runs of different releases can be diffed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from src.config import settings
+from src.db.database import get_db
+from src.db.ingest import power_ingest
+from src.db.models import Device, PowerConsumption
+from src.db.registry import device_registry
+from src.homes.arduino_interface import ArduinoClient
+from src.homes.hotplug import PortWatcher
+from src.homes.serial_mux import SerialMultiplexer
+from src.mqtt.client import mqtt_client
+from src.mqtt.telemetry import FRAME_TOPIC, split_frame
+from src.mqtt.codec import decode
+from src.tests.fleet_simulator import VirtualArduino, seed_devices
+from src.utils.redis import PowerClient
+
+PREFIX = "BENCH"
+FIRST_ID = 90000
+
+
+class BenchClient(ArduinoClient):
+    """
+    ArduinoClient without the central round-trips; consumption never reaches a token.
+    """
+
+    def __init__(self, port, baud=9600):
+        super().__init__(port, baud)
+        self.threshold = 1e12
+
+    async def activate(self):
+        pass
+
+    async def deactivate(self):
+        pass
+
+
+class ResourceMeter:
+    """
+    CPU time and resident memory of this process between `start()` and `stop()`.
+    """
+
+    def start(self):
+        self.started = time.monotonic()
+        self.cpu = self._cpu()
+        self.rss = self._rss()
+
+    def stop(self) -> dict:
+        elapsed = time.monotonic() - self.started
+        cpu = self._cpu() - self.cpu
+        rss = self._rss()
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "cpu_s": round(cpu, 3),
+            "cpu_percent": round(cpu / elapsed * 100, 2),
+            "rss_mb": round(rss / 2**20, 2),
+            "rss_growth_mb": round((rss - self.rss) / 2**20, 2),
+            "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2),
+        }
+
+    @staticmethod
+    def _cpu() -> float:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return usage.ru_utime + usage.ru_stime
+
+    @staticmethod
+    def _rss() -> int:
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except OSError:
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class StreamProbe:
+    """
+    Subscribes to `{HUB}/power/#`, asks the hub to stream every benchmark
+    device, and measures message rate and age on arrival.
+    """
+
+    def __init__(self, device_ids: list[int]):
+        import paho.mqtt.client as paho
+        from paho.mqtt.client import CallbackAPIVersion
+
+        self.device_ids = device_ids
+        self.ages = []
+        self.messages = 0
+        self.readings = 0
+        self.client = paho.Client(protocol=paho.MQTTv5, callback_api_version=CallbackAPIVersion.VERSION2)
+        self.client.username_pw_set(settings.MQTT_USERNAME, settings.MQTT_PASSWORD)
+        self.client.tls_set()
+        self.client.on_message = self._on_message
+
+    def _on_message(self, client, userdata, msg):
+        self.messages += 1
+        try:
+            message = decode(msg.payload, msg.properties)
+            if msg.topic.endswith(f"/{FRAME_TOPIC}"):
+                readings = [reading for _, reading in split_frame(message)]
+            else:
+                readings = [message]
+            timestamps = [datetime.fromisoformat(reading["timestamp"]) for reading in readings]
+        except (ValueError, KeyError, TypeError):
+            return
+        self.readings += len(timestamps)
+        for timestamp in timestamps:
+            now = datetime.now(timestamp.tzinfo) if timestamp.tzinfo else datetime.utcnow()
+            self.ages.append((now - timestamp).total_seconds())
+
+    def start(self):
+        self.client.connect(settings.MQTT_BROKER, settings.MQTT_PORT)
+        self.client.subscribe(f"{settings.HUB_NAME}/power/#", qos=0)
+        self.client.loop_start()
+        for device_id in self.device_ids:
+            self.client.publish(f"{settings.HUB_NAME}/commands", json.dumps({"device": device_id, "command": "stream"}), qos=1)
+
+    def reset(self):
+        self.ages = []
+        self.messages = 0
+        self.readings = 0
+
+    def stop(self, elapsed: float) -> dict:
+        for device_id in self.device_ids:
+            self.client.publish(f"{settings.HUB_NAME}/commands", json.dumps({"device": device_id, "command": "stop"}), qos=1)
+        self.client.loop_stop()
+        self.client.disconnect()
+        return {
+            "messages": self.messages,
+            "messages_per_s": round(self.messages / elapsed, 2),
+            "readings": self.readings,
+            "age_ms": percentiles(self.ages),
+        }
+
+
+def percentiles(values: list[float], points=(50, 95, 99)) -> dict:
+    ordered = sorted(values)
+    if not ordered:
+        return {}
+    result = {f"p{p}": round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000, 2) for p in points}
+    result["max"] = round(ordered[-1] * 1000, 2)
+    return result
+
+
+def _step_latencies(mux: SerialMultiplexer) -> dict:
+    """Session step latencies (read, send, cycle, handshake) averaged over every port."""
+    merged = {}
+    for snapshot in mux.report().values():
+        for step, values in snapshot["latency_ms"].items():
+            entry = merged.setdefault(step, {"count": 0, "total": 0.0, "max": 0.0})
+            entry["count"] += values["count"]
+            entry["total"] += values["avg"] * values["count"]
+            entry["max"] = max(entry["max"], values["max"])
+    return {
+        step: {"count": e["count"], "avg_ms": round(e["total"] / e["count"], 2) if e["count"] else 0.0, "max_ms": e["max"]}
+        for step, e in merged.items()
+    }
+
+
+def _cleanup(device_ids: list[int]):
+    with get_db() as db:
+        db.query(PowerConsumption).filter(PowerConsumption.device_id.in_(device_ids)).delete(synchronize_session=False)
+        db.query(Device).filter(Device.id.in_(device_ids)).delete(synchronize_session=False)
+        db.commit()
+    for device_id in device_ids:
+        PowerClient(f"{PREFIX}{device_id - FIRST_ID + 1:03d}").delete()
+
+
+def _db_rows(device_ids: list[int]) -> int:
+    with get_db() as db:
+        return db.query(PowerConsumption).filter(PowerConsumption.device_id.in_(device_ids)).count()
+
+
+async def run_scenario(count: int, args) -> dict:
+    link_dir = tempfile.mkdtemp(prefix="solaris-bench-")
+    devices = [
+        VirtualArduino(i, f"{PREFIX}{i + 1:03d}", link_dir, args.rate, args.jitter, args.malformed, 0, 10, i)
+        for i in range(count)
+    ]
+    device_ids = [FIRST_ID + i for i in range(count)]
+    baseline_rss = ResourceMeter._rss()  # Before any session exists
+    _cleanup(device_ids)
+    seed_devices(devices, FIRST_ID, balance=1)  # Non-zero balance so the Redis accumulator runs
+    device_registry.load()
+
+    settings.SERIAL_PORT_DIR = link_dir
+    simulator = subprocess.Popen([
+        sys.executable, "-m", "src.tests.fleet_simulator",
+        "--devices", str(count), "--rate", str(args.rate), "--jitter", str(args.jitter),
+        "--malformed", str(args.malformed), "--link-dir", link_dir, "--prefix", PREFIX,
+        "--report-interval", str(args.duration + args.warmup + 60),
+    ], stdout=subprocess.DEVNULL)
+
+    mux = SerialMultiplexer(BenchClient, report_interval=3600)
+    serving = asyncio.create_task(mux.serve(PortWatcher(mux.add_port, mux.remove_port, directories=(link_dir,))))
+    probe = StreamProbe(device_ids) if args.mqtt else None
+    meter = ResourceMeter()
+    try:
+        if probe:
+            probe.start()
+        await asyncio.sleep(args.warmup)
+        connected = len(mux.clients)
+        flushed = power_ingest.flushed_rows
+        dropped = power_ingest.dropped
+        frames = sum(c.frames.frames for c in mux.clients.values() if c.frames)
+        power_ingest.latencies.clear()
+        if probe:
+            probe.reset()
+        meter.start()
+
+        await asyncio.sleep(args.duration)
+
+        resources = meter.stop()
+        elapsed = resources["elapsed_s"]
+        readings = power_ingest.flushed_rows - flushed
+        received = sum(c.frames.frames for c in mux.clients.values() if c.frames) - frames
+        result = {
+            "devices": count,
+            "connected": connected,
+            "connected_at_end": len(mux.clients),
+            "frames_received": received,
+            "readings": readings,
+            "readings_per_s": round(readings / elapsed, 2),
+            "dropped": power_ingest.dropped - dropped,
+            "serial_to_db_ms": power_ingest.latency_percentiles(),
+            "steps": _step_latencies(mux),
+            "resources": resources,
+            "per_device": {
+                "cpu_percent": round(resources["cpu_percent"] / count, 3),
+                "rss_kb": round((ResourceMeter._rss() - baseline_rss) / 1024 / count, 1),
+                "readings_per_s": round(readings / elapsed / count, 3),
+            },
+        }
+        if probe:
+            result["mqtt_stream"] = probe.stop(elapsed)
+            probe = None
+    finally:
+        if probe:
+            probe.client.loop_stop()
+        serving.cancel()
+        await asyncio.gather(serving, return_exceptions=True)
+        simulator.terminate()
+        simulator.wait(10)
+        power_ingest.flush()
+        if not args.keep:
+            _cleanup(device_ids)
+        shutil.rmtree(link_dir, ignore_errors=True)
+    if args.keep:
+        result["db_rows"] = _db_rows(device_ids)
+    return result
+
+
+def _revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args):
+    power_ingest.start()
+    device_registry.load()
+    device_registry.start()
+    if args.mqtt:
+        mqtt_client.start()  # The hub side of the stream commands
+        publisher = asyncio.create_task(mqtt_client.publish_live())
+    scenarios = []
+    for count in args.devices:
+        scenarios.append(await run_scenario(count, args))
+        print(json.dumps(scenarios[-1]), file=sys.stderr, flush=True)
+    device_registry.stop()
+    if args.mqtt:
+        publisher.cancel()
+        mqtt_client.stop()
+    return {
+        "benchmark": "estate-hub-ingest",
+        "revision": _revision(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "rate": args.rate,
+            "jitter": args.jitter,
+            "malformed": args.malformed,
+            "warmup_s": args.warmup,
+            "duration_s": args.duration,
+            "serial_binary": settings.SERIAL_BINARY,
+            "telemetry_frames": settings.MQTT_TELEMETRY_FRAMES,
+            "mqtt_codec": mqtt_client.codec.name,
+            "ingest_batch_size": power_ingest.batch_size,
+            "ingest_flush_interval": power_ingest.flush_interval,
+            "ingest_use_copy": power_ingest.use_copy,
+        },
+        "scenarios": scenarios,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end estate hub ingest benchmark")
+    parser.add_argument("--devices", type=lambda v: [int(n) for n in v.split(",")], default=[10],
+                        help="comma separated fleet sizes, one scenario each")
+    parser.add_argument("--rate", type=float, default=1.0, help="frames per second per device")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--malformed", type=float, default=0.0)
+    parser.add_argument("--warmup", type=float, default=15.0, help="seconds for handshakes before measuring")
+    parser.add_argument("--duration", type=float, default=60.0, help="measured seconds per scenario")
+    parser.add_argument("--mqtt", action="store_true", help="also measure the MQTT power stream")
+    parser.add_argument("--keep", action="store_true", help="keep benchmark devices and readings")
+    parser.add_argument("--output", help="write the JSON result here instead of stdout")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    result = asyncio.run(main(args))
+    power_ingest.stop()
+    document = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(document + "\n")
+    else:
+        print(document)
@@ -0,0 +1,68 @@
+# /src/tests/test_batching.py
+"""
+Unit tests for the central request batcher.
+
+Run from estate-backend/ with:
+    python -m unittest discover -s src/tests -t .
+"""
+import asyncio
+import unittest
+
+from src.central_api.batching import RequestBatcher
+
+
+class RequestBatcherTest(unittest.TestCase):
+    def run_batcher(self, send_batch, items, **kwargs):
+        async def run():
+            batcher = RequestBatcher(send_batch, **kwargs)
+            results = await asyncio.gather(*(batcher.submit(item) for item in items), return_exceptions=True)
+            return batcher, results
+
+        return asyncio.run(run())
+
+    def test_coalesces_and_resolves_each_item(self):
+        sent = []
+
+        async def send_batch(items):
+            sent.append(items)
+            return [
+                {"ok": True, "message": f"done {item}"} if item % 2 == 0 else {"ok": False, "error": f"bad {item}"}
+                for item in items
+            ]
+
+        batcher, results = self.run_batcher(send_batch, range(4), window=0.01)
+        self.assertEqual(sent, [[0, 1, 2, 3]])
+        self.assertEqual(results[0], "done 0")
+        self.assertEqual(results[2], "done 2")
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(str(results[3]), "bad 3")
+        self.assertEqual((batcher.batches, batcher.items), (1, 4))
+
+    def test_splits_at_max_size(self):
+        sent = []
+
+        async def send_batch(items):
+            sent.append(list(items))
+            return [{"ok": True, "message": item} for item in items]
+
+        batcher, results = self.run_batcher(send_batch, range(5), window=10.0, max_size=2)
+        self.assertEqual(results, [0, 1, 2, 3, 4])
+        self.assertEqual(sent, [[0, 1], [2, 3], [4]])
+
+    def test_failed_request_fails_every_item(self):
+        async def send_batch(items):
+            raise ConnectionError("central unreachable")
+
+        _, results = self.run_batcher(send_batch, range(3), window=0.01)
+        self.assertTrue(all(isinstance(r, ConnectionError) for r in results))
+
+    def test_wrong_result_count_fails_every_item(self):
+        async def send_batch(items):
+            return [{"ok": True, "message": "only one"}]
+
+        _, results = self.run_batcher(send_batch, range(2), window=0.01)
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+# /src/tests/test_metering.py
+"""
+Unit tests for the energy integration that billing is based on.
+
+Run from estate-backend/ with:
+    python -m unittest discover -s src/tests -t .
+"""
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from src.homes.metering import EnergyMeter, MeterBatch, integrate_segments, integrate_windows
+
+
+def samples(*points):
+    return [SimpleNamespace(monotonic=t, power=p) for t, p in points]
+
+
+class IntegrateSegmentsTest(unittest.TestCase):
+    def integrate(self, times, power, starts=(0,), max_gap=10.0):
+        return integrate_segments(
+            np.array(times, dtype=float), np.array(power, dtype=float),
+            np.array(starts, dtype=np.intp), max_gap,
+        )
+
+    def test_constant_power(self):
+        # 3600 W for 1 s is 1 Wh, however finely it is sampled
+        self.assertAlmostEqual(self.integrate([0, 1], [3600, 3600])[0], 1.0)
+        self.assertAlmostEqual(self.integrate(np.linspace(0, 1, 11), [3600] * 11)[0], 1.0)
+
+    def test_trapezoid(self):
+        # Ramp from 0 to 7200 W over 1 s averages 3600 W
+        self.assertAlmostEqual(self.integrate([0, 1], [0, 7200])[0], 1.0)
+
+    def test_uneven_sampling(self):
+        self.assertAlmostEqual(self.integrate([0, 0.5, 3], [3600, 3600, 3600])[0], 3.0)
+
+    def test_gaps_are_not_billed(self):
+        energy = self.integrate([0, 1, 20, 21], [3600] * 4, max_gap=10.0)[0]
+        self.assertAlmostEqual(energy, 2.0)
+
+    def test_backwards_and_repeated_timestamps_are_ignored(self):
+        # Only 0 -> 1 and 0.5 -> 2 count
+        energy = self.integrate([0, 1, 1, 0.5, 2], [3600] * 5)[0]
+        self.assertAlmostEqual(energy, 2.5)
+
+    def test_device_boundaries_are_not_crossed(self):
+        energies = self.integrate([0, 1, 1.5, 2.5, 3.5], [3600, 3600, 7200, 7200, 7200], starts=(0, 2))
+        np.testing.assert_allclose(energies, [1.0, 4.0])
+
+    def test_single_sample_devices(self):
+        energies = self.integrate([0, 5, 6], [3600] * 3, starts=(0, 1))
+        np.testing.assert_allclose(energies, [0.0, 1.0])
+        np.testing.assert_allclose(self.integrate([0], [3600]), [0.0])
+
+
+class EnergyMeterTest(unittest.TestCase):
+    def test_carries_last_sample_between_windows(self):
+        meter = EnergyMeter()
+        self.assertAlmostEqual(meter.integrate(samples((0, 3600), (1, 3600))), 1.0)
+        # The interval between windows (1 -> 2) is billed with the next one
+        self.assertAlmostEqual(meter.integrate(samples((2, 3600))), 1.0)
+        self.assertAlmostEqual(meter.total_wh, 2.0)
+
+    def test_energy_does_not_depend_on_window_size(self):
+        points = [(t * 0.5, 1000 + 100 * t) for t in range(40)]
+        whole = EnergyMeter()
+        whole.integrate(samples(*points))
+        split = EnergyMeter()
+        for i in range(0, len(points), 3):
+            split.integrate(samples(*points[i:i + 3]))
+        self.assertAlmostEqual(split.total_wh, whole.total_wh)
+
+    def test_silent_device_is_not_billed(self):
+        meter = EnergyMeter(max_gap=10.0)
+        meter.integrate(samples((0, 3600), (1, 3600)))
+        self.assertEqual(meter.integrate(samples((60, 3600))), 0.0)
+        self.assertAlmostEqual(meter.integrate(samples((61, 3600))), 1.0)
+
+    def test_empty_window(self):
+        meter = EnergyMeter()
+        self.assertEqual(meter.integrate([]), 0.0)
+        self.assertEqual(meter.total_wh, 0.0)
+
+
+class IntegrateWindowsTest(unittest.TestCase):
+    def windows(self, rounds):
+        return [
+            {
+                "a": samples((r * 3, 100.0), (r * 3 + 1, 200.0), (r * 3 + 2, 300.0)),
+                "b": samples((r * 3 + 0.5, 50.0)),
+                "c": [] if r % 2 else samples((r * 3, 3600.0), (r * 3 + 2.5, 0.0)),
+            }
+            for r in range(rounds)
+        ]
+
+    def test_matches_individual_meters(self):
+        batched = {d: EnergyMeter() for d in "abc"}
+        single = {d: EnergyMeter() for d in "abc"}
+        for window in self.windows(4):
+            results = integrate_windows(window, batched)
+            for device, device_samples in window.items():
+                expected = single[device].integrate(device_samples)
+                self.assertAlmostEqual(results.get(device, 0.0), expected)
+        for device in "abc":
+            self.assertAlmostEqual(batched[device].total_wh, single[device].total_wh)
+
+    def test_empty_windows(self):
+        self.assertEqual(integrate_windows({"a": []}, {"a": EnergyMeter()}), {})
+
+
+class MeterBatchTest(unittest.TestCase):
+    def test_concurrent_windows_share_one_pass(self):
+        async def run():
+            batch = MeterBatch(window=0.01)
+            meters = [EnergyMeter() for _ in range(5)]
+            energies = await asyncio.gather(*(
+                batch.integrate(meter, samples((0, 3600 * (i + 1)), (1, 3600 * (i + 1))))
+                for i, meter in enumerate(meters)
+            ))
+            return batch, energies
+
+        batch, energies = asyncio.run(run())
+        self.assertEqual(batch.batches, 1)
+        for i, energy in enumerate(energies):
+            self.assertAlmostEqual(energy, i + 1.0)
+
+    def test_empty_window_resolves_to_zero(self):
+        async def run():
+            return await MeterBatch(window=0.01).integrate(EnergyMeter(), [])
+
+        self.assertEqual(asyncio.run(run()), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
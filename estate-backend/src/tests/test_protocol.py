@@ -0,0 +1,142 @@
+# /src/tests/test_protocol.py
+"""
+Unit tests for the serial frame decoder.
+
+Run from estate-backend/ with:
+    python -m unittest discover -s src/tests -t .
+"""
+import json
+import unittest
+
+from src.homes.protocol import (
+    COMMAND,
+    FrameDecoder,
+    SYNC,
+    crc16,
+    encode_command,
+    encode_status,
+    encode_text_command,
+)
+
+
+def json_line(**frame) -> bytes:
+    return json.dumps(frame).encode() + b"\n"
+
+
+class FrameDecoderTest(unittest.TestCase):
+    def test_binary_status_round_trip(self):
+        decoder = FrameDecoder()
+        frames = decoder.feed(encode_status(0.42, 3.91, update=True, req=False))
+        self.assertEqual(frames, [{"current": 0.42, "voltage": 3.91, "update": "true", "req": "false"}])
+        self.assertEqual(decoder.binary_frames, 1)
+        self.assertEqual(decoder.skipped_bytes, 0)
+
+    def test_status_values_are_clamped(self):
+        frames = FrameDecoder().feed(encode_status(-500.0, -1.0, update=False, req=True))
+        self.assertEqual(frames[0]["current"], -327.68)
+        self.assertEqual(frames[0]["voltage"], 0.0)
+        self.assertEqual(frames[0]["req"], "true")
+
+    def test_json_line(self):
+        decoder = FrameDecoder()
+        frame = {"current": 0.1, "voltage": 4.0, "update": "false", "req": "true"}
+        self.assertEqual(decoder.feed(json_line(**frame)), [frame])
+        self.assertEqual(decoder.json_frames, 1)
+
+    def test_mixed_json_and_binary(self):
+        decoder = FrameDecoder()
+        stream = (
+            json_line(current=0.1, voltage=4.0)
+            + encode_status(0.2, 4.1, update=False, req=True)
+            + json_line(current=0.3, voltage=4.2)
+            + encode_status(0.4, 4.3, update=True, req=True)
+        )
+        frames = decoder.feed(stream)
+        self.assertEqual([f["current"] for f in frames], [0.1, 0.2, 0.3, 0.4])
+        self.assertEqual((decoder.json_frames, decoder.binary_frames), (2, 2))
+        self.assertEqual(decoder.malformed, 0)
+
+    def test_frames_split_across_reads(self):
+        decoder = FrameDecoder()
+        stream = encode_status(0.5, 3.3, update=False, req=True) + json_line(current=0.6, voltage=3.4)
+        frames = []
+        for i in range(len(stream)):
+            frames.extend(decoder.feed(stream[i:i + 1]))
+        self.assertEqual([f["current"] for f in frames], [0.5, 0.6])
+        self.assertEqual(decoder.skipped_bytes, 0)
+
+    def test_partial_frame_waits_for_more_bytes(self):
+        decoder = FrameDecoder()
+        frame = encode_status(0.5, 3.3, update=False, req=False)
+        self.assertEqual(decoder.feed(frame[:4]), [])
+        self.assertEqual(decoder.feed(frame[4:])[0]["current"], 0.5)
+        self.assertEqual(decoder.crc_errors, 0)
+
+    def test_corrupt_crc_resyncs_on_next_frame(self):
+        decoder = FrameDecoder()
+        corrupt = bytearray(encode_status(1.0, 4.0, update=False, req=False))
+        corrupt[3] ^= 0xFF
+        frames = decoder.feed(bytes(corrupt) + encode_status(2.0, 4.0, update=False, req=False))
+        self.assertEqual(frames, [{"current": 2.0, "voltage": 4.0, "update": "false", "req": "false"}])
+        self.assertEqual(decoder.crc_errors, 1)
+        self.assertEqual(decoder.skipped_bytes, len(corrupt))
+
+    def test_truncated_frame_followed_by_valid_frame(self):
+        decoder = FrameDecoder()
+        good = encode_status(1.5, 4.0, update=False, req=False)
+        frames = decoder.feed(good[:5] + good)
+        self.assertEqual([f["current"] for f in frames], [1.5])
+        self.assertGreaterEqual(decoder.crc_errors, 1)
+
+    def test_unknown_frame_type_is_skipped(self):
+        decoder = FrameDecoder()
+        frames = decoder.feed(bytes((SYNC, 0x7F)) + json_line(current=0.7))
+        self.assertEqual(frames, [{"current": 0.7}])
+        self.assertEqual(decoder.skipped_bytes, 2)  # SYNC, then the stray type byte as noise
+
+    def test_noise_and_bad_json_are_malformed(self):
+        decoder = FrameDecoder()
+        stream = b"debug: boot\n" + b'{"current": 0.1,\n' + b"[1, 2]\n" + json_line(current=0.8)
+        frames = decoder.feed(stream)
+        self.assertEqual(frames, [{"current": 0.8}])
+        self.assertEqual(decoder.malformed, 3)
+
+    def test_json_line_interrupted_by_binary_frame(self):
+        decoder = FrameDecoder()
+        frames = decoder.feed(b'{"current": 0.' + encode_status(0.9, 4.0, update=False, req=False))
+        self.assertEqual([f["current"] for f in frames], [0.9])
+        self.assertEqual(decoder.malformed, 1)
+
+    def test_runaway_line_is_dropped(self):
+        decoder = FrameDecoder()
+        self.assertEqual(decoder.feed(b"{" + b"x" * 300), [])
+        self.assertEqual(decoder.malformed, 1)
+        self.assertEqual(decoder.feed(json_line(current=1.0)), [{"current": 1.0}])
+
+    def test_binary_command(self):
+        decoder = FrameDecoder(commands=True)
+        frame = encode_command(1234, 1)
+        self.assertEqual(frame[1], COMMAND)
+        self.assertEqual(crc16(frame[1:-2]), int.from_bytes(frame[-2:], "little"))
+        self.assertEqual(decoder.feed(frame), [{"balance": 1234, "instruction": 1}])
+
+    def test_text_commands(self):
+        decoder = FrameDecoder(commands=True)
+        stream = encode_text_command(50, 0) + encode_text_command(75, 1, request_binary=True)
+        self.assertEqual(decoder.feed(stream), [
+            {"balance": 50.0, "instruction": 0, "binary": False},
+            {"balance": 75.0, "instruction": 1, "binary": True},
+        ])
+
+    def test_text_commands_ignored_on_hub_side(self):
+        decoder = FrameDecoder()
+        self.assertEqual(decoder.feed(encode_text_command(50, 0)), [])
+        self.assertEqual(decoder.malformed, 1)
+
+    def test_crc16_check_value(self):
+        # CRC-16/CCITT-FALSE check value
+        self.assertEqual(crc16(b"123456789"), 0x29B1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 # src/utils/async_runner.py
 
 import asyncio
+import concurrent.futures
 import threading
 
 class AsyncRunner:
@@ -34,6 +35,19 @@ class AsyncRunner:
         finally:
             self._tasks.discard(future)
 
+    def submit(self, coro) -> concurrent.futures.Future:
+        """
+        Schedule an async function on the loop and return its future; wrap it
+        with `asyncio.wrap_future` to await it from another event loop.
+        """
+        if not self._loop.is_running():
+            raise RuntimeError("AsyncRunner loop is not running.")
+        return asyncio.run_coroutine_threadsafe(self._track_task(coro), self._loop)
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
     def run_async_nowait(self, coro):
         """
         Run an async function without waiting (non-blocking).
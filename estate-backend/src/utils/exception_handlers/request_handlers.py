@@ -1,6 +1,7 @@
 # src/utils/exception_handlers/request_handlers.py
 import requests
 import json
+import httpx
 from requests.exceptions import ConnectionError, Timeout, RequestException
 from src.utils.loggers import central_logger
 
@@ -9,21 +10,7 @@ class CentralRequestsHandler:
     @staticmethod
     def handle(request_fn, *args, **kwargs):
         try:
-            response = request_fn(*args, **kwargs)
-            if response.status_code != 200:
-                try:
-                    error_msg = response.json().get("detail", response.text)
-                except json.JSONDecodeError:
-                    error_msg = response.text
-                central_logger.error(f"Request failed: {error_msg}")
-                return None
-
-            try:
-                return response.json()
-            except json.JSONDecodeError:
-                central_logger.error("Response is not valid JSON")
-                return None
-
+            return CentralRequestsHandler.parse(request_fn(*args, **kwargs))
         except ConnectionError:
             central_logger.error("Connection refused — is central backend running?")
         except Timeout:
@@ -45,3 +32,47 @@ class CentralRequestsHandler:
         if value is None:
             raise ValueError(f"Key '{key}' not found in response")
         return value
+
+    @staticmethod
+    def parse(response):
+        """Body of a 200 response as JSON; logs and returns None otherwise."""
+        if response.status_code != 200:
+            try:
+                error_msg = response.json().get("detail", response.text)
+            except json.JSONDecodeError:
+                error_msg = response.text
+            central_logger.error(f"Request failed: {error_msg}")
+            return None
+
+        try:
+            return response.json()
+        except json.JSONDecodeError:
+            central_logger.error("Response is not valid JSON")
+            return None
+
+    @staticmethod
+    async def ahandle(request_fn, *args, **kwargs):
+        """`handle()` for coroutine request functions returning an httpx response."""
+        try:
+            return CentralRequestsHandler.parse(await request_fn(*args, **kwargs))
+        except httpx.ConnectError:
+            central_logger.error("Connection refused — is central backend running?")
+        except httpx.TimeoutException:
+            central_logger.error("Connection timed out when trying to connect to central backend.")
+        except httpx.HTTPError as e:
+            central_logger.error(f"Request failed: {e}")
+        except Exception:
+            central_logger.exception("Unexpected error during request")
+        return None
+
+    @staticmethod
+    async def aget_value(key: str, request_fn, *args, **kwargs):
+        """Await `ahandle()` and extract a specific key's value from the response."""
+        response = await CentralRequestsHandler.ahandle(request_fn, *args, **kwargs)
+        if not response:
+            raise ValueError("Request failed or returned no response")
+
+        value = response.get(key)
+        if value is None:
+            raise ValueError(f"Key '{key}' not found in response")
+        return value
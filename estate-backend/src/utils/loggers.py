@@ -34,3 +34,5 @@ central_logger = get_service_logger("CentralAPIClient")
 starknet_logger = get_service_logger("Starknet")
 mqtt_logger = get_service_logger("MQTTService")
 arduino_logger = get_service_logger("ArduinoService")
+ingest_logger = get_service_logger("IngestService")
+registry_logger = get_service_logger("DeviceRegistry")
@@ -1,10 +1,17 @@
 # /src/utils/redis.py
 import redis
+import json
+import time
+import uuid
 from src.config import settings
 
+# One connection pool shared by every Redis client in the hub process
+pool = redis.ConnectionPool.from_url(settings.REDIS_URL, decode_responses=True)
+
+
 class RedisClient:
     def __init__(self):
-        self.client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        self.client = redis.Redis(connection_pool=pool)
 
     def set(self, key: str, value: str, expires_in: int = 3600):
         """Set a key with expiration."""
@@ -58,26 +65,147 @@ class ArduinoPortClient(RedisClient):
         self.client.delete(self.key)
 
 class PowerClient(RedisClient):
+    # Adds a reading to the accumulator and, once the threshold is reached,
+    # converts whole multiples into tokens and keeps the remainder - atomically,
+    # in a single round-trip. Returns {tokens_due, remainder}.
+    ACCUMULATE = """
+    local total = tonumber(redis.call('INCRBYFLOAT', KEYS[1], ARGV[1]))
+    local threshold = tonumber(ARGV[2])
+    local tokens = 0
+    if threshold > 0 and total >= threshold then
+        tokens = math.floor(total / threshold)
+        total = total - tokens * threshold
+        redis.call('SET', KEYS[1], tostring(total))
+    end
+    return {tokens, tostring(total)}
+    """
+    _accumulate = None
+
     def __init__(self, device_id):
         super().__init__()
         self.key = f"power_accumulated_{device_id}"
+        if PowerClient._accumulate is None:
+            PowerClient._accumulate = self.client.register_script(self.ACCUMULATE)
+
+    def accumulate(self, energy: float, threshold: float) -> tuple[int, float]:
+        """Add energy and return (tokens due, carried-over remainder)."""
+        tokens, remainder = PowerClient._accumulate(keys=[self.key], args=[energy, threshold])
+        return int(tokens), float(remainder)
 
     def set(self, power):
-        """Add a port to the set of active Arduino ports."""
+        """Add power to the accumulated counter."""
         self.client.incrbyfloat(self.key, power)
 
-    def delete(self, port: str):
-        """Remove a port from the set of active Arduino ports."""
+    def delete(self):
+        """Remove the accumulated counter."""
         super().delete(self.key)
 
-    def get(self) -> list[str]:
-        """Get all currently active Arduino ports."""
+    def get(self) -> float:
+        """Get the accumulated counter."""
         return float(super().get(self.key) or 0)
 
     def reset(self, power):
-        """Add a port to the set of active Arduino ports."""
+        """Overwrite the accumulated counter."""
         self.client.set(self.key, power)
     
+class DeviceChangeClient(RedisClient):
+    def __init__(self):
+        super().__init__()
+        self.channel = f"device_changes:{settings.HUB_NAME}"
+        # Tags this process's messages: it has applied its own changes already
+        self.origin = uuid.uuid4().hex
+
+    def publish(self, change: dict):
+        """Broadcast a device row change to every registry in the hub."""
+        self.client.publish(self.channel, json.dumps({"origin": self.origin, "change": change}))
+
+    def decode(self, data: str):
+        """The change carried by a message, or None for this process's own echo."""
+        message = json.loads(data)
+        if message.get("origin") == self.origin:
+            return None
+        return message.get("change")
+
+    def subscribe(self):
+        """Return a PubSub subscribed to the device change channel."""
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        return pubsub
+
+class DebitClient(RedisClient):
+    # Claims the balance update for the SCT consumed by one device in one
+    # transaction, for the first of the two sides that learn of it: the hub
+    # right after the consume is confirmed ("hub"), or the Transfer indexer on
+    # seeing its Consume event ("indexer"). Returns 1 if the caller applies it.
+    # A hub claim is recorded as a pending debit until the indexer settles it,
+    # or until it expires together with its claim key.
+    CLAIM = """
+    local owner = redis.call('GET', KEYS[1])
+    local side = ARGV[1]
+    if not owner or owner == side then
+        redis.call('SET', KEYS[1], side, 'EX', ARGV[4])
+        if side == 'hub' then
+            redis.call('HSET', KEYS[2], ARGV[2], ARGV[3])
+            redis.call('ZADD', KEYS[3], ARGV[5] + ARGV[4], ARGV[2])
+        end
+        return 1
+    end
+    if owner == 'hub' then
+        redis.call('SET', KEYS[1], 'settled', 'KEEPTTL')
+        redis.call('HDEL', KEYS[2], ARGV[2])
+        redis.call('ZREM', KEYS[3], ARGV[2])
+    end
+    return 0
+    """
+
+    # Drops pending debits past their expiry and returns the rest
+    PENDING = """
+    local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+    if #expired > 0 then
+        redis.call('HDEL', KEYS[1], unpack(expired))
+        redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+    end
+    return redis.call('HGETALL', KEYS[1])
+    """
+
+    def __init__(self, ttl: int = 86400):
+        # `ttl` must cover the indexer's longest lag behind the chain head
+        super().__init__()
+        self.ttl = ttl
+        self.prefix = f"sct_debit:{settings.HUB_NAME}"
+        self.pending_key = f"sct_pending_debits:{settings.HUB_NAME}"
+        self.expiry_key = f"{self.pending_key}:expires"
+        self._claim = self.client.register_script(self.CLAIM)
+        self._pending = self.client.register_script(self.PENDING)
+
+    def claim(self, tx_hash: str, id: int, amount: int, side: str) -> bool:
+        """True if `side` applies the debit of `amount` SCT for device `id` in `tx_hash`."""
+        key = f"{self.prefix}:{tx_hash}:{id}"
+        return bool(self._claim(
+            keys=[key, self.pending_key, self.expiry_key],
+            args=[side, f"{id}:{tx_hash}", amount, self.ttl, int(time.time())],
+        ))
+
+    def pending(self, ids=None) -> dict[int, int]:
+        """Debits applied by the hub but not yet seen by the indexer, summed per device id."""
+        if ids is not None:
+            ids = set(ids)
+            if not ids:
+                return {}
+        entries = self._pending(keys=[self.pending_key, self.expiry_key], args=[int(time.time())])
+        totals = {}
+        for field, amount in zip(entries[::2], entries[1::2]):
+            id = int(field.split(":", 1)[0])
+            if ids is None or id in ids:
+                totals[id] = totals.get(id, 0) + int(amount)
+        return totals
+
+    def clear(self):
+        """Forget pending debits, e.g. when indexing restarts from the chain head."""
+        self.client.delete(self.pending_key, self.expiry_key)
+
 # Singleton instance
 central_token_client = CentralTokenClient()
 arduino_port_client = ArduinoPortClient()
+device_change_client = DeviceChangeClient()
+debit_client = DebitClient()